@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+from metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_QUEUE_DEPTH = Gauge("ticket_admission_queue_depth", "Ticket creations waiting for admission")
+ADMISSION_WAIT_SECONDS = Histogram(
+    "ticket_admission_wait_seconds",
+    "Time ticket creations spent queued before admission",
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+)
+ADMISSION_REJECTED = Counter("ticket_admission_rejected_total", "Ticket creations rejected by reason")
+
+
+class AdmissionError(Exception):
+    """Raised when a ticket creation is not admitted. The message is shown to the user."""
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate tokens per second, holding at most burst tokens."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self):
+        """Take a token if one is available. Returns True on success."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until_token(self):
+        """Seconds until a token will be available."""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class TicketAdmission:
+    """
+    Admission control for ticket creation bursts.
+
+    Each guild has a token bucket sized to what the channel-creation route
+    tolerates. Creations that find the bucket empty wait in a bounded
+    per-guild FIFO queue that a worker drains as tokens become available.
+    Users are also limited to one ticket creation per cooldown period.
+    """
+
+    def __init__(self, rate=None, burst=None, user_cooldown=None, max_queue=None):
+        """
+        Args:
+            rate: Ticket creations per second per guild (defaults to TICKET_RATE)
+            burst: Creations allowed back to back before queuing (defaults to TICKET_BURST)
+            user_cooldown: Seconds between creations by the same user (defaults to TICKET_USER_COOLDOWN)
+            max_queue: Max queued creations per guild (defaults to TICKET_QUEUE_SIZE)
+        """
+        self.rate = rate if rate is not None else float(os.environ.get("TICKET_RATE", "1"))
+        self.burst = burst if burst is not None else int(os.environ.get("TICKET_BURST", "5"))
+        self.user_cooldown = user_cooldown if user_cooldown is not None else float(os.environ.get("TICKET_USER_COOLDOWN", "30"))
+        self.max_queue = max_queue if max_queue is not None else int(os.environ.get("TICKET_QUEUE_SIZE", "100"))
+        self._buckets = {}  # guild_id -> TokenBucket
+        self._queues = {}  # guild_id -> deque of asyncio.Future
+        self._workers = {}  # guild_id -> asyncio.Task
+        self._last_admitted = {}  # (guild_id, user_id) -> monotonic time
+
+    async def admit(self, guild, user_id, on_queued=None):
+        """
+        Wait until a ticket creation for this user may proceed.
+
+        Args:
+            guild: The Discord guild
+            user_id: ID of the user opening the ticket
+            on_queued: Coroutine function called with the 1-based queue
+                position when the creation has to wait (optional)
+
+        Raises:
+            AdmissionError: When the user is on cooldown or the queue is full
+        """
+        key = (guild.id, user_id)
+        now = time.monotonic()
+        last = self._last_admitted.get(key)
+        if last is not None and now - last < self.user_cooldown:
+            ADMISSION_REJECTED.inc(reason="cooldown")
+            retry_after = int(self.user_cooldown - (now - last)) + 1
+            raise AdmissionError(f"You're opening tickets too quickly, try again in {retry_after}s.")
+
+        bucket = self._buckets.get(guild.id)
+        if bucket is None:
+            bucket = self._buckets[guild.id] = TokenBucket(self.rate, self.burst)
+        queue = self._queues.setdefault(guild.id, deque())
+
+        if not queue and bucket.try_take():
+            self._mark_admitted(key)
+            ADMISSION_WAIT_SECONDS.observe(0)
+            return
+
+        if len(queue) >= self.max_queue:
+            ADMISSION_REJECTED.inc(reason="queue_full")
+            raise AdmissionError("The ticket queue is full right now, please try again in a few minutes.")
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        ADMISSION_QUEUE_DEPTH.inc()
+        if guild.id not in self._workers:
+            self._workers[guild.id] = asyncio.create_task(self._drain(guild.id, bucket, queue))
+
+        if on_queued is not None:
+            try:
+                await on_queued(len(queue))
+            except Exception as e:
+                logger.warning(f"Failed to send queue position: {e}")
+
+        start = time.monotonic()
+        await waiter
+        self._mark_admitted(key)
+        ADMISSION_WAIT_SECONDS.observe(time.monotonic() - start)
+
+    def refund(self, guild, user_id):
+        """
+        Lift the cooldown charged by admit, for a creation that then failed.
+
+        Args:
+            guild: The Discord guild
+            user_id: ID of the user whose ticket wasn't created
+        """
+        self._last_admitted.pop((guild.id, user_id), None)
+
+    def _mark_admitted(self, key):
+        self._last_admitted[key] = time.monotonic()
+        # Drop expired cooldowns now and then so the map stays bounded
+        if len(self._last_admitted) > 10000:
+            cutoff = time.monotonic() - self.user_cooldown
+            self._last_admitted = {k: t for k, t in self._last_admitted.items() if t >= cutoff}
+
+    async def _drain(self, guild_id, bucket, queue):
+        """Release queued creations for one guild as tokens become available."""
+        try:
+            while queue:
+                await asyncio.sleep(bucket.time_until_token())
+                if not bucket.try_take():
+                    continue
+                # Skip waiters whose interaction went away while queued
+                while queue:
+                    waiter = queue.popleft()
+                    ADMISSION_QUEUE_DEPTH.dec()
+                    if not waiter.done():
+                        waiter.set_result(None)
+                        break
+        finally:
+            del self._workers[guild_id]
@@ -0,0 +1,213 @@
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass, field
+
+from utils import utc_timestamp
+
+logger = logging.getLogger(__name__)
+
+
+class QuantileSketch:
+    """
+    Streaming quantile estimate with a bounded relative error.
+
+    Values are counted in logarithmic buckets (the DDSketch scheme), so
+    any quantile is within relative_accuracy of the true value, memory
+    grows with the log of the value range rather than the number of
+    values, and sketches can be merged.
+    """
+
+    def __init__(self, relative_accuracy=0.02):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}  # bucket index -> count
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value <= 1e-9:
+            self.zeros += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.zeros += other.zeros
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def quantile(self, q):
+        """
+        Estimate a quantile.
+
+        Args:
+            q: The quantile, between 0 and 1
+
+        Returns:
+            float: The estimate, or None if the sketch is empty
+        """
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+@dataclass
+class TypeStats:
+    """Aggregates for one ticket type over one time bucket (or a merged window)."""
+    opened: int = 0
+    closed: int = 0
+    response: QuantileSketch = field(default_factory=QuantileSketch)  # seconds to first staff reply
+    resolution: QuantileSketch = field(default_factory=QuantileSketch)  # seconds from open to close
+
+    def merge(self, other):
+        self.opened += other.opened
+        self.closed += other.closed
+        self.response.merge(other.response)
+        self.resolution.merge(other.resolution)
+
+
+@dataclass
+class OpenTicket:
+    guild_id: int
+    ticket_type: str
+    owner_id: int
+    opened_at: float
+    responded: bool = False
+
+
+class TicketAnalytics:
+    """
+    Incrementally updated ticket statistics per guild and ticket type.
+
+    Opens, closes and first staff replies are folded into hourly buckets
+    of counters and quantile sketches as they happen, so a query only
+    merges the buckets in its window. Buckets older than the retention
+    period are dropped. On startup the buckets are rebuilt from the
+    tickets table in one query.
+    """
+
+    def __init__(self, store, retention_days=None, bucket_seconds=3600):
+        """
+        Args:
+            store: The TicketStore, used to persist first replies and rebuild on startup
+            retention_days: Days of history kept (defaults to ANALYTICS_RETENTION_DAYS)
+            bucket_seconds: Width of a time bucket
+        """
+        if retention_days is None:
+            retention_days = float(os.environ.get("ANALYTICS_RETENTION_DAYS", "30"))
+        self.store = store
+        self.retention = retention_days * 86400
+        self.bucket_seconds = bucket_seconds
+        self._buckets = {}  # guild_id -> {bucket start: {ticket_type: TypeStats}}
+        self._open = {}  # channel_id -> OpenTicket
+        self._pruned_at = 0.0
+        self._restored = False
+
+    def ticket_opened(self, guild_id, channel_id, owner_id, ticket_type, opened_at=None):
+        """Count a new ticket and start waiting for its first staff reply."""
+        opened_at = opened_at or time.time()
+        self._open[channel_id] = OpenTicket(guild_id, ticket_type, owner_id, opened_at)
+        self._stats(guild_id, ticket_type, opened_at).opened += 1
+
+    def on_message(self, message):
+        """
+        Record the first staff reply in a ticket. O(1) for every message.
+
+        Any human other than the ticket owner counts as staff.
+        """
+        ticket = self._open.get(message.channel.id)
+        if ticket is None or ticket.responded or message.author.bot or message.author.id == ticket.owner_id:
+            return
+        ticket.responded = True
+        now = message.created_at.timestamp()
+        self._stats(ticket.guild_id, ticket.ticket_type, now).response.add(now - ticket.opened_at)
+        self.store.record_first_response(message.channel.id, message.created_at)
+
+    def ticket_closed(self, channel_id, closed_at=None):
+        """Count a closed ticket and its time to close."""
+        ticket = self._open.pop(channel_id, None)
+        if ticket is None:
+            return
+        closed_at = closed_at or time.time()
+        stats = self._stats(ticket.guild_id, ticket.ticket_type, closed_at)
+        stats.closed += 1
+        stats.resolution.add(closed_at - ticket.opened_at)
+
+    def summary(self, guild_id, window=None):
+        """
+        Merge the buckets of a guild over a time window.
+
+        Args:
+            guild_id: The guild ID
+            window: Seconds to look back (defaults to the retention period)
+
+        Returns:
+            dict: ticket_type -> TypeStats
+        """
+        window = min(window or self.retention, self.retention)
+        since = time.time() - window
+        merged = {}
+        for start, types in self._buckets.get(guild_id, {}).items():
+            # Include the bucket the window starts in
+            if start + self.bucket_seconds <= since:
+                continue
+            for ticket_type, stats in types.items():
+                merged.setdefault(ticket_type, TypeStats()).merge(stats)
+        return merged
+
+    async def restore(self):
+        """Rebuild the buckets and open tickets from the tickets table, once per process."""
+        if self._restored:
+            return
+        self._restored = True
+        since = time.time() - self.retention
+        tickets = await self.store.get_tickets_since(since)
+        for ticket in tickets:
+            opened_at = utc_timestamp(ticket.opened_at)
+            if opened_at >= since:
+                self._stats(ticket.guild_id, ticket.ticket_type, opened_at).opened += 1
+            if ticket.first_response_at:
+                responded_at = utc_timestamp(ticket.first_response_at)
+                if responded_at >= since:
+                    self._stats(ticket.guild_id, ticket.ticket_type, responded_at).response.add(responded_at - opened_at)
+            if ticket.closed_at:
+                closed_at = utc_timestamp(ticket.closed_at)
+                stats = self._stats(ticket.guild_id, ticket.ticket_type, closed_at)
+                stats.closed += 1
+                stats.resolution.add(closed_at - opened_at)
+            else:
+                self._open[ticket.channel_id] = OpenTicket(
+                    ticket.guild_id, ticket.ticket_type, ticket.owner_id, opened_at,
+                    responded=ticket.first_response_at is not None
+                )
+        logger.info(f"Ticket analytics rebuilt from {len(tickets)} ticket(s)")
+
+    def _stats(self, guild_id, ticket_type, at):
+        start = at - at % self.bucket_seconds
+        if start > self._pruned_at:
+            self._prune(start)
+        types = self._buckets.setdefault(guild_id, {}).setdefault(start, {})
+        stats = types.get(ticket_type)
+        if stats is None:
+            stats = types[ticket_type] = TypeStats()
+        return stats
+
+    def _prune(self, now):
+        """Drop buckets past the retention period, at most once per bucket."""
+        self._pruned_at = now
+        cutoff = now - self.retention
+        for buckets in self._buckets.values():
+            for start in [start for start in buckets if start < cutoff]:
+                del buckets[start]
@@ -0,0 +1,271 @@
+import asyncio
+import heapq
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+import discord
+
+from metrics import Counter, Gauge
+from utils import utc_timestamp
+
+logger = logging.getLogger(__name__)
+
+AUTO_CLOSE_ACTIONS = Counter("ticket_auto_close_total", "Idle ticket warnings and auto-closes, by action")
+
+
+def to_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def format_duration(seconds):
+    """Describe a duration in the largest whole unit, e.g. "2 days" or "45 minutes"."""
+    for unit, size in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds >= size:
+            count = round(seconds / size)
+            return f"{count} {unit}{'s' if count != 1 else ''}"
+    return f"{round(seconds)} seconds"
+
+
+class AutoCloseScheduler:
+    """
+    Closes tickets that have been idle longer than their guild's threshold.
+
+    Messages only update a timestamp in a dict. A single task sleeps until
+    the earliest deadline in a heap of (due time, channel ID) timers;
+    when a timer fires, the ticket's deadline is recomputed from its latest
+    activity and either re-armed, answered with a warning, or closed.
+    Timers left behind by activity are skipped when they come up, so no
+    ticket ever has its own task and nothing scans the channel list.
+
+    Activity and warnings are written to the TicketStore, so deadlines
+    carry over restarts.
+    """
+
+    def __init__(self, registry, guild_config, store, get_channel, default_hours=None, warning_lead=None):
+        """
+        Args:
+            registry: The TicketRegistry of open tickets
+            guild_config: The GuildConfigStore holding per-guild thresholds
+            store: The TicketStore persisting activity
+            get_channel: Callable returning a channel by ID (bot.get_channel)
+            default_hours: Idle hours before closing for guilds without a setting
+                (defaults to AUTO_CLOSE_HOURS, 0 disables auto-close)
+            warning_lead: Seconds between the warning and the close
+                (defaults to AUTO_CLOSE_WARNING_MINUTES)
+        """
+        self.registry = registry
+        self.guild_config = guild_config
+        self.store = store
+        self.get_channel = get_channel
+        if default_hours is None:
+            default_hours = float(os.environ.get("AUTO_CLOSE_HOURS", "0"))
+        if warning_lead is None:
+            warning_lead = float(os.environ.get("AUTO_CLOSE_WARNING_MINUTES", "60")) * 60
+        self.default_hours = default_hours
+        self.warning_lead = warning_lead
+        # Set by setup_commands, closes a ticket the same way !close does
+        self.on_close = None
+
+        self._activity = {}  # channel_id -> last activity, epoch seconds
+        self._warned = {}  # channel_id -> time the idle warning was sent
+        self._scheduled = {}  # channel_id -> due time of its live timer
+        self._heap = []  # (due time, channel_id), may hold stale timers
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._actions = set()
+
+        Gauge("ticket_auto_close_timers", "Tickets with an auto-close timer", callback=lambda: len(self._scheduled))
+
+    def start(self):
+        """Start the timer task."""
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the timer task."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_hours(self, guild_id):
+        hours = self.guild_config.get(guild_id).auto_close_hours
+        return self.default_hours if hours is None else hours
+
+    def track(self, channel_id, last_activity=None, warned_at=None):
+        """
+        Start tracking a ticket channel.
+
+        Args:
+            channel_id: The ticket channel ID
+            last_activity: Epoch seconds of the last activity (defaults to now)
+            warned_at: Epoch seconds the idle warning was sent, if it was
+        """
+        self._activity[channel_id] = last_activity or time.time()
+        if warned_at:
+            self._warned[channel_id] = warned_at
+        self._schedule(channel_id, time.time())
+
+    def last_activity(self, channel_id):
+        """Epoch seconds of the last activity in a ticket, or None if it isn't tracked."""
+        return self._activity.get(channel_id)
+
+    def touch(self, channel_id):
+        """Record activity in a ticket channel. O(1), called for every message."""
+        if channel_id not in self._activity:
+            return
+        now = time.time()
+        self._activity[channel_id] = now
+        self._warned.pop(channel_id, None)
+        self.store.record_activity(channel_id, to_datetime(now))
+
+    def forget(self, channel_id):
+        """Stop tracking a ticket channel, its timer is dropped when it comes up."""
+        self._activity.pop(channel_id, None)
+        self._warned.pop(channel_id, None)
+        self._scheduled.pop(channel_id, None)
+
+    def reschedule_guild(self, guild_id):
+        """Re-check every ticket of a guild, after its threshold changed."""
+        now = time.time()
+        for entry in self.registry.open_tickets(guild_id):
+            if entry.channel_id in self._activity:
+                self._schedule(entry.channel_id, now)
+
+    async def restore(self, guilds):
+        """
+        Track every open ticket after a restart.
+
+        Stored activity is used where there is some. Messages sent while
+        the bot was offline are picked up from the channel's last message
+        ID, and tickets without either count from their creation.
+
+        Args:
+            guilds: Iterable of Discord guilds
+        """
+        entries = [
+            entry for guild in guilds for entry in self.registry.open_tickets(guild.id)
+            if entry.channel_id not in self._activity
+        ]
+        stored = await self.store.get_ticket_activity(entry.channel_id for entry in entries)
+
+        for entry in entries:
+            channel = self.get_channel(entry.channel_id)
+            if channel is None:
+                continue
+            last_message = discord.utils.snowflake_time(channel.last_message_id).timestamp() if channel.last_message_id else 0
+            row = stored.get(entry.channel_id)
+            if row:
+                last_activity = utc_timestamp(row.last_activity_at)
+                warned_at = utc_timestamp(row.warned_at) if row.warned_at else None
+                # The warning is the bot's own message, anything after it was missed while offline
+                if last_message > max(last_activity, warned_at or 0) + 60:
+                    last_activity, warned_at = last_message, None
+            else:
+                last_activity = max(last_message, channel.created_at.timestamp())
+                warned_at = None
+            self.track(entry.channel_id, last_activity, warned_at)
+
+        logger.info(f"Auto-close tracking {len(entries)} open ticket(s)")
+
+    def _schedule(self, channel_id, due):
+        self._scheduled[channel_id] = due
+        heapq.heappush(self._heap, (due, channel_id))
+        if self._heap[0][1] == channel_id:
+            self._wakeup.set()
+
+    async def _run(self):
+        """Sleep until the earliest timer is due and check the tickets that are."""
+        while True:
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                due, channel_id = heapq.heappop(self._heap)
+                # Skip timers that were replaced or whose ticket is gone
+                if self._scheduled.get(channel_id) != due:
+                    continue
+                del self._scheduled[channel_id]
+                try:
+                    self._check(channel_id, now)
+                except Exception as e:
+                    logger.error(f"Auto-close check failed for channel {channel_id}: {e}")
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _check(self, channel_id, now):
+        """Warn about or close an idle ticket, or re-arm its timer."""
+        entry = self.registry.get_ticket_by_channel(channel_id)
+        if entry is None:
+            self.forget(channel_id)
+            return
+
+        hours = self.get_hours(entry.guild_id)
+        if not hours:
+            # Disabled, reschedule_guild re-arms the timer if it gets enabled
+            return
+
+        threshold = hours * 3600
+        lead = min(self.warning_lead, threshold / 2)
+        last_activity = self._activity[channel_id]
+        warned_at = self._warned.get(channel_id)
+
+        if warned_at:
+            close_at = max(last_activity + threshold, warned_at + lead)
+            if now < close_at:
+                self._schedule(channel_id, close_at)
+                return
+            self._spawn(self._close(entry, threshold))
+            # Check again later in case the close fails and the ticket stays open
+            self._schedule(channel_id, now + lead)
+            return
+
+        warn_at = last_activity + threshold - lead
+        if now < warn_at:
+            self._schedule(channel_id, warn_at)
+            return
+
+        self._warned[channel_id] = now
+        self.store.record_activity(channel_id, to_datetime(last_activity), to_datetime(now))
+        self._spawn(self._warn(entry, threshold, lead))
+        self._schedule(channel_id, now + lead)
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._actions.add(task)
+        task.add_done_callback(self._actions.discard)
+
+    async def _warn(self, entry, threshold, lead):
+        channel = self.get_channel(entry.channel_id)
+        if channel is None:
+            return
+        # Legacy tickets may have no known owner to mention
+        prefix = f"<@{entry.owner_id}> this" if entry.owner_id else "This"
+        try:
+            await channel.send(
+                f"{prefix} ticket has had no activity for {format_duration(threshold - lead)}. "
+                f"It will be closed automatically in {format_duration(lead)} unless someone replies."
+            )
+            AUTO_CLOSE_ACTIONS.inc(action="warned")
+        except discord.HTTPException as e:
+            logger.error(f"Failed to send idle warning in channel {entry.channel_id}: {e}")
+
+    async def _close(self, entry, threshold):
+        channel = self.get_channel(entry.channel_id)
+        if channel is None or self.on_close is None:
+            return
+        logger.info(f"Auto-closing idle ticket #{channel.name} in {channel.guild.name}")
+        closing = await self.on_close(
+            channel.guild, channel, entry, channel.guild.me,
+            reason=f"No activity for {format_duration(threshold)}"
+        )
+        if closing:
+            AUTO_CLOSE_ACTIONS.inc(action="closed")
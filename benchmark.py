@@ -0,0 +1,771 @@
+"""
+Offline load test for the ticket flow.
+
+Runs the real bot (commands, views, background services) against the
+in-process FakeDiscord REST/gateway stand-in, with N simulated users in
+each of M guilds opening and closing tickets concurrently. No network
+access or Discord token is needed.
+
+The --startup mode instead compares resident memory and time-to-ready
+of the default and lean gateway settings across guild sizes, and the
+--dispatch mode times on_message against the old process_commands path
+for chatter, other bots' messages and commands.
+
+Usage:
+    python benchmark.py --guilds 3 --users 50
+    python benchmark.py --guilds 1 --users 200 --no-rate-limits --json
+    python benchmark.py --startup --guild-sizes 100,1000,10000
+    python benchmark.py --dispatch 20000
+    python benchmark.py --logging 5000
+    python benchmark.py --dice 1000000
+    python benchmark.py --restarts 5
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+logger = logging.getLogger("benchmark")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed):
+    return {
+        "count": len(latencies),
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies, default=0) * 1000, 1),
+    }
+
+
+class LoadTest:
+    """Drives the bot's real handlers through FakeDiscord and collects timings."""
+
+    def __init__(self, fake, bot, guild_count, users_per_guild, ticket_type="Support", timeout=120.0):
+        self.fake = fake
+        self.bot = bot
+        self.guild_count = guild_count
+        self.users_per_guild = users_per_guild
+        self.ticket_type = ticket_type
+        self.timeout = timeout
+        self.guilds = []  # (guild payload, admin payload, user payloads, create-ticket message)
+        self.general_channels = {}  # guild_id -> ID of the channel admin commands are run in
+        self.tickets = []  # (guild_id, user payload, channel_id)
+        self.failures = 0
+
+    async def setup_guilds(self):
+        """Create the guilds and run !setup_tickets in each of them."""
+        for index in range(self.guild_count):
+            admin = self.fake.user_payload(f"admin{index}")
+            users = [self.fake.user_payload(f"user-{index}-{n}") for n in range(self.users_per_guild)]
+            guild = self.fake.add_guild(f"Guild {index}", admin, users)
+
+            # A general channel to run setup from
+            general = await self.bot.http.create_channel(int(guild["id"]), 0, name="general")
+            self.general_channels[guild["id"]] = general["id"]
+            await asyncio.sleep(self.fake.gateway_latency * 2)
+
+            button_message = self.fake.wait_for(
+                lambda kind, data: kind == "message" and data.get("components")
+                and data["guild_id"] == guild["id"],
+                self.timeout
+            )
+            self.fake.send_message(general["id"], admin, f"{self.bot.command_prefix}setup_tickets")
+            message = await button_message
+            self.guilds.append((guild, admin, users, message))
+
+        self.bot.ticket_registry.build(self.bot.guilds)
+
+    async def open_ticket(self, guild, user, button_message):
+        """Click Create Ticket, pick a type and wait for the ticket channel."""
+        start = time.perf_counter()
+        button_id = button_message["components"][0]["components"][0]["custom_id"]
+
+        token = self.fake.click(guild["id"], button_message["channel_id"], user, button_message, button_id)
+        response = await self.fake.wait_for(
+            lambda kind, data: kind == "interaction_response" and data["token"] == token, self.timeout
+        )
+        select_message = response["message"]
+        select_id = select_message["components"][0]["components"][0]["custom_id"]
+
+        token = self.fake.click(
+            guild["id"], button_message["channel_id"], user, select_message, select_id,
+            component_type=3, values=[self.ticket_type]
+        )
+        followup = await self.fake.wait_for(
+            lambda kind, data: kind == "followup" and data["token"] == token
+            and not data["message"]["content"].startswith("Lots of tickets"),
+            self.timeout
+        )
+        content = followup["message"]["content"]
+        if not content.startswith("Ticket created"):
+            raise RuntimeError(content)
+
+        channel_id = content.rsplit("<#", 1)[1].rstrip(">")
+        self.tickets.append((guild["id"], user, channel_id))
+        return time.perf_counter() - start
+
+    async def close_ticket(self, user, channel_id):
+        """Run !close in a ticket channel and wait for the channel to be deleted."""
+        start = time.perf_counter()
+        deleted = self.fake.wait_for(lambda kind, data: kind == "channel_delete" and data["id"] == channel_id, self.timeout)
+        self.fake.send_message(channel_id, user, f"{self.bot.command_prefix}close")
+        await deleted
+        return time.perf_counter() - start
+
+    async def bulk_close(self, guild, admin, action="bulkclose"):
+        """Run a confirmed bulk close in a guild and wait for its summary."""
+        start = time.perf_counter()
+        channel_id = self.general_channels[guild["id"]]
+        summary = self.fake.wait_for(
+            lambda kind, data: kind == "message" and data["channel_id"] == channel_id
+            and " in " in data["content"] and "ticket(s)" in data["content"] and "/" in data["content"],
+            self.timeout
+        )
+        self.fake.send_message(channel_id, admin, f"{self.bot.command_prefix}{action} confirm")
+        message = await summary
+        logger.info(message["content"])
+        done, total = message["content"].split(" ", 1)[0].split("/")
+        if done != total:
+            raise RuntimeError(message["content"])
+        return time.perf_counter() - start
+
+    async def run_phase(self, coros):
+        """Run coroutines concurrently, returning the latencies of those that succeeded."""
+        results = await asyncio.gather(*coros, return_exceptions=True)
+        latencies = []
+        for result in results:
+            if isinstance(result, BaseException):
+                self.failures += 1
+                logger.warning(f"Simulated user failed: {result!r}")
+            else:
+                latencies.append(result)
+        return latencies
+
+    async def bench_log_events(self, count):
+        """Queue ticket log events like create_ticket does and time until every log message is sent."""
+        import discord
+
+        guild = self.bot.get_guild(int(self.guilds[0][0]["id"]))
+        # Members aren't cached without the members intent, log as the bot itself
+        member = guild.me
+        before = self.fake.requests.get("POST /channels/{channel_id}/messages", 0)
+        start = time.perf_counter()
+        for _ in range(count):
+            embed = discord.Embed(
+                title="Ticket Created",
+                description=f"Ticket created by {member.mention}",
+                color=discord.Color.green(),
+                timestamp=discord.utils.utcnow()
+            )
+            self.bot.log_dispatcher.enqueue(guild, embed)
+        enqueue_elapsed = time.perf_counter() - start
+        await self.bot.log_dispatcher.close()
+        elapsed = time.perf_counter() - start
+        return {
+            "events": count,
+            "enqueue_us_per_event": round(enqueue_elapsed / count * 1e6, 2) if count else 0.0,
+            "drain_s": round(elapsed, 3),
+            "messages_sent": self.fake.requests.get("POST /channels/{channel_id}/messages", 0) - before,
+        }
+
+
+async def run(args):
+    # Import after the environment is configured, setup_bot reads it
+    import discord
+    from bot import setup_bot
+    from fake_discord import FakeDiscord
+
+    fake = FakeDiscord(latency_scale=args.latency_scale, rate_limits=args.rate_limits, gateway_latency=args.gateway_latency)
+    await fake.start()
+
+    bot = setup_bot(lean=args.lean)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    report = {
+        "config": {
+            "guilds": args.guilds,
+            "users_per_guild": args.users,
+            "latency_scale": args.latency_scale,
+            "rate_limits": args.rate_limits,
+            "lean": args.lean,
+        }
+    }
+    try:
+        async with bot:
+            await bot.login("fake-token")
+            fake.attach(bot)
+            test = LoadTest(fake, bot, args.guilds, args.users, timeout=args.timeout)
+
+            start = time.perf_counter()
+            await test.setup_guilds()
+            report["setup_s"] = round(time.perf_counter() - start, 3)
+
+            requests_before = sum(fake.requests.values())
+            start = time.perf_counter()
+            latencies = await test.run_phase(
+                test.open_ticket(guild, user, message)
+                for guild, _, users, message in test.guilds
+                for user in users
+            )
+            report["open"] = summarize(latencies, time.perf_counter() - start)
+
+            if args.bulk:
+                start = time.perf_counter()
+                await test.run_phase(test.bulk_close(guild, admin, args.bulk) for guild, admin, _, _ in test.guilds)
+                report["bulk"] = {"action": args.bulk, "tickets": len(test.tickets), "elapsed_s": round(time.perf_counter() - start, 2)}
+            elif args.close:
+                start = time.perf_counter()
+                latencies = await test.run_phase(test.close_ticket(user, channel_id) for _, user, channel_id in test.tickets)
+                report["close"] = summarize(latencies, time.perf_counter() - start)
+
+            tickets = max(1, len(test.tickets))
+            report["rest_calls_per_ticket"] = round((sum(fake.requests.values()) - requests_before) / tickets, 2)
+
+            if args.log_events:
+                report["log_events"] = await test.bench_log_events(args.log_events)
+
+            report["failures"] = test.failures
+            report["rest_calls"] = dict(sorted(fake.requests.items()))
+            report["rate_limited"] = dict(sorted(fake.rate_limited.items()))
+
+            if args.tracemalloc:
+                current, peak = tracemalloc.get_traced_memory()
+                report["tracemalloc_peak_mb"] = round(peak / 1e6, 2)
+                tracemalloc.stop()
+            # ru_maxrss is in KiB on Linux
+            report["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+            report["rss_growth_mb"] = round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024, 1)
+    finally:
+        await fake.close()
+        discord.http.Route.BASE = f"https://discord.com/api/v{discord.http.INTERNAL_API_VERSION}"
+
+    return report
+
+
+async def measure_startup(args, lean, guild_size):
+    """
+    Connect a fresh bot to guilds of guild_size members and measure it.
+
+    After READY, each guild gets --chatter messages and typing events from
+    random members, which is what fills the message and member caches.
+
+    Returns:
+        dict: Time-to-ready, heap growth and cache sizes
+    """
+    import random
+    import discord
+    from bot import setup_bot
+    from fake_discord import FakeDiscord
+
+    fake = FakeDiscord(latency_scale=0, rate_limits=False, gateway_latency=0)
+    await fake.start()
+    bot = setup_bot(lean=lean)
+    # Shorten discord.py's wait for further GUILD_CREATEs so it doesn't dominate
+    bot._connection.guild_ready_timeout = args.guild_ready_timeout
+    try:
+        async with bot:
+            await bot.login("fake-token")
+            fake.attach(bot)
+
+            guilds = []
+            for index in range(args.guilds):
+                owner = fake.user_payload(f"owner{index}")
+                members = [fake.user_payload(f"member-{index}-{n}") for n in range(guild_size)]
+                guilds.append((fake.guild_payload(f"Guild {index}", owner, members, channels=["general"]), members))
+
+            gc.collect()
+            baseline = tracemalloc.get_traced_memory()[0]
+            ready_s = await fake.connect([guild for guild, _ in guilds])
+
+            for guild, members in guilds:
+                channel_id = guild["channels"][0]["id"]
+                for _ in range(args.chatter):
+                    author = random.choice(members)
+                    fake.typing(channel_id, author)
+                    fake.dispatch("MESSAGE_CREATE", fake.message_payload(channel_id, author, "hello"))
+                await asyncio.sleep(0)
+            # Let the queued gateway events run
+            await asyncio.sleep(0.1)
+
+            gc.collect()
+            heap = tracemalloc.get_traced_memory()[0] - baseline
+            return {
+                "mode": "lean" if lean else "default",
+                "guild_size": guild_size,
+                "ready_s": round(ready_s, 3),
+                "heap_mb": round(heap / 1e6, 2),
+                "cached_members": sum(len(guild.members) for guild in bot.guilds),
+                "cached_messages": len(bot.cached_messages),
+            }
+    finally:
+        await fake.close()
+        discord.http.Route.BASE = f"https://discord.com/api/v{discord.http.INTERNAL_API_VERSION}"
+
+
+async def run_startup(args):
+    """Measure the default and lean gateway settings for every guild size."""
+    tracemalloc.start()
+    results = []
+    try:
+        for guild_size in args.guild_sizes:
+            for lean in (False, True):
+                results.append(await measure_startup(args, lean, guild_size))
+    finally:
+        tracemalloc.stop()
+    return {
+        "config": {"guilds": args.guilds, "chatter": args.chatter, "guild_ready_timeout": args.guild_ready_timeout},
+        "results": results,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+async def run_restarts(args):
+    """
+    Restart the bot repeatedly with and without the command hash check.
+
+    "always" syncs the slash command tree on every start, as a bot
+    without the check would; "auto" only syncs when the stored hash of
+    the command definitions differs. Each mode gets its own database, so
+    its first start syncs and the rest show the steady state of a
+    restart or deploy. Startup is timed from login to ready; the sync
+    runs in the background after ready and is timed until it finishes.
+
+    Returns:
+        dict: Per mode, the startup and sync time of each restart and the syncs made
+    """
+    import discord
+    from bot import setup_bot
+    from fake_discord import FakeDiscord
+
+    workdir = tempfile.mkdtemp(prefix="ticket-restarts-")
+    results = []
+    for mode in ("always", "auto"):
+        # A fresh fake per mode, so one mode's rate limits don't slow the other
+        fake = FakeDiscord(latency_scale=args.latency_scale, rate_limits=args.rate_limits, gateway_latency=args.gateway_latency)
+        await fake.start()
+        owner = fake.user_payload("owner")
+        guilds = [
+            fake.guild_payload(f"Guild {index}", owner, [fake.user_payload(f"member-{index}-{n}") for n in range(args.users)], channels=["general"])
+            for index in range(args.guilds)
+        ]
+        # Read by TicketStore and CommandTreeSync when the bot is set up
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, f'{mode}.db')}"
+        os.environ["COMMAND_SYNC"] = mode
+        startups = []
+        synced = []
+        try:
+            for _ in range(args.restarts):
+                bot = setup_bot()
+                bot._connection.guild_ready_timeout = args.guild_ready_timeout
+                async with bot:
+                    start = time.perf_counter()
+                    await bot.login("fake-token")
+                    fake.attach(bot)
+                    await fake.connect(guilds)
+                    startups.append(time.perf_counter() - start)
+                    # Let the sync finish so the next start sees its stored hash
+                    await bot.command_sync_task
+                    synced.append(time.perf_counter() - start)
+        finally:
+            await fake.close()
+            discord.http.Route.BASE = f"https://discord.com/api/v{discord.http.INTERNAL_API_VERSION}"
+        results.append({
+            "mode": mode,
+            "restarts": len(startups),
+            "syncs": fake.requests.get("PUT /applications/{application_id}/commands", 0),
+            "first_s": round(startups[0], 3),
+            "later_p50_s": round(percentile(startups[1:], 50), 3),
+            "later_max_s": round(max(startups[1:], default=0), 3),
+            "total_s": round(sum(startups), 3),
+            "later_synced_max_s": round(max(synced[1:], default=0), 3),
+        })
+    return {
+        "config": {"restarts": args.restarts, "guilds": args.guilds, "users_per_guild": args.users, "latency_scale": args.latency_scale},
+        "results": results,
+    }
+
+
+async def run_dispatch(args):
+    """
+    Time the on_message handler per kind of message, with and without the fast path.
+
+    The "process_commands" handler is on_message as it was before the
+    dispatcher: every message other than the bot's own goes through
+    bot.process_commands. Commands run a no-op command, so only the
+    dispatch cost is measured.
+
+    Returns:
+        dict: Messages per second and microseconds per message by handler and kind
+    """
+    import discord
+    from bot import setup_bot
+    from fake_discord import FakeDiscord
+
+    fake = FakeDiscord(latency_scale=0, rate_limits=False, gateway_latency=0)
+    await fake.start()
+    bot = setup_bot(lean=args.lean)
+    bot._connection.guild_ready_timeout = args.guild_ready_timeout
+
+    @bot.command(name="benchnoop")
+    async def benchnoop_command(ctx):
+        pass
+
+    async def process_commands(message):
+        if message.author == bot.user:
+            return
+        bot.auto_close.touch(message.channel.id)
+        bot.analytics.on_message(message)
+        await bot.process_commands(message)
+
+    try:
+        async with bot:
+            await bot.login("fake-token")
+            fake.attach(bot)
+            owner = fake.user_payload("owner")
+            members = [fake.user_payload(f"member-{n}") for n in range(10)]
+            other_bot = fake.user_payload("otherbot", bot=True)
+            guild = fake.guild_payload("Guild", owner, members + [other_bot], channels=["general"])
+            await fake.connect([guild])
+            channel_id = guild["channels"][0]["id"]
+            channel = bot.get_channel(int(channel_id))
+
+            def messages(author_for, content):
+                return [
+                    discord.Message(state=bot._connection, channel=channel, data=fake.message_payload(channel_id, author_for(n), content))
+                    for n in range(args.dispatch)
+                ]
+            kinds = {
+                "chatter": messages(lambda n: members[n % len(members)], "hello there, anyone around?"),
+                "bot": messages(lambda n: other_bot, "automated update"),
+                "command": messages(lambda n: members[n % len(members)], f"{bot.command_prefix}benchnoop"),
+            }
+
+            results = []
+            for name, handler in (("process_commands", process_commands), ("fast_path", bot.on_message)):
+                for kind, batch in kinds.items():
+                    gc.collect()
+                    start = time.perf_counter()
+                    for message in batch:
+                        await handler(message)
+                    elapsed = time.perf_counter() - start
+                    results.append({
+                        "handler": name,
+                        "kind": kind,
+                        "messages_per_s": round(len(batch) / elapsed),
+                        "us_per_message": round(elapsed / len(batch) * 1e6, 2),
+                    })
+            from dispatch import MESSAGES_TOTAL
+            counters = {",".join(f"{k}={v}" for k, v in key): value for key, value in MESSAGES_TOTAL.values.items()}
+            return {"config": {"messages_per_kind": args.dispatch, "lean": args.lean}, "results": results, "counters": counters}
+    finally:
+        await fake.close()
+        discord.http.Route.BASE = f"https://discord.com/api/v{discord.http.INTERNAL_API_VERSION}"
+
+
+def bench_logging(args):
+    """
+    Time logger.info calls with a slow log sink, logging inline and through the queue.
+
+    The sink sleeps --log-write-delay seconds per write, standing in for a
+    stdout pipe that a collector reads slowly.
+
+    Returns:
+        dict: Microseconds per call by mode, and records dropped
+    """
+    from logging_setup import LOG_RECORDS_DROPPED, configure_logging, stop_logging
+
+    class SlowStream:
+        def write(self, text):
+            time.sleep(args.log_write_delay)
+
+        def flush(self):
+            pass
+
+    bench_logger = logging.getLogger("benchmark.logging")
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    results = []
+    try:
+        for mode in ("inline", "queue"):
+            if mode == "inline":
+                handler = logging.StreamHandler(SlowStream())
+                handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+                root.handlers = [handler]
+                root.setLevel(logging.INFO)
+            else:
+                configure_logging(level=logging.INFO, stream=SlowStream())
+            durations = []
+            for n in range(args.log_records):
+                start = time.perf_counter()
+                bench_logger.info(f"Command ping finished in {n % 50}ms", extra={"latency_ms": n % 50})
+                durations.append(time.perf_counter() - start)
+            results.append({
+                "mode": mode,
+                "mean_us": round(sum(durations) / len(durations) * 1e6, 2),
+                "p99_us": round(percentile(durations, 99) * 1e6, 2),
+            })
+    finally:
+        stop_logging()
+        root.handlers, root.level = saved_handlers, saved_level
+    return {
+        "config": {"records": args.log_records, "write_delay_ms": args.log_write_delay * 1000},
+        "results": results,
+        "dropped": {",".join(f"{k}={v}" for k, v in key): value for key, value in LOG_RECORDS_DROPPED.values.items()},
+    }
+
+
+def bench_dice(args):
+    """
+    Time the NumPy dice engine against the random.randint loop roll used before.
+
+    The loop keeps the highest dice by sorting each roll in Python, the
+    way it would have to be extended to support keep-highest.
+
+    Returns:
+        dict: Milliseconds per case for the loop and the engine
+    """
+    import random
+    from dice import parse_dice
+
+    def loop_roll(count, sides):
+        return sum(random.randint(1, sides) for _ in range(count))
+
+    def loop_keep_highest(count, sides, keep):
+        return sum(sorted(random.randint(1, sides) for _ in range(count))[-keep:])
+
+    def timed(function, repeat=1):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            function()
+        return (time.perf_counter() - start) / repeat * 1000
+
+    trials = args.dice
+    cases = [
+        ("roll 1d6", lambda: loop_roll(1, 6), lambda: parse_dice("1d6").roll(), 1000),
+        ("roll 100d6", lambda: loop_roll(100, 6), lambda: parse_dice("100d6").roll(), 1000),
+        ("roll 100000d6", lambda: loop_roll(100_000, 6), lambda: parse_dice("100000d6").roll(), 3),
+        (
+            f"simulate 3d6 x{trials:,}",
+            lambda: [loop_roll(3, 6) for _ in range(trials)],
+            lambda: parse_dice("3d6").simulate(trials), 1
+        ),
+        (
+            f"simulate 4d6kh3 x{trials:,}",
+            lambda: [loop_keep_highest(4, 6, 3) for _ in range(trials)],
+            lambda: parse_dice("4d6kh3").simulate(trials), 1
+        ),
+    ]
+    results = []
+    for name, loop, engine, repeat in cases:
+        loop_ms, engine_ms = timed(loop, repeat), timed(engine, repeat)
+        results.append({
+            "case": name,
+            "loop_ms": round(loop_ms, 3),
+            "numpy_ms": round(engine_ms, 3),
+            "speedup": round(loop_ms / engine_ms, 1),
+        })
+    return {"config": {"trials": trials}, "results": results}
+
+
+def print_dice_report(report):
+    print(f"Config: {report['config']}")
+    print(f"{'case':<28} {'loop':>12} {'numpy':>12} {'speedup':>8}")
+    for result in report["results"]:
+        print(f"{result['case']:<28} {result['loop_ms']:>10}ms {result['numpy_ms']:>10}ms {result['speedup']:>7}x")
+
+
+def print_logging_report(report):
+    print(f"Config: {report['config']}")
+    for result in report["results"]:
+        print(f"{result['mode']:<7} mean {result['mean_us']}us, p99 {result['p99_us']}us per logger.info call")
+    print(f"Dropped: {report['dropped'] or 'none'}")
+
+
+def print_restarts_report(report):
+    print(f"Config: {report['config']}")
+    print(f"{'sync':<8} {'restarts':>8} {'syncs':>6} {'first':>8} {'later p50':>10} {'later max':>10} {'total':>8} {'synced max':>11}")
+    for result in report["results"]:
+        print(
+            f"{result['mode']:<8} {result['restarts']:>8} {result['syncs']:>6} "
+            f"{result['first_s']:>7}s {result['later_p50_s']:>9}s {result['later_max_s']:>9}s {result['total_s']:>7}s "
+            f"{result['later_synced_max_s']:>10}s"
+        )
+
+
+def print_dispatch_report(report):
+    print(f"Config: {report['config']}")
+    print(f"{'handler':<17} {'kind':<8} {'msgs/s':>10} {'us/msg':>8}")
+    for result in report["results"]:
+        print(f"{result['handler']:<17} {result['kind']:<8} {result['messages_per_s']:>10} {result['us_per_message']:>8}")
+    print(f"Fast path counters: {report['counters']}")
+
+
+def print_startup_report(report):
+    print(f"Config: {report['config']}")
+    print(f"{'mode':<8} {'members':>8} {'ready':>8} {'heap':>10} {'cached members':>15} {'cached messages':>16}")
+    for result in report["results"]:
+        print(
+            f"{result['mode']:<8} {result['guild_size']:>8} {result['ready_s']:>7}s {result['heap_mb']:>8}MB "
+            f"{result['cached_members']:>15} {result['cached_messages']:>16}"
+        )
+    print(f"Max RSS: {report['max_rss_mb']}MB")
+
+
+def print_report(report):
+    print(f"Config: {report['config']}")
+    print(f"Setup: {report['setup_s']}s")
+    for phase in ("open", "close"):
+        if phase in report:
+            stats = report[phase]
+            print(
+                f"{phase.capitalize():>6}: {stats['count']} tickets, {stats['throughput_per_s']}/s, "
+                f"p50 {stats['p50_ms']}ms, p99 {stats['p99_ms']}ms, max {stats['max_ms']}ms"
+            )
+    if "bulk" in report:
+        bulk = report["bulk"]
+        print(f"  Bulk: {bulk['action']} of {bulk['tickets']} tickets in {bulk['elapsed_s']}s")
+    print(f"REST calls per ticket: {report['rest_calls_per_ticket']}")
+    if "log_events" in report:
+        print(f"Log events: {report['log_events']}")
+    print(f"Failures: {report['failures']}")
+    print(f"429s: {report['rate_limited'] or 'none'}")
+    print(f"Max RSS: {report['max_rss_mb']}MB (+{report['rss_growth_mb']}MB during run)")
+    if "tracemalloc_peak_mb" in report:
+        print(f"tracemalloc peak: {report['tracemalloc_peak_mb']}MB")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test for the ticket bot")
+    parser.add_argument("--guilds", type=int, default=2, help="Number of simulated guilds")
+    parser.add_argument("--users", type=int, default=25, help="Simulated users per guild, each opens one ticket")
+    parser.add_argument("--no-close", dest="close", action="store_false", help="Skip the close phase")
+    parser.add_argument(
+        "--bulk", choices=("bulkclose", "bulkarchive"),
+        help="Close the tickets with one bulk admin command per guild instead of !close in each"
+    )
+    parser.add_argument("--log-events", type=int, default=100, help="Ticket log events to queue and time (0 to skip)")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for simulated REST latency")
+    parser.add_argument("--gateway-latency", type=float, default=0.02, help="Simulated gateway event delay in seconds")
+    parser.add_argument("--no-rate-limits", dest="rate_limits", action="store_false", help="Never answer with 429s")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for any single step")
+    parser.add_argument("--tracemalloc", action="store_true", help="Track Python allocations (slower)")
+    parser.add_argument("--lean", action="store_true", help="Run the bot with lean intents and caches")
+    parser.add_argument("--startup", action="store_true", help="Compare default and lean startup memory and time-to-ready")
+    parser.add_argument(
+        "--guild-sizes", type=lambda value: [int(size) for size in value.split(",")], default=[100, 1000, 10000],
+        help="Comma-separated member counts per guild for --startup"
+    )
+    parser.add_argument(
+        "--dispatch", type=int, default=0, metavar="N",
+        help="Time on_message with N messages of each kind instead of the load test"
+    )
+    parser.add_argument(
+        "--logging", dest="log_records", type=int, default=0, metavar="N",
+        help="Time N logger.info calls logging inline and through the queue instead of the load test"
+    )
+    parser.add_argument("--log-write-delay", type=float, default=0.0005, help="Seconds each log write takes for --logging")
+    parser.add_argument(
+        "--dice", type=int, default=0, metavar="TRIALS",
+        help="Time dice rolls and TRIALS-roll simulations against the old randint loop instead of the load test"
+    )
+    parser.add_argument(
+        "--restarts", type=int, default=0, metavar="N",
+        help="Time N restarts syncing slash commands on every start and only when they change, instead of the load test"
+    )
+    parser.add_argument("--chatter", type=int, default=500, help="Messages per guild after READY for --startup")
+    parser.add_argument("--guild-ready-timeout", type=float, default=0.1, help="discord.py's wait for more guilds for --startup")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra bot environment settings")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show bot logs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    workdir = tempfile.mkdtemp(prefix="ticket-bench-")
+    # Keep the benchmark's side effects out of the working tree, and let
+    # ticket creation run as fast as the simulated API allows unless told otherwise
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'tickets.db')}")
+    os.environ.setdefault("TRANSCRIPT_DIR", os.path.join(workdir, "transcripts"))
+    os.environ.setdefault("PROFILE_DIR", os.path.join(workdir, "profiles"))
+    os.environ.setdefault("TICKET_RATE", "1000")
+    os.environ.setdefault("TICKET_BURST", "1000")
+    os.environ.setdefault("TICKET_QUEUE_SIZE", "100000")
+    for setting in args.env:
+        key, _, value = setting.partition("=")
+        os.environ[key] = value
+
+    if args.dice:
+        report = bench_dice(args)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_dice_report(report)
+        return 0
+
+    if args.log_records:
+        report = bench_logging(args)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_logging_report(report)
+        return 0
+
+    if args.dispatch:
+        report = asyncio.run(run_dispatch(args))
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_dispatch_report(report)
+        return 0
+
+    if args.restarts:
+        report = asyncio.run(run_restarts(args))
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_restarts_report(report)
+        return 0
+
+    if args.startup:
+        report = asyncio.run(run_startup(args))
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_startup_report(report)
+        return 0
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
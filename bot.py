@@ -1,42 +1,254 @@
 import discord
 from discord.ext import commands
+import asyncio
 import logging
 import os
 from commands import setup_commands
+from dispatch import CommandDispatcher, REJECTED_SELF
+from ticket_registry import TicketRegistry
+from database import TicketStore
+from guild_config import GuildConfigStore
+from log_dispatcher import LogDispatcher
+from ticket_pool import TicketChannelPool
+from admission import TicketAdmission
+from transcripts import TranscriptExporter
+from analytics import TicketAnalytics
+from auto_close import AutoCloseScheduler
+from metrics import Counter, Gauge
+from profiling import Profiler
+from cluster import publish_stats
+from command_sync import CommandTreeSync
 
 logger = logging.getLogger(__name__)
 
-def setup_bot():
+COMMANDS_TOTAL = Counter("bot_commands_total", "Commands invoked, by command")
+COMMAND_ERRORS_TOTAL = Counter("bot_command_errors_total", "Commands that raised an error, by command")
+
+def gateway_options(lean=False):
     """
-    Set up the Discord bot with intents and command prefix.
-    Returns the configured bot instance.
+    Get the intents and cache settings the bot connects with.
+    
+    Lean mode only subscribes to what the ticket flow uses: guild and
+    channel events, guild messages for prefix commands, and their content.
+    Members aren't cached or chunked and messages aren't kept; ticket
+    owners come with their interactions and are fetched on demand otherwise.
+    
+    Args:
+        lean: Whether to use the lean settings
+    
+    Returns:
+        dict: Keyword arguments for the bot constructor
     """
+    if lean:
+        intents = discord.Intents.none()
+        intents.guilds = True
+        intents.guild_messages = True
+        intents.message_content = True  # Required for reading message content
+        return {
+            "intents": intents,
+            "member_cache_flags": discord.MemberCacheFlags.none(),
+            "max_messages": None,
+            "chunk_guilds_at_startup": False,
+        }
+    
     # Set up intents for the bot
     intents = discord.Intents.default()
     intents.messages = True
     intents.message_content = True  # Required for reading message content
     intents.guilds = True
+    return {"intents": intents}
+
+def setup_bot(shard_count=None, shard_ids=None, cluster_id=None, cluster_state=None, lean=None):
+    """
+    Set up the Discord bot with intents and command prefix.
+    Returns the configured bot instance.
+    
+    An AutoShardedBot is created when a shard count is given, either as an
+    argument or through the SHARD_COUNT environment variable ("auto" lets
+    Discord pick the count).
+    
+    Args:
+        shard_count: Total number of shards across all clusters (optional)
+        shard_ids: Shard IDs this process runs (optional, defaults to all)
+        cluster_id: ID of this cluster when running under the launcher (optional)
+        cluster_state: ClusterState shared between cluster processes (optional)
+        lean: Use lean intents and caches (optional, defaults to LEAN_GATEWAY)
+    """
+    if lean is None:
+        lean = os.environ.get("LEAN_GATEWAY", "false").lower() in ("1", "true", "yes")
+    options = gateway_options(lean)
     
     # Get the command prefix from environment variables or use default
     command_prefix = os.environ.get("COMMAND_PREFIX", "!")
     
-    # Create the bot instance
-    bot = commands.Bot(command_prefix=command_prefix, intents=intents, help_command=None)
+    # Create the bot instance, sharded if a shard count is configured
+    if shard_count is None and os.environ.get("SHARD_COUNT"):
+        shard_count = os.environ["SHARD_COUNT"]
+    if shard_count is not None:
+        bot = commands.AutoShardedBot(
+            command_prefix=command_prefix,
+            help_command=None,
+            shard_count=None if shard_count == "auto" else int(shard_count),
+            shard_ids=shard_ids,
+            **options
+        )
+    else:
+        bot = commands.Bot(command_prefix=command_prefix, help_command=None, **options)
+    bot.lean = lean
+    
+    # Cluster identity and shared state, set when run by the cluster launcher
+    bot.cluster_id = cluster_id
+    bot.cluster_state = cluster_state
+    
+    # In-memory index of tickets and ticket channels per guild
+    bot.ticket_registry = TicketRegistry()
+    
+    # Persistent ticket table, written behind the interaction path
+    bot.ticket_store = TicketStore()
+    
+    # Per-guild settings, cached after the first load
+    bot.guild_config = GuildConfigStore(bot.ticket_store)
+    
+    # Batched sender for ticket-logs messages
+    bot.log_dispatcher = LogDispatcher(bot.ticket_registry)
+    
+    # Optional warm pool of pre-created ticket channels
+    bot.ticket_pool = TicketChannelPool(bot.ticket_registry, bot.guild_config)
+    
+    # Rate limiting and queuing for ticket creation bursts
+    bot.ticket_admission = TicketAdmission()
+    
+    # Transcript export for closed tickets
+    bot.transcript_exporter = TranscriptExporter()
+    
+    # Warns about and closes idle tickets
+    bot.auto_close = AutoCloseScheduler(bot.ticket_registry, bot.guild_config, bot.ticket_store, bot.get_channel)
+    
+    # Ticket counts and response/close time quantiles for !ticketstats
+    bot.analytics = TicketAnalytics(bot.ticket_store)
+    
+    # Syncs the slash commands when their definitions change
+    bot.command_sync = CommandTreeSync(bot.ticket_store)
+    bot.command_sync_task = None
+    
+    # Command latency histograms, slow-path logging and opt-in cProfile
+    bot.profiler = Profiler()
+    bot.profiler.install(bot)
+    
+    # Queue depths for the /metrics endpoint
+    Gauge("ticket_store_pending_writes", "Ticket writes waiting to be flushed", callback=lambda: bot.ticket_store.pending)
+    Gauge("ticket_log_queue_depth", "Ticket log embeds waiting to be sent", callback=lambda: bot.log_dispatcher.pending)
+    Gauge("transcript_exports_running", "Ticket close tasks still exporting or deleting", callback=lambda: bot.transcript_exporter.running)
+    Gauge("tickets_open", "Open tickets across all guilds", callback=lambda: len(bot.ticket_registry.open_tickets()))
+    Gauge("bot_guilds", "Guilds the bot is in", callback=lambda: len(bot.guilds))
+    
+    # Event: Start background services before connecting to the gateway
+    @bot.event
+    async def setup_hook():
+        """Called once by discord.py before the bot logs in."""
+        await bot.ticket_store.start()
+        # Answer ticket buttons and menus by custom ID from the first event on
+        for view in bot.ticket_views:
+            bot.add_view(view())
+        # Synced in the background once ready, a rate-limited sync can take tens of seconds
+        bot.command_sync_task = asyncio.create_task(bot.command_sync.run(bot))
+        bot.ticket_pool.start()
+        bot.auto_close.start()
+        if bot.cluster_state is not None:
+            bot.cluster_stats_task = asyncio.create_task(publish_stats(bot))
+    
+    # Flush background services when the bot shuts down
+    _close = bot.close
+    
+    async def close():
+        """Drain queued work, then disconnect from Discord."""
+        if bot.command_sync_task:
+            bot.command_sync_task.cancel()
+        await bot.ticket_pool.close()
+        await bot.auto_close.close()
+        await bot.transcript_exporter.close()
+        await bot.log_dispatcher.close()
+        await bot.ticket_store.close()
+        await _close()
+    
+    bot.close = close
     
     # Event: Bot is ready
     @bot.event
     async def on_ready():
         """Event triggered when the bot is ready and connected to Discord."""
         logger.info(f"{bot.user.name} has connected to Discord!")
+        if bot.cluster_id is not None:
+            logger.info(f"Cluster {bot.cluster_id} is running shard(s) {list(bot.shard_ids)}")
         logger.info(f"Bot is in {len(bot.guilds)} guild(s)")
         
+        # Index ticket channels once so lookups don't scan the channel list
+        bot.ticket_registry.build(bot.guilds)
+        
+        # Cache every guild's settings in one query before anything reads them
+        await bot.guild_config.preload(guild.id for guild in bot.guilds)
+        bot.ticket_pool.refill_all(bot.guilds)
+        await bot.auto_close.restore(bot.guilds)
+        await bot.analytics.restore()
+        
         # Set bot status
         await bot.change_presence(activity=discord.Game(f"Type {command_prefix}help for commands"))
     
+    # Events: Keep the ticket registry in sync with the guild's channels
+    @bot.event
+    async def on_guild_join(guild):
+        """Event triggered when the bot joins a new guild."""
+        bot.ticket_registry.index_guild(guild)
+        await bot.guild_config.load(guild.id)
+    
+    @bot.event
+    async def on_guild_available(guild):
+        """Event triggered when a guild becomes available, e.g. after an outage."""
+        # Guilds available at startup are indexed and loaded together in on_ready
+        if not bot.is_ready():
+            return
+        bot.ticket_registry.index_guild(guild)
+        await bot.guild_config.load(guild.id)
+        bot.ticket_pool.request_refill(guild)
+        await bot.auto_close.restore([guild])
+    
+    @bot.event
+    async def on_guild_remove(guild):
+        """Event triggered when the bot leaves or is removed from a guild."""
+        bot.ticket_registry.forget_guild(guild.id)
+        bot.guild_config.invalidate(guild.id)
+        bot.log_dispatcher.forget_guild(guild.id)
+    
+    @bot.event
+    async def on_guild_channel_create(channel):
+        """Event triggered when a channel is created."""
+        bot.ticket_registry.track_channel(channel)
+    
+    @bot.event
+    async def on_guild_channel_update(before, after):
+        """Event triggered when a channel is renamed or its topic changes."""
+        if before.name != after.name:
+            bot.ticket_registry.forget_channel(before)
+        bot.ticket_registry.track_channel(after)
+    
+    @bot.event
+    async def on_guild_channel_delete(channel):
+        """Event triggered when a channel is deleted."""
+        bot.ticket_registry.forget_channel(channel)
+        bot.auto_close.forget(channel.id)
+    
+    # Event: Count command invocations
+    @bot.event
+    async def on_command(ctx):
+        """Event triggered when a command is about to be invoked."""
+        COMMANDS_TOTAL.inc(command=ctx.command.qualified_name)
+    
     # Event: Handle errors in commands
     @bot.event
     async def on_command_error(ctx, error):
         """Global error handler for command errors."""
+        if ctx.command:
+            COMMAND_ERRORS_TOTAL.inc(command=ctx.command.qualified_name)
         if isinstance(error, commands.CommandNotFound):
             await ctx.send(f"Command not found. Try `{command_prefix}help` to see available commands.")
         elif isinstance(error, commands.MissingRequiredArgument):
@@ -45,6 +257,10 @@ def setup_bot():
             await ctx.send(f"Bad argument provided: {error}")
         elif isinstance(error, commands.MissingPermissions):
             await ctx.send("You don't have permission to use this command.")
+        elif isinstance(error, commands.CommandOnCooldown):
+            await ctx.send(f"Slow down! Try again in {error.retry_after:.0f}s.", delete_after=5)
+        elif isinstance(error, commands.MaxConcurrencyReached):
+            await ctx.send("Too many people are using this command right now, please try again shortly.", delete_after=5)
         else:
             logger.error(f"Command error: {error}")
             await ctx.send(f"An error occurred: {error}")
@@ -55,10 +271,33 @@ def setup_bot():
         """Event triggered when a message is sent in a channel the bot can see."""
         # Don't respond to our own messages
         if message.author == bot.user:
+            REJECTED_SELF.inc()
             return
         
-        # Process commands
-        await bot.process_commands(message)
+        # Keep idle tickets from being auto-closed
+        bot.auto_close.touch(message.channel.id)
+        bot.analytics.on_message(message)
+        
+        # Reject bots and chatter before building a command context
+        ctx = bot.command_dispatcher.get_context(message)
+        if ctx is not None:
+            await bot.invoke(ctx)
+    
+    # Name/alias lookup for on_message, rebuilt whenever a command is added or removed
+    bot.command_dispatcher = CommandDispatcher(bot)
+    _add_command, _remove_command = bot.add_command, bot.remove_command
+    
+    def add_command(command):
+        _add_command(command)
+        bot.command_dispatcher.refresh()
+    
+    def remove_command(name):
+        command = _remove_command(name)
+        bot.command_dispatcher.refresh()
+        return command
+    
+    bot.add_command = add_command
+    bot.remove_command = remove_command
     
     # Setup all the commands
     setup_commands(bot)
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field
+
+import discord
+
+from admission import TokenBucket
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+BULK_TICKETS = Counter("ticket_bulk_operations_total", "Tickets handled by bulk admin commands, by action and result")
+
+ARCHIVE_CATEGORY_NAME = "Archived Tickets"
+# Discord allows at most 50 channels in a category
+CATEGORY_CHANNEL_LIMIT = 50
+
+DURATION_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)([mhdw])$")
+DURATION_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+MENTION_PATTERN = re.compile(r"^<@!?(\d+)>$|^(\d+)$")
+
+
+def parse_duration(text):
+    """
+    Parse a duration like "30m", "12h", "7d" or "2w".
+
+    Returns:
+        float: The duration in seconds
+
+    Raises:
+        ValueError: If the text isn't a duration
+    """
+    match = DURATION_PATTERN.match(text.lower())
+    if not match:
+        raise ValueError(f"`{text}` isn't a duration, use e.g. 30m, 12h, 7d or 2w")
+    return float(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+@dataclass
+class TicketFilter:
+    """Which open tickets a bulk command applies to. Unset criteria match everything."""
+    ticket_type: str = None
+    older_than: float = None  # seconds since the ticket was opened
+    idle_for: float = None  # seconds since the last message
+    owner_id: int = None
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Parse filters like "type:Support older:7d idle:2d owner:@user".
+
+        Raises:
+            ValueError: On unknown or malformed filters
+        """
+        ticket_filter = cls()
+        for token in (text or "").split():
+            key, sep, value = token.partition(":")
+            if not sep or not value:
+                raise ValueError(f"`{token}` isn't a filter, use type:, older:, idle: or owner:")
+            key = key.lower()
+            if key == "type":
+                ticket_filter.ticket_type = value
+            elif key == "older":
+                ticket_filter.older_than = parse_duration(value)
+            elif key == "idle":
+                ticket_filter.idle_for = parse_duration(value)
+            elif key == "owner":
+                match = MENTION_PATTERN.match(value)
+                if not match:
+                    raise ValueError(f"`{value}` isn't a user mention or ID")
+                ticket_filter.owner_id = int(match.group(1) or match.group(2))
+            else:
+                raise ValueError(f"Unknown filter `{key}`, use type:, older:, idle: or owner:")
+        return ticket_filter
+
+    def matches(self, entry, opened_at, last_activity, now):
+        """
+        Check a ticket against the filter.
+
+        Args:
+            entry: The ticket's TicketEntry
+            opened_at: Epoch seconds the ticket was opened
+            last_activity: Epoch seconds of the last message, or None if unknown
+            now: The current epoch time
+        """
+        if self.ticket_type and entry.ticket_type.lower() != self.ticket_type.lower():
+            return False
+        if self.owner_id and entry.owner_id != self.owner_id:
+            return False
+        if self.older_than and now - opened_at < self.older_than:
+            return False
+        if self.idle_for and now - (last_activity or opened_at) < self.idle_for:
+            return False
+        return True
+
+    def describe(self):
+        parts = []
+        if self.ticket_type:
+            parts.append(f"type {self.ticket_type}")
+        if self.older_than:
+            parts.append(f"opened over {self.older_than / 3600:g}h ago")
+        if self.idle_for:
+            parts.append(f"idle over {self.idle_for / 3600:g}h")
+        if self.owner_id:
+            parts.append(f"owned by <@{self.owner_id}>")
+        return ", ".join(parts) or "all open tickets"
+
+
+@dataclass
+class BulkResult:
+    total: int
+    done: int = 0
+    failed: list = field(default_factory=list)  # (item, error message)
+    elapsed: float = 0.0
+
+
+class BulkRunner:
+    """
+    Runs one action over many tickets without tripping Discord's limits.
+
+    At most `concurrency` actions run at once and new ones start at no more
+    than `rate` per second, which keeps bursts well under the global request
+    limit; discord.py still waits out each route's own bucket. A failing
+    ticket is recorded and the rest of the batch carries on. Progress is
+    reported through a callback at most every progress_interval seconds.
+    """
+
+    def __init__(self, concurrency=None, rate=None, progress_interval=3.0):
+        """
+        Args:
+            concurrency: Max actions in flight (defaults to BULK_CONCURRENCY)
+            rate: Max actions started per second (defaults to BULK_RATE)
+            progress_interval: Min seconds between progress callbacks
+        """
+        if concurrency is None:
+            concurrency = int(os.environ.get("BULK_CONCURRENCY", "8"))
+        if rate is None:
+            rate = float(os.environ.get("BULK_RATE", "5"))
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.progress_interval = progress_interval
+
+    async def run(self, name, items, action, on_progress=None):
+        """
+        Apply action to every item.
+
+        Args:
+            name: Action name for metrics and logs
+            items: The items to process
+            action: Async callable taking one item, raising on failure
+            on_progress: Async callable taking the BulkResult so far (optional)
+
+        Returns:
+            BulkResult
+        """
+        result = BulkResult(total=len(items))
+        bucket = TokenBucket(self.rate, max(1, min(self.concurrency, self.rate)))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.monotonic()
+        last_report = start
+
+        async def report(force=False):
+            nonlocal last_report
+            now = time.monotonic()
+            if on_progress and (force or now - last_report >= self.progress_interval):
+                last_report = now
+                result.elapsed = now - start
+                try:
+                    await on_progress(result)
+                except Exception as e:
+                    logger.warning(f"Bulk {name} progress update failed: {e}")
+
+        async def run_one(item):
+            try:
+                await action(item)
+                result.done += 1
+                BULK_TICKETS.inc(action=name, result="ok")
+            except Exception as e:
+                result.failed.append((item, str(e) or type(e).__name__))
+                BULK_TICKETS.inc(action=name, result="failed")
+                logger.error(f"Bulk {name} failed for {item}: {e}")
+            finally:
+                semaphore.release()
+            await report()
+
+        tasks = []
+        for item in items:
+            await semaphore.acquire()
+            while not bucket.try_take():
+                await asyncio.sleep(bucket.time_until_token())
+            tasks.append(asyncio.create_task(run_one(item)))
+        await asyncio.gather(*tasks)
+
+        result.elapsed = time.monotonic() - start
+        await report(force=True)
+        logger.info(f"Bulk {name}: {result.done}/{result.total} done, {len(result.failed)} failed in {result.elapsed:.1f}s")
+        return result
+
+
+class ArchiveCategories:
+    """
+    Hands out the category archived tickets are moved to.
+
+    A category holds at most 50 channels, so a new "Archived Tickets"
+    category is opened whenever the current one is full. Reservations are
+    counted locally since gateway updates lag behind concurrent archives.
+    """
+
+    def __init__(self):
+        self._locks = {}  # guild_id -> asyncio.Lock
+        self._current = {}  # guild_id -> [category, channels assigned]
+
+    async def reserve(self, guild):
+        """
+        Get a category with room for one more channel.
+
+        Returns:
+            discord.CategoryChannel
+        """
+        async with self._locks.setdefault(guild.id, asyncio.Lock()):
+            current = self._current.get(guild.id)
+            if current is None or current[1] >= CATEGORY_CHANNEL_LIMIT:
+                category = next(
+                    (c for c in guild.categories if c.name == ARCHIVE_CATEGORY_NAME and len(c.channels) < CATEGORY_CHANNEL_LIMIT),
+                    None
+                )
+                if category is None:
+                    category = await guild.create_category(ARCHIVE_CATEGORY_NAME, overwrites={
+                        guild.default_role: discord.PermissionOverwrite(view_channel=False),
+                        guild.me: discord.PermissionOverwrite(view_channel=True, send_messages=True)
+                    })
+                current = self._current[guild.id] = [category, len(category.channels)]
+            current[1] += 1
+            return current[0]
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import math
+import time
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DISCORD_API = "https://discord.com/api/v10"
+
+
+def shard_ranges(shard_count, cluster_count):
+    """
+    Split shard IDs into contiguous ranges, one per cluster.
+
+    Contiguous ranges keep shards that share an identify rate-limit bucket
+    in the same process.
+
+    Args:
+        shard_count: Total number of shards
+        cluster_count: Number of clusters (worker processes)
+
+    Returns:
+        list[list[int]]: Shard IDs for each cluster
+    """
+    cluster_count = max(1, min(cluster_count, shard_count))
+    per_cluster = math.ceil(shard_count / cluster_count)
+    return [list(range(start, min(start + per_cluster, shard_count))) for start in range(0, shard_count, per_cluster)]
+
+
+async def fetch_recommended_shards(token):
+    """
+    Ask Discord how many shards the bot should run.
+
+    Args:
+        token: The Discord bot token
+
+    Returns:
+        int: The recommended shard count
+    """
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{DISCORD_API}/gateway/bot", headers={"Authorization": f"Bot {token}"}) as response:
+            response.raise_for_status()
+            data = await response.json()
+            return data["shards"]
+
+
+class ClusterState:
+    """
+    Stats shared between cluster worker processes.
+
+    Each worker publishes its own stats (guilds, open tickets, readiness,
+    latency) into a dict proxy owned by a multiprocessing.Manager in the
+    launcher, so values that span every guild, like ticket counts, can be
+    totalled from any process.
+    """
+
+    def __init__(self, shared):
+        """
+        Args:
+            shared: A multiprocessing.Manager().dict() proxy
+        """
+        self.shared = shared
+
+    def publish(self, cluster_id, stats):
+        """Store the stats for one cluster. Blocking IPC, call from a thread."""
+        self.shared[cluster_id] = dict(stats, updated=time.time())
+
+    def clusters(self):
+        """Get the last published stats of every cluster. Blocking IPC, call from a thread."""
+        return dict(self.shared)
+
+    def totals(self):
+        """
+        Sum guild and ticket counts over every cluster.
+
+        Returns:
+            dict: Total guilds and open tickets
+        """
+        clusters = self.clusters()
+        return {
+            "guilds": sum(stats.get("guilds", 0) for stats in clusters.values()),
+            "open_tickets": sum(stats.get("open_tickets", 0) for stats in clusters.values()),
+        }
+
+
+def cluster_stats(bot):
+    """
+    Collect the stats a worker publishes about itself.
+
+    Args:
+        bot: The Discord bot instance
+
+    Returns:
+        dict: Readiness, latency, shard and count stats
+    """
+    latency = bot.latency
+    return {
+        "ready": bot.is_ready(),
+        "latency_ms": round(latency * 1000, 1) if math.isfinite(latency) else None,
+        "shard_ids": list(getattr(bot, "shard_ids", None) or []),
+        "guilds": len(bot.guilds),
+        "open_tickets": len(bot.ticket_registry.open_tickets()),
+    }
+
+
+async def publish_stats(bot, interval=10.0):
+    """
+    Publish this worker's stats to the shared cluster state forever.
+
+    Args:
+        bot: The Discord bot instance, with cluster_id and cluster_state set
+        interval: Seconds between updates
+    """
+    while True:
+        try:
+            await asyncio.to_thread(bot.cluster_state.publish, bot.cluster_id, cluster_stats(bot))
+        except Exception as e:
+            logger.error(f"Failed to publish stats for cluster {bot.cluster_id}: {e}")
+        await asyncio.sleep(interval)
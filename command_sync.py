@@ -0,0 +1,100 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+import discord
+from sqlalchemy.orm import Session
+
+from database import BotState
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+COMMAND_SYNCS_TOTAL = Counter("app_command_syncs_total", "Slash command tree sync decisions at startup, by result")
+
+
+def command_tree_hash(tree):
+    """
+    Hash the global command definitions a sync would upload.
+
+    Returns:
+        str: Hex SHA-256 of the command payloads in a stable order
+    """
+    payload = sorted((command.to_dict(tree) for command in tree.get_commands()), key=lambda command: command["name"])
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+class CommandTreeSync:
+    """
+    Syncs the slash command tree only when the command definitions change.
+
+    Global syncs are slow and heavily rate-limited, and the definitions
+    rarely change between deploys. The hash of the last synced
+    definitions is stored in the bot_state table, so a restart with the
+    same commands skips the sync. Only the first cluster (or the only
+    process) syncs; the others share its commands.
+    """
+
+    def __init__(self, ticket_store, mode=None):
+        """
+        Args:
+            ticket_store: The TicketStore whose database holds the hash
+            mode: "auto" syncs when the hash changed, "always" or "off" (defaults to COMMAND_SYNC)
+        """
+        self.ticket_store = ticket_store
+        self.mode = (mode or os.environ.get("COMMAND_SYNC", "auto")).lower()
+
+    async def run(self, bot):
+        """
+        Sync the bot's command tree if needed once the bot is ready.
+
+        Started as a background task from setup_hook, so a slow or
+        rate-limited sync never holds up login. Any failure, including
+        the hash lookup, is logged and retried on the next start.
+
+        Returns:
+            bool: Whether the tree was synced
+        """
+        if self.mode == "off" or bot.cluster_id not in (None, 0):
+            COMMAND_SYNCS_TOTAL.inc(result="disabled")
+            return False
+
+        await bot.wait_until_ready()
+        try:
+            return await self._sync(bot)
+        except Exception as e:
+            COMMAND_SYNCS_TOTAL.inc(result="failed")
+            logger.error(f"Slash command sync failed, retrying on the next start: {e}")
+            return False
+
+    async def _sync(self, bot):
+        digest = command_tree_hash(bot.tree)
+        # The same database may serve more than one application, e.g. a test bot
+        key = f"command_tree_hash:{bot.application_id}"
+        if self.mode != "always" and await self._get(key) == digest:
+            COMMAND_SYNCS_TOTAL.inc(result="unchanged")
+            logger.info("Slash commands unchanged since the last sync, skipping it")
+            return False
+
+        start = time.perf_counter()
+        synced = await bot.tree.sync()
+        await self._set(key, digest)
+        COMMAND_SYNCS_TOTAL.inc(result="synced")
+        logger.info(f"Synced {len(synced)} slash command(s) in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return True
+
+    async def _get(self, key):
+        def query():
+            with Session(self.ticket_store.engine) as session:
+                row = session.get(BotState, key)
+                return row.value if row else None
+        return await asyncio.to_thread(query)
+
+    async def _set(self, key, value):
+        def write():
+            with Session(self.ticket_store.engine) as session, session.begin():
+                session.merge(BotState(key=key, value=value, updated_at=discord.utils.utcnow()))
+        await asyncio.to_thread(write)
@@ -1,13 +1,51 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
 import logging
 import random
-import os
-from utils import get_embed_color
+import asyncio
+import time
+import numpy as np
+from utils import get_embed_color, resolve_member, utc_timestamp, SingleFlight, TTLCache
+from metrics import Counter
+from profiling import span, timed
+from admission import AdmissionError
+from ticket_registry import LOGS_CHANNEL_NAME, CREATE_CHANNEL_NAME, ticket_topic
+from guild_config import MAX_TICKET_TYPES
+from analytics import TypeStats
+from dice import DiceError, distribution, parse_dice
+from bulk import ArchiveCategories, BulkRunner, TicketFilter, parse_duration
+from auto_close import format_duration
 from discord.ui import Button, View
 
 logger = logging.getLogger(__name__)
 
+TICKETS_OPENED = Counter("tickets_opened_total", "Tickets opened, by type")
+TICKETS_CLOSED = Counter("tickets_closed_total", "Tickets closed, by type")
+
+# Rolls with more dice than this run in a worker thread, and at most this many dice are shown per term
+LARGE_ROLL_DICE = 10_000
+ROLL_DICE_SHOWN = 50
+
+# Simulations run in worker threads, so limit how often a user and how many at once can run them
+ROLLSIM_COOLDOWN = 10
+ROLLSIM_CONCURRENCY = 2
+
+# How long and for how many servers info/serverinfo embeds are reused
+EMBED_CACHE_TTL = 60
+EMBED_CACHE_SIZE = 256
+
+# Stable custom IDs of the persistent ticket buttons and menu
+CREATE_TICKET_ID = "ticket:create"
+TICKET_TYPE_ID = "ticket:type"
+CLOSE_TICKET_ID = "ticket:close"
+
+CLOSING_NOTICE = "Closing ticket... Saving the transcript first."
+PANEL_TITLE = "Support Tickets"
+
+# Messages searched for an existing panel when !setup_tickets is run again
+PANEL_SEARCH_LIMIT = 50
+
 def setup_commands(bot):
     """
     Set up all commands for the Discord bot.
@@ -15,48 +53,65 @@ def setup_commands(bot):
     Args:
         bot: The Discord bot instance
     """
+    registry = bot.ticket_registry
+    store = bot.ticket_store
+    log_dispatcher = bot.log_dispatcher
+    pool = bot.ticket_pool
+    admission = bot.ticket_admission
+    transcripts = bot.transcript_exporter
+    profiler = bot.profiler
+    guild_config = bot.guild_config
+    auto_close = bot.auto_close
+    analytics = bot.analytics
+    
+    # Ticket creations in progress, keyed by (guild ID, user ID)
+    ticket_creations = SingleFlight()
+    
+    # IDs of ticket channels whose transcript export and deletion are under way
+    closing_channels = set()
     
-    @bot.command(name="help")
+    # Bulk admin operations, one at a time per guild
+    bulk = BulkRunner()
+    bulk_operations = {}  # guild_id -> action name
+    archive_categories = ArchiveCategories()
+    
+    # Help embed per (prefix, command table version), and info/serverinfo embeds
+    help_embeds = {}
+    info_embeds = TTLCache(maxsize=EMBED_CACHE_SIZE, ttl=EMBED_CACHE_TTL)
+    
+    @bot.command(name="help", brief="Shows this help message")
     async def help_command(ctx):
         """Display help information for available commands."""
         prefix = bot.command_prefix
+        # Rebuilt only when the prefix or the registered commands change
+        key = (prefix, bot.command_dispatcher.version)
+        embed = help_embeds.get(key)
+        if embed is None:
+            help_embeds.clear()
+            embed = help_embeds[key] = build_help_embed(prefix)
+        await ctx.reply(embed=embed, mention_author=False)
+        logger.info(f"Help command used by {ctx.author}")
+
+    def build_help_embed(prefix):
+        """Describe every visible command, using its brief or the first line of its docstring."""
         embed = discord.Embed(
             title="Bot Help",
             description=f"Here are the commands you can use with this bot (prefix: `{prefix}`)",
-            color=get_embed_color()
+            color=get_embed_color("help")
         )
-        
-        commands_list = [
-            {"name": "help", "description": "Shows this help message"},
-            {"name": "ping", "description": "Checks the bot's response time"},
-            {"name": "hello", "description": "Greets you with a friendly message"},
-            {"name": "roll", "description": "Rolls a dice (e.g., `{prefix}roll 2d6`)"},
-            {"name": "info", "description": "Displays information about the bot"},
-            {"name": "serverinfo", "description": "Displays information about the server"},
-            {"name": "setup_tickets", "description": "Sets up the ticket system with logs (Admin only)"},
-            {"name": "close", "description": "Closes the current ticket (use in ticket channels)"},
-        ]
-        
-        for cmd in commands_list:
-            embed.add_field(
-                name=f"{prefix}{cmd['name']}",
-                value=cmd['description'],
-                inline=False
-            )
-            
-        embed.set_footer(text=f"Requested by {ctx.author.display_name}")
-        
-        await ctx.send(embed=embed)
-        logger.info(f"Help command used by {ctx.author}")
+        for command in bot.command_dispatcher.commands():
+            description = (command.brief or command.short_doc or "No description").replace("{prefix}", prefix)
+            embed.add_field(name=f"{prefix}{command.name}", value=description, inline=False)
+        return embed
 
-    @bot.command(name="ping")
+    @bot.command(name="ping", brief="Checks the bot's response time")
     async def ping_command(ctx):
         """Check the bot's response time."""
         latency = round(bot.latency * 1000)
         await ctx.send(f"Pong! 🏓 Response time: {latency}ms")
         logger.info(f"Ping command used by {ctx.author}")
 
-    @bot.command(name="hello")
+    @bot.command(name="hello", brief="Greets you with a friendly message")
     async def hello_command(ctx):
         """Greet the user with a friendly message."""
         greetings = [
@@ -68,59 +123,125 @@ def setup_commands(bot):
         await ctx.send(random.choice(greetings))
         logger.info(f"Hello command used by {ctx.author}")
 
-    @bot.command(name="roll")
-    async def roll_command(ctx, dice: str = "1d6"):
+    @bot.command(name="roll", brief="Rolls dice, e.g. `{prefix}roll 2d6`, `{prefix}roll 4d6kh3`, `{prefix}roll 1d20+5` or `{prefix}roll 3d6!`")
+    async def roll_command(ctx, *, dice: str = "1d6"):
         """
-        Roll dice in NdN format.
+        Roll a dice expression.
         
         Args:
-            dice: Dice in NdN format (default: 1d6)
+            dice: Dice like 2d6, with kh/kl/dh/dl N to keep or drop dice, ! to explode and +/- terms (default: 1d6)
         """
         try:
-            rolls, limit = map(int, dice.split('d'))
-            
-            if rolls > 100:
-                await ctx.send("I can't roll that many dice!")
-                return
-                
-            if limit > 1000:
-                await ctx.send("Dice sides too large!")
-                return
-                
-            results = [random.randint(1, limit) for _ in range(rolls)]
-            total = sum(results)
-            
-            if len(results) == 1:
-                await ctx.send(f"🎲 You rolled a {total}")
-            else:
-                await ctx.send(f"🎲 You rolled {dice} and got: {', '.join(map(str, results))} (Total: {total})")
-        except Exception as e:
-            await ctx.send(f"Format has to be in NdN (e.g., 2d6). Error: {e}")
+            expression = parse_dice(dice)
+        except DiceError as e:
+            await ctx.send(str(e))
+            return
         
+        if expression.dice_count > LARGE_ROLL_DICE:
+            result = await asyncio.to_thread(expression.roll, np.random.default_rng())
+        else:
+            result = expression.roll()
+        
+        if len(result.terms) == 1 and expression.dice_count == 1:
+            await ctx.send(f"🎲 You rolled a {result.total}")
+        else:
+            message = f"🎲 You rolled {expression.text} and got: {describe_roll(result)} (Total: {result.total})"
+            if len(message) > 2000:
+                message = f"🎲 You rolled {expression.text} and got a total of {result.total}"
+            await ctx.send(message)
         logger.info(f"Roll command used by {ctx.author} with argument: {dice}")
 
-    @bot.command(name="info")
+    def describe_roll(result):
+        """Show the dice of a roll, dropped dice struck through and long pools cut short."""
+        parts = []
+        for index, roll in enumerate(result.terms):
+            sign = "-" if roll.term.sign < 0 else "+"
+            if roll.dice is None:
+                text = str(roll.term.value)
+            else:
+                shown = [
+                    str(value) if kept else f"~~{value}~~"
+                    for value, kept in zip(roll.dice[:ROLL_DICE_SHOWN].tolist(), roll.kept[:ROLL_DICE_SHOWN].tolist())
+                ]
+                if roll.dice.size > ROLL_DICE_SHOWN:
+                    shown.append(f"… {roll.dice.size - ROLL_DICE_SHOWN:,} more")
+                text = f"[{', '.join(shown)}]"
+            parts.append(text if index == 0 and sign == "+" else f"{sign} {text}")
+        return " ".join(parts)
+
+    @bot.command(name="rollsim", brief="Rolls dice many times and shows the spread, e.g. `{prefix}rollsim 4d6kh3 1000000`")
+    @commands.cooldown(1, ROLLSIM_COOLDOWN, commands.BucketType.user)
+    @commands.max_concurrency(ROLLSIM_CONCURRENCY, commands.BucketType.default)
+    async def rollsim_command(ctx, dice: str, trials: int = 100_000):
+        """
+        Simulate a dice expression and show the distribution of its totals.
+        
+        Args:
+            dice: Dice expression without spaces, as for roll
+            trials: Number of rolls to simulate (default: 100000)
+        """
+        try:
+            expression = parse_dice(dice)
+            # Checked here too so oversized simulations never take a worker thread
+            expression.check_simulation(trials)
+            start = time.perf_counter()
+            totals = await asyncio.to_thread(expression.simulate, trials)
+        except DiceError as e:
+            await ctx.send(str(e))
+            return
+        elapsed = time.perf_counter() - start
+        summary = distribution(totals)
+        
+        embed = discord.Embed(title=f"🎲 {expression.text}", color=get_embed_color(expression.text))
+        embed.add_field(name="Mean", value=f"{summary['mean']:.2f}", inline=True)
+        embed.add_field(name="Std Dev", value=f"{summary['std']:.2f}", inline=True)
+        embed.add_field(name="Range", value=f"{summary['min']} to {summary['max']}", inline=True)
+        embed.add_field(name="Median", value=f"{summary['p50']:g}", inline=True)
+        embed.add_field(name="90% Between", value=f"{summary['p5']:g} and {summary['p95']:g}", inline=True)
+        
+        top = max(share for _, _, share in summary["bins"])
+        labels = [str(low) if low == high else f"{low}-{high}" for low, high, _ in summary["bins"]]
+        width = max(len(label) for label in labels)
+        lines = [
+            f"{label:>{width}} {'█' * round(share / top * 20):<20} {share:6.2%}"
+            for label, (_, _, share) in zip(labels, summary["bins"])
+        ]
+        embed.add_field(name="Distribution", value="```\n" + "\n".join(lines) + "\n```", inline=False)
+        embed.set_footer(text=f"{trials:,} rolls simulated in {elapsed * 1000:.0f}ms")
+        
+        await ctx.send(embed=embed)
+        logger.info(f"Rollsim command used by {ctx.author} with {dice} x{trials}")
+
+    @bot.command(name="info", brief="Displays information about the bot")
     async def info_command(ctx):
         """Display information about the bot."""
+        embed = info_embeds.get("info")
+        if embed is None:
+            embed = await build_info_embed()
+            info_embeds.set("info", embed)
+        await ctx.reply(embed=embed, mention_author=False)
+        logger.info(f"Info command used by {ctx.author}")
+
+    async def build_info_embed():
         embed = discord.Embed(
             title="Bot Information",
             description="A Discord bot built with discord.py and hosted on Replit",
-            color=get_embed_color()
+            color=get_embed_color("info")
         )
         
         embed.add_field(name="Library", value="discord.py", inline=True)
         embed.add_field(name="Host", value="Replit", inline=True)
         embed.add_field(name="Prefix", value=bot.command_prefix, inline=True)
         embed.add_field(name="Creator", value="A helpful developer", inline=True)
-        embed.add_field(name="Servers", value=str(len(bot.guilds)), inline=True)
-        embed.add_field(name="Commands", value="Use `!help` to see commands", inline=True)
-        
-        embed.set_footer(text=f"Requested by {ctx.author.display_name}")
-        
-        await ctx.send(embed=embed)
-        logger.info(f"Info command used by {ctx.author}")
+        guild_count = len(bot.guilds)
+        if bot.cluster_state is not None:
+            # Count guilds on every cluster, not just this process
+            guild_count = (await asyncio.to_thread(bot.cluster_state.totals))["guilds"]
+        embed.add_field(name="Servers", value=str(guild_count), inline=True)
+        embed.add_field(name="Commands", value=f"Use `{bot.command_prefix}help` to see commands", inline=True)
+        return embed
 
-    @bot.command(name="serverinfo")
+    @bot.command(name="serverinfo", brief="Displays information about the server")
     async def serverinfo_command(ctx):
         """Display information about the server."""
         guild = ctx.guild
@@ -128,31 +249,244 @@ def setup_commands(bot):
         if not guild:
             await ctx.send("This command can only be used in a server.")
             return
-            
+        
+        embed = info_embeds.get(guild.id)
+        if embed is None:
+            embed = build_serverinfo_embed(guild)
+            info_embeds.set(guild.id, embed)
+        await ctx.reply(embed=embed, mention_author=False)
+        logger.info(f"Serverinfo command used by {ctx.author}")
+
+    def build_serverinfo_embed(guild):
         embed = discord.Embed(
             title=f"{guild.name} Information",
             description=f"Server ID: {guild.id}",
-            color=get_embed_color()
+            color=get_embed_color(guild.id)
         )
         
         # Add server information
         if guild.icon:
             embed.set_thumbnail(url=guild.icon.url)
             
-        embed.add_field(name="Owner", value=guild.owner.mention if guild.owner else "Unknown", inline=True)
+        # Mention by ID, the owner isn't necessarily in the member cache
+        embed.add_field(name="Owner", value=f"<@{guild.owner_id}>" if guild.owner_id else "Unknown", inline=True)
         embed.add_field(name="Created At", value=guild.created_at.strftime("%Y-%m-%d"), inline=True)
         embed.add_field(name="Member Count", value=str(guild.member_count), inline=True)
         embed.add_field(name="Channel Count", value=str(len(guild.channels)), inline=True)
         embed.add_field(name="Role Count", value=str(len(guild.roles)), inline=True)
         embed.add_field(name="Emoji Count", value=str(len(guild.emojis)), inline=True)
+        return embed
         
-        embed.set_footer(text=f"Requested by {ctx.author.display_name}")
+    class CreateTicketView(View):
+        """The Create Ticket button on the create-ticket channel's panel."""
         
-        await ctx.send(embed=embed)
-        logger.info(f"Serverinfo command used by {ctx.author}")
+        def __init__(self):
+            super().__init__(timeout=None)
+        
+        @discord.ui.button(label="Create Ticket", style=discord.ButtonStyle.green, custom_id=CREATE_TICKET_ID)
+        async def create_ticket_button(self, interaction: discord.Interaction, button: Button):
+            # Show dropdown when button is clicked
+            with profiler.handler("create_ticket_button", interaction.guild, interaction.user):
+                # The menu lists the guild's own ticket types, read them before building it
+                await guild_config.load(interaction.guild.id)
+                await interaction.response.send_message(
+                    "Please select a ticket type:",
+                    view=message_view(TicketTypeView(interaction.guild.id)),
+                    ephemeral=True
+                )
+    
+    class TicketTypeSelect(discord.ui.Select):
+        def __init__(self, guild_id=None):
+            # The instance registered at startup only routes picks, so it needs no options
+            options = [
+                discord.SelectOption(label=t["label"], description=t.get("description") or None, emoji=t.get("emoji") or None)
+                for t in guild_config.get(guild_id).ticket_types
+            ] if guild_id else []
+            super().__init__(custom_id=TICKET_TYPE_ID, placeholder="Select ticket type...", min_values=1, max_values=1, options=options)
+        
+        async def callback(self, interaction: discord.Interaction):
+            # One instance answers every menu, so read the pick from this interaction rather than self.values
+            with profiler.handler("ticket_select", interaction.guild, interaction.user):
+                await handle_ticket_select(interaction, interaction.data["values"][0])
+    
+    # Class for dropdown selection view
+    class TicketTypeView(View):
+        def __init__(self, guild_id=None):
+            super().__init__(timeout=None)
+            self.add_item(TicketTypeSelect(guild_id))
+    
+    class CloseTicketView(View):
+        """The Close Ticket button on a ticket's welcome message."""
+        
+        def __init__(self):
+            super().__init__(timeout=None)
+        
+        @discord.ui.button(label="Close Ticket", style=discord.ButtonStyle.red, custom_id=CLOSE_TICKET_ID)
+        async def close_ticket_button(self, interaction: discord.Interaction, button: Button):
+            with profiler.handler("close_ticket_button", interaction.guild, interaction.user):
+                ticket = registry.get_ticket_by_channel(interaction.channel_id) if interaction.guild else None
+                if not ticket:
+                    await interaction.response.send_message("This ticket is already closed.", ephemeral=True)
+                    return
+                
+                # The closing notice answers the interaction
+                notify = lambda: interaction.response.send_message(CLOSING_NOTICE)
+                if not await close_ticket(interaction.guild, interaction.channel, ticket, interaction.user, notify=notify):
+                    await interaction.response.send_message("This ticket is already being closed.", ephemeral=True)
+    
+    # Registered without a message ID in setup_hook, so buttons and menus on any message,
+    # including ones sent before a restart, are answered without a setup pass per guild
+    bot.ticket_views = [CreateTicketView, TicketTypeView, CloseTicketView]
+    
+    def message_view(view):
+        """
+        Stop a view before it is sent with a message.
+        
+        discord.py keeps every live view sent with a message until the message
+        is deleted, which ticket channels never do. A stopped view only
+        supplies the components, and the instances registered in setup_hook
+        answer their clicks by custom ID.
+        """
+        view.stop()
+        return view
+    
+    async def find_ticket_panel(channel):
+        """
+        Find the bot's most recent Create Ticket panel in a channel.
+        
+        Returns:
+            discord.Message or None
+        """
+        async for message in channel.history(limit=PANEL_SEARCH_LIMIT):
+            if message.author.id == bot.user.id and any(embed.title == PANEL_TITLE for embed in message.embeds):
+                return message
+        return None
+    
+    # Handle a ticket type being picked from the dropdown
+    async def handle_ticket_select(interaction, ticket_type):
+        guild = interaction.guild
+        user = interaction.user
+        
+        # Acknowledge right away so slow REST calls can't outlast the 3 second window
+        with span("defer"):
+            await interaction.response.defer(ephemeral=True, thinking=True)
+        
+        # Check if user already has a ticket
+        existing = registry.get_ticket(guild.id, user.id)
+        if existing:
+            await interaction.followup.send(f"You already have a ticket open: <#{existing.channel_id}>", ephemeral=True)
+            return
+        
+        config = await guild_config.load(guild.id)
+        if ticket_type not in config.ticket_type_labels():
+            await interaction.followup.send("That ticket type is no longer available, please pick another one.", ephemeral=True)
+            return
+        if config.max_open_tickets and len(registry.open_tickets(guild.id)) >= config.max_open_tickets:
+            await interaction.followup.send("Too many tickets are open right now, please try again later.", ephemeral=True)
+            return
+        
+        # Create the ticket with the selected type, double-clicks join the creation in flight
+        try:
+            ticket_channel, shared = await ticket_creations.run(
+                (guild.id, user.id),
+                lambda: admit_and_create_ticket(interaction, guild, user, ticket_type)
+            )
+        except AdmissionError as e:
+            await interaction.followup.send(str(e), ephemeral=True)
+            return
+        except Exception as e:
+            logger.error(f"Failed to create ticket for {user} in {guild.name}: {e}")
+            await interaction.followup.send("Something went wrong creating your ticket, please try again.", ephemeral=True)
+            return
         
-    @bot.command(name="setup_tickets")
+        with span("followup"):
+            if shared:
+                await interaction.followup.send(f"You already have a ticket open: {ticket_channel.mention}", ephemeral=True)
+            else:
+                await interaction.followup.send(f"Ticket created: {ticket_channel.mention}", ephemeral=True)
+    
+    # Wait for admission, telling the user their queue position if they have to wait
+    async def admit_and_create_ticket(interaction, guild, user, ticket_type):
+        async def notify_position(position):
+            await interaction.followup.send(
+                f"Lots of tickets are being opened right now. You're number {position} in the queue, "
+                "your ticket will be created shortly.",
+                ephemeral=True
+            )
+        
+        with span("admission"):
+            await admission.admit(guild, user.id, on_queued=notify_position)
+        try:
+            return await create_ticket(guild, user, ticket_type)
+        except Exception:
+            # The user got no ticket, so they can retry without waiting out the cooldown
+            admission.refund(guild, user.id)
+            raise
+    
+    # Create function to handle ticket creation, returns the ticket channel
+    async def create_ticket(guild, user, ticket_type):
+        # Get the staff role ID, loading the settings if this guild isn't cached yet
+        staff_role_id = (await guild_config.load(guild.id)).staff_role_id
+        
+        # Create a private channel
+        overwrites = {
+            guild.default_role: discord.PermissionOverwrite(view_channel=False),
+            user: discord.PermissionOverwrite(view_channel=True, send_messages=True, read_message_history=True),
+            guild.me: discord.PermissionOverwrite(view_channel=True, send_messages=True)
+        }
+        
+        # Add staff role if it exists
+        if staff_role_id:
+            role = guild.get_role(staff_role_id)
+            if role:
+                overwrites[role] = discord.PermissionOverwrite(view_channel=True, send_messages=True)
+        
+        # Claim a pooled channel or create one, with ticket type in the name
+        ticket_channel = await pool.open_channel(
+            guild,
+            name=f"ticket-{ticket_type.lower()}-{user.name}",
+            topic=ticket_topic(ticket_type, user),
+            overwrites=overwrites
+        )
+        registry.add_ticket(ticket_channel, user.id, ticket_type)
+        auto_close.track(ticket_channel.id)
+        # Pooled channels were created earlier, so the ticket opens now rather than at channel creation
+        opened_at = discord.utils.utcnow()
+        store.record_open(guild.id, user.id, ticket_type, ticket_channel.id, opened_at)
+        analytics.ticket_opened(guild.id, ticket_channel.id, user.id, ticket_type, opened_at.timestamp())
+        TICKETS_OPENED.inc(type=ticket_type)
+        
+        # Create first message with ticket information
+        embed = discord.Embed(
+            title=f"{ticket_type} Ticket",
+            description=f"Thank you for opening a ticket, {user.mention}!",
+            color=discord.Color.blue(),
+            timestamp=discord.utils.utcnow()
+        )
+        embed.add_field(name="Type", value=ticket_type, inline=True)
+        embed.add_field(name="Created By", value=user.mention, inline=True)
+        embed.set_footer(text="A staff member will be with you shortly.")
+        
+        with span("send"):
+            await ticket_channel.send(embed=embed, view=message_view(CloseTicketView()))
+        
+        # Log ticket creation
+        log_embed = discord.Embed(
+            title="Ticket Created",
+            description=f"Ticket created by {user.mention}",
+            color=discord.Color.green(),
+            timestamp=discord.utils.utcnow()
+        )
+        log_embed.add_field(name="Channel", value=ticket_channel.mention, inline=True)
+        log_embed.add_field(name="Type", value=ticket_type, inline=True)
+        log_dispatcher.enqueue(guild, log_embed)
+        
+        return ticket_channel
+    
+    @bot.hybrid_command(name="setup_tickets", brief="Sets up the ticket system with logs (Admin only)")
     @commands.has_permissions(administrator=True)
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
     async def setup_tickets_command(ctx, staff_role: discord.Role = None):
         """
         Set up ticket system with ticket channel and logs channel.
@@ -165,9 +499,11 @@ def setup_commands(bot):
         if not guild:
             await ctx.send("This command can only be used in a server.")
             return
+        # Creating the channels can outlast the 3 seconds a slash command has to answer
+        await ctx.defer()
             
         # Create logs channel if it doesn't exist
-        logs_channel = discord.utils.get(guild.text_channels, name="ticket-logs")
+        logs_channel = registry.get_logs_channel(guild)
         if not logs_channel:
             # Set permissions for logs channel (only admins and staff can see)
             logs_overwrites = {
@@ -179,14 +515,13 @@ def setup_commands(bot):
             if staff_role:
                 logs_overwrites[staff_role] = discord.PermissionOverwrite(view_channel=True)
                 
-                # Store staff role ID in environment variable
-                os.environ["STAFF_ROLE_ID"] = str(staff_role.id)
-                
-            logs_channel = await guild.create_text_channel(
-                name="ticket-logs",
-                overwrites=logs_overwrites,
-                topic="Logs for all ticket activities"
-            )
+            with span("create_text_channel"):
+                logs_channel = await guild.create_text_channel(
+                    name=LOGS_CHANNEL_NAME,
+                    overwrites=logs_overwrites,
+                    topic="Logs for all ticket activities"
+                )
+            registry.set_logs_channel(logs_channel)
             
             await logs_channel.send(embed=discord.Embed(
                 title="Ticket Logs Channel",
@@ -195,113 +530,36 @@ def setup_commands(bot):
             ))
         
         # Create tickets channel
-        tickets_channel = discord.utils.get(guild.text_channels, name="create-ticket")
+        tickets_channel = registry.get_create_channel(guild)
+        panel = None
         if not tickets_channel:
-            tickets_channel = await guild.create_text_channel(
-                name="create-ticket",
-                topic="Create a support ticket here"
-            )
-            
-            # Define the ticket type select dropdown
-            class TicketTypeSelect(discord.ui.Select):
-                def __init__(self):
-                    options = [
-                        discord.SelectOption(label="Support", description="Get help with an issue", emoji="❓"),
-                        discord.SelectOption(label="Purchase", description="Questions about purchasing", emoji="💰")
-                    ]
-                    super().__init__(placeholder="Select ticket type...", min_values=1, max_values=1, options=options)
-                    
-                async def callback(self, interaction: discord.Interaction):
-                    user = interaction.user
-                    ticket_type = self.values[0]
-                    
-                    # Check if user already has a ticket
-                    existing_channel = discord.utils.get(guild.text_channels, name=f"ticket-{user.name.lower()}")
-                    if existing_channel:
-                        await interaction.response.send_message("You already have a ticket open.", ephemeral=True)
-                        return
-                    
-                    # Create the ticket with the selected type
-                    await create_ticket(interaction, user, ticket_type)
-            
-            # Class for dropdown selection view
-            class TicketTypeView(discord.ui.View):
-                def __init__(self):
-                    super().__init__(timeout=None)
-                    self.add_item(TicketTypeSelect())
-            
-            # Create function to handle ticket creation
-            async def create_ticket(interaction, user, ticket_type):
-                # Get the staff role ID
-                staff_role_id = int(os.environ.get("STAFF_ROLE_ID", "0"))
-                
-                # Create a private channel
-                overwrites = {
-                    guild.default_role: discord.PermissionOverwrite(view_channel=False),
-                    user: discord.PermissionOverwrite(view_channel=True, send_messages=True, read_message_history=True),
-                    guild.me: discord.PermissionOverwrite(view_channel=True, send_messages=True)
-                }
-                
-                # Add staff role if it exists
-                if staff_role_id:
-                    role = guild.get_role(staff_role_id)
-                    if role:
-                        overwrites[role] = discord.PermissionOverwrite(view_channel=True, send_messages=True)
-                
-                # Create channel with ticket type in the name
-                ticket_channel = await guild.create_text_channel(
-                    name=f"ticket-{ticket_type.lower()}-{user.name}",
-                    overwrites=overwrites,
-                    topic=f"{ticket_type} ticket for {user.name}"
-                )
-                
-                # Create first message with ticket information
-                embed = discord.Embed(
-                    title=f"{ticket_type} Ticket",
-                    description=f"Thank you for opening a ticket, {user.mention}!",
-                    color=discord.Color.blue(),
-                    timestamp=discord.utils.utcnow()
+            with span("create_text_channel"):
+                tickets_channel = await guild.create_text_channel(
+                    name=CREATE_CHANNEL_NAME,
+                    topic="Create a support ticket here"
                 )
-                embed.add_field(name="Type", value=ticket_type, inline=True)
-                embed.add_field(name="Created By", value=user.mention, inline=True)
-                embed.set_footer(text="A staff member will be with you shortly.")
-                
-                await ticket_channel.send(embed=embed)
-                await interaction.response.send_message(f"Ticket created: {ticket_channel.mention}", ephemeral=True)
-                
-                # Log ticket creation
-                log_embed = discord.Embed(
-                    title="Ticket Created",
-                    description=f"Ticket created by {user.mention}",
-                    color=discord.Color.green(),
-                    timestamp=discord.utils.utcnow()
-                )
-                log_embed.add_field(name="Channel", value=ticket_channel.mention, inline=True)
-                log_embed.add_field(name="Type", value=ticket_type, inline=True)
-                await logs_channel.send(embed=log_embed)
-            
-            # Create button for ticket creation
-            button = Button(label="Create Ticket", style=discord.ButtonStyle.green)
-            
-            async def button_callback(interaction: discord.Interaction):
-                # Show dropdown when button is clicked
-                view = TicketTypeView()
-                await interaction.response.send_message("Please select a ticket type:", view=view, ephemeral=True)
-            
-            button.callback = button_callback
-            view = View()
-            view.add_item(button)
-            
+            registry.set_create_channel(tickets_channel)
+        else:
+            panel = await find_ticket_panel(tickets_channel)
+        
+        if panel:
+            # Panels posted before the button was persistent had a random custom ID and no longer respond
+            await panel.edit(view=message_view(CreateTicketView()))
+        else:
             embed = discord.Embed(
-                title="Support Tickets",
+                title=PANEL_TITLE,
                 description="Need help? Click the button below to create a ticket.",
                 color=discord.Color.blue()
             )
             
-            # Send the initial button view
-            await tickets_channel.send(embed=embed, view=view)
+            # Send the initial button view, the persistent CreateTicketView handles its clicks
+            await tickets_channel.send(embed=embed, view=message_view(CreateTicketView()))
         
-        # Add close ticket command outside to avoid redefinition errors
+        # Remember the channels, and the staff role if one was given
+        settings = {"logs_channel_id": logs_channel.id, "create_channel_id": tickets_channel.id}
+        if staff_role:
+            settings["staff_role_id"] = staff_role.id
+        await guild_config.update(guild.id, **settings)
         
         # Confirmation message
         setup_embed = discord.Embed(
@@ -315,41 +573,494 @@ def setup_commands(bot):
             setup_embed.add_field(name="Staff Role", value=staff_role.mention, inline=False)
         
         await ctx.send(embed=setup_embed)
+        pool.request_refill(guild)
         logger.info(f"Ticket system setup by {ctx.author}")
 
+    @bot.hybrid_command(name="ticketpool", brief="Shows or sets the pre-created ticket channel pool size (Admin only)")
+    @commands.has_permissions(administrator=True)
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    async def ticketpool_command(ctx, size: int = None):
+        """
+        Show or set the number of pre-created ticket channels kept for this server.
+        
+        Args:
+            size: New pool size, 0 disables the pool (optional)
+        """
+        guild = ctx.guild
+        
+        if not guild:
+            await ctx.send("This command can only be used in a server.")
+            return
+        await ctx.defer()
+        
+        if not registry.get_create_channel(guild):
+            await ctx.send(f"Set up the ticket system first with `{bot.command_prefix}setup_tickets`.")
+            return
+        
+        if size is not None:
+            await guild_config.update(guild.id, pool_size=max(0, size))
+            pool.request_refill(guild)
+            logger.info(f"Ticket pool size set to {size} in {guild.name} by {ctx.author}")
+        
+        status = pool.status(guild)
+        embed = discord.Embed(
+            title="Ticket Channel Pool",
+            description="Pre-created channels are claimed when a ticket is opened.",
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="Target Size", value=str(status["size"]), inline=True)
+        embed.add_field(name="Available", value=str(status["available"]), inline=True)
+        embed.add_field(name="Refill Interval", value=f"{pool.refill_interval:g}s", inline=True)
+        for path, label in (("pool", "Pool Claim"), ("cold", "Cold Create")):
+            count, mean = status["latency"][path]
+            value = f"{mean * 1000:.0f}ms avg over {count}" if count else "No data"
+            embed.add_field(name=label, value=value, inline=True)
+        
+        await ctx.send(embed=embed)
+
+    @bot.hybrid_command(name="ticketconfig", brief="Shows or changes this server's ticket settings (Admin only)")
+    @commands.has_permissions(administrator=True)
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    async def ticketconfig_command(ctx, setting: str = None, *, value: str = None):
+        """
+        Show or change this server's ticket settings.
+
+        Args:
+            setting: staff_role, types, max_open or auto_close (optional, shows the settings if omitted)
+            value: The new value, "none" clears staff_role, 0 removes the max_open limit and turns auto_close off
+        """
+        guild = ctx.guild
+
+        if not guild:
+            await ctx.send("This command can only be used in a server.")
+            return
+        await ctx.defer()
+
+        prefix = bot.command_prefix
+        if setting is not None:
+            setting = setting.lower()
+            if value is None:
+                await ctx.send(f"Usage: `{prefix}ticketconfig {setting} <value>`")
+                return
+
+            if setting == "staff_role":
+                role = None if value.lower() == "none" else await commands.RoleConverter().convert(ctx, value)
+                await guild_config.update(guild.id, staff_role_id=role.id if role else None)
+            elif setting == "types":
+                labels = list(dict.fromkeys(value.replace(",", " ").split()))
+                if not labels or len(labels) > MAX_TICKET_TYPES or any(len(label) > 50 for label in labels):
+                    await ctx.send(f"Give between 1 and {MAX_TICKET_TYPES} ticket types of up to 50 characters, separated by spaces.")
+                    return
+                # Keep the description and emoji of types that stay
+                current = {t["label"]: t for t in guild_config.get(guild.id).ticket_types}
+                types = [current.get(label, {"label": label, "description": "", "emoji": ""}) for label in labels]
+                await guild_config.update(guild.id, ticket_types=types)
+            elif setting == "max_open":
+                try:
+                    limit = int(value)
+                except ValueError:
+                    await ctx.send("The limit must be a number, 0 removes it.")
+                    return
+                await guild_config.update(guild.id, max_open_tickets=max(0, limit) or None)
+            elif setting == "auto_close":
+                try:
+                    hours = float(value)
+                except ValueError:
+                    await ctx.send("Give the number of idle hours before a ticket is closed, 0 turns auto-close off.")
+                    return
+                await guild_config.update(guild.id, auto_close_hours=max(0.0, hours))
+                auto_close.reschedule_guild(guild.id)
+            else:
+                await ctx.send("Unknown setting. Use `staff_role`, `types`, `max_open` or `auto_close`.")
+                return
+            logger.info(f"Ticket setting {setting} set to {value} in {guild.name} by {ctx.author}")
+
+        config = await guild_config.load(guild.id)
+        embed = discord.Embed(
+            title="Ticket Settings",
+            description=f"Change a setting with `{prefix}ticketconfig <setting> <value>`.",
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="staff_role", value=f"<@&{config.staff_role_id}>" if config.staff_role_id else "Not set", inline=True)
+        embed.add_field(name="max_open", value=str(config.max_open_tickets or "No limit"), inline=True)
+        hours = auto_close.get_hours(guild.id)
+        embed.add_field(name="auto_close", value=f"After {hours:g} idle hour(s)" if hours else "Off", inline=True)
+        embed.add_field(name="types", value=", ".join(config.ticket_type_labels()), inline=False)
+        embed.add_field(name="Logs Channel", value=f"<#{config.logs_channel_id}>" if config.logs_channel_id else "Not set up", inline=True)
+        embed.add_field(name="Ticket Channel", value=f"<#{config.create_channel_id}>" if config.create_channel_id else "Not set up", inline=True)
+        embed.add_field(name="Pool Size", value=str(pool.get_size(guild)), inline=True)
+        await ctx.send(embed=embed)
+
+    @bot.hybrid_command(
+        name="ticketstats",
+        brief="Shows ticket counts and response/close times, e.g. `{prefix}ticketstats 24h` (Admin only)",
+        description="Shows ticket counts and response/close times per type (Admin only)"
+    )
+    @commands.has_permissions(administrator=True)
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    async def ticketstats_command(ctx, window: str = "7d"):
+        """
+        Show ticket counts and response and close times per ticket type.
+
+        Args:
+            window: How far back to look, e.g. 24h, 7d or "all" for the whole retention period
+        """
+        guild = ctx.guild
+
+        if not guild:
+            await ctx.send("This command can only be used in a server.")
+            return
+
+        if window.lower() == "all":
+            seconds = analytics.retention
+        else:
+            try:
+                seconds = parse_duration(window)
+            except ValueError as e:
+                await ctx.send(str(e))
+                return
+        seconds = min(seconds, analytics.retention)
+
+        summary = analytics.summary(guild.id, seconds)
+        open_counts = {}
+        for entry in registry.open_tickets(guild.id):
+            open_counts[entry.ticket_type] = open_counts.get(entry.ticket_type, 0) + 1
+
+        def describe(sketch):
+            if not sketch.count:
+                return "No data"
+            return f"median {format_duration(sketch.quantile(0.5))}, p95 {format_duration(sketch.quantile(0.95))}"
+
+        embed = discord.Embed(
+            title="Ticket Stats",
+            description=f"Last {format_duration(seconds)}, open counts are current.",
+            color=discord.Color.blue()
+        )
+        total = TypeStats()
+        for ticket_type in sorted(set(summary) | set(open_counts)):
+            stats = summary.get(ticket_type, TypeStats())
+            total.merge(stats)
+            embed.add_field(name=ticket_type.capitalize(), value=(
+                f"Opened {stats.opened}, closed {stats.closed}, open {open_counts.get(ticket_type, 0)}\n"
+                f"First response: {describe(stats.response)}\n"
+                f"Time to close: {describe(stats.resolution)}"
+            ), inline=False)
+        embed.insert_field_at(0, name="All Types", value=(
+            f"Opened {total.opened}, closed {total.closed}, open {sum(open_counts.values())}\n"
+            f"First response: {describe(total.response)}\n"
+            f"Time to close: {describe(total.resolution)}"
+        ), inline=False)
+        await ctx.send(embed=embed)
+
+    @bot.hybrid_command(name="profile", brief="Profiles the next uses of a command with cProfile (Admin only)")
+    @commands.has_permissions(administrator=True)
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    async def profile_command(ctx, command_name: str, count: int = 1):
+        """
+        Profile the next invocations of a command with cProfile.
+        
+        Args:
+            command_name: The command to profile
+            count: How many invocations to profile (default: 1)
+        """
+        command = bot.get_command(command_name)
+        if not command:
+            await ctx.send(f"Unknown command `{command_name}`.")
+            return
+        
+        count = max(1, min(count, 10))
+        profiler.start_profiling(command.qualified_name, count)
+        await ctx.send(f"Profiling the next {count} use(s) of `{bot.command_prefix}{command.qualified_name}`. Stats are saved to `{profiler.output_dir}` and logged.")
+        logger.info(f"Profiling of {command.qualified_name} enabled by {ctx.author}")
 
     # Add close ticket command
-    @bot.command(name="close")
+    @bot.hybrid_command(name="close", brief="Closes the current ticket (use in ticket channels)")
+    @app_commands.guild_only()
     async def close_ticket_command(ctx):
         """Close the current ticket channel."""
-        if not ctx.channel.name.startswith("ticket-"):
+        ticket = registry.get_ticket_by_channel(ctx.channel.id) if ctx.guild else None
+        if not ticket:
             await ctx.send("This command can only be used inside a ticket channel.", delete_after=5)
             return
+        
+        # Sent with ctx.send so the notice also answers /close
+        notify = lambda: ctx.send(CLOSING_NOTICE)
+        if not await close_ticket(ctx.guild, ctx.channel, ticket, ctx.author, notify=notify):
+            await ctx.send("This ticket is already being closed.", delete_after=5)
+    
+    async def close_ticket(guild, channel, ticket, closed_by, reason=None, notify=None):
+        """
+        Start closing a ticket, used by !close, the Close Ticket button and the auto-close scheduler.
+        
+        Args:
+            guild: The Discord guild
+            channel: The ticket channel
+            ticket: The ticket's TicketEntry
+            closed_by: The member closing the ticket
+            reason: Why the ticket was closed, shown in the log (optional)
+            notify: Async callable sending the closing notice (defaults to a message in the channel)
+        
+        Returns:
+            bool: False if the ticket was already being closed
+        """
+        if channel.id in closing_channels:
+            return False
+        closing_channels.add(channel.id)
+        
+        # Notify, export, log and delete in the background, the channel is only deleted once the export is done
+        notify = notify or (lambda: channel.send(CLOSING_NOTICE))
+        transcripts.run_in_background(finish_close(guild, channel, ticket, closed_by, reason, notify))
+        return True
+    
+    auto_close.on_close = close_ticket
+    
+    async def finish_close(guild, channel, ticket, closed_by, reason=None, notify=None):
+        """Export the ticket transcript, log the close and delete the channel."""
+        with profiler.handler("ticket_close", guild, closed_by):
+            try:
+                await close_pipeline(guild, channel, ticket, closed_by, reason, notify=notify)
+            finally:
+                closing_channels.discard(channel.id)
+    
+    async def close_pipeline(guild, channel, ticket, closed_by, reason=None, archive=False, notify=None):
+        """
+        The close steps, the ticket is left open if the transcript can't be saved.
+        
+        The owner lookup runs alongside the closing notice and the transcript
+        export. The notice is sent before the export starts, so every
+        transcript ends with it. Archived tickets are moved out of the way
+        and made read-only instead of deleted.
+        
+        Returns:
+            bool: Whether the ticket was closed
+        """
+        owner_lookup = asyncio.ensure_future(timed("resolve_owner", resolve_member(guild, ticket.owner_id)))
+        if notify is not None:
+            try:
+                await timed("send", notify())
+            except Exception as e:
+                logger.warning(f"Couldn't send the closing notice in #{channel.name} in {guild.name}: {e}")
+        transcript_files, owner = await asyncio.gather(
+            timed("history_export", transcripts.export(channel)),
+            owner_lookup,
+            return_exceptions=True
+        )
+        
+        if isinstance(transcript_files, BaseException):
+            logger.error(f"Transcript export failed for #{channel.name} in {guild.name}: {transcript_files}")
+            await channel.send(f"Couldn't save the transcript, the ticket was left open. Error: {transcript_files}")
+            return False
+        if isinstance(owner, BaseException):
+            raise owner
+        user_name = owner.name if owner else ticket.owner_name or str(ticket.owner_id)
+        
+        # Queue the log entry with the transcript, the dispatcher sends it in the background
+        log_embed = discord.Embed(
+            title="Ticket Closed",
+            description=f"Ticket for user `{user_name}` was closed by {closed_by.mention}",
+            color=discord.Color.red(),
+            timestamp=discord.utils.utcnow()
+        )
+        log_embed.add_field(name="Type", value=ticket.ticket_type.capitalize(), inline=True)
+        if reason:
+            log_embed.add_field(name="Reason", value=reason, inline=True)
+        log_dispatcher.enqueue(guild, log_embed, files=transcript_files)
+        
+        closed_at = discord.utils.utcnow()
+        store.record_close(channel.id, closed_by.id, closed_at)
+        analytics.ticket_closed(channel.id, closed_at.timestamp())
+        auto_close.forget(channel.id)
+        TICKETS_CLOSED.inc(type=ticket.ticket_type)
+        
+        if archive:
+            with span("archive"):
+                await archive_channel(guild, channel, ticket)
+            return True
+        
+        # Delete the channel
+        with span("delete"):
+            await channel.delete()
+        return True
+    
+    async def archive_channel(guild, channel, ticket):
+        """Move a closed ticket channel to an archive category, read-only for its owner."""
+        overwrites = dict(channel.overwrites)
+        for target in overwrites:
+            if target.id == ticket.owner_id:
+                overwrites[target] = discord.PermissionOverwrite(view_channel=True, send_messages=False, read_message_history=True)
+        category = await archive_categories.reserve(guild)
+        # The new name takes the channel out of the registry, which only indexes ticket- channels
+        await channel.edit(
+            name=f"archived-{channel.name.removeprefix('ticket-')}",
+            category=category,
+            overwrites=overwrites
+        )
+        registry.forget_channel(channel)
+    
+    async def select_tickets(guild, ticket_filter):
+        """
+        Find the open tickets of a guild that match a filter.
+        
+        Returns:
+            list: (TicketEntry, channel) pairs
+        """
+        # Open times come from the database, pooled channels are older than their ticket
+        opened = {ticket.channel_id: ticket.opened_at for ticket in await store.get_open_tickets(guild.id)}
+        now = time.time()
+        matches = []
+        for entry in registry.open_tickets(guild.id):
+            channel = guild.get_channel(entry.channel_id)
+            if channel is None or channel.id in closing_channels:
+                continue
+            opened_at = opened.get(channel.id)
+            opened_at = utc_timestamp(opened_at) if opened_at else channel.created_at.timestamp()
+            if ticket_filter.matches(entry, opened_at, auto_close.last_activity(channel.id), now):
+                matches.append((entry, channel))
+        return matches
+    
+    async def run_bulk(ctx, name, labels, filters, action):
+        """
+        Preview or run a bulk action on the tickets matching the filters.
+        
+        Without a trailing "confirm" only the number of matching tickets is
+        shown. Progress is edited into a status message while it runs.
+        
+        Args:
+            ctx: The command context
+            name: Action name for metrics and logs
+            labels: (verb, present participle, past participle) e.g. ("close", "Closing", "closed")
+            filters: The filter text, optionally ending with "confirm"
+            action: Async callable taking a (TicketEntry, channel) pair
+        """
+        guild = ctx.guild
+        verb, running, finished = labels
+        
+        if not guild:
+            await ctx.send("This command can only be used in a server.")
+            return
+        # Slash commands have 3 seconds to answer, the ticket query and the bulk run can take longer
+        await ctx.defer()
+        if guild.id in bulk_operations:
+            await ctx.send(f"A bulk {bulk_operations[guild.id]} is already running in this server.")
+            return
+        
+        tokens = filters.split()
+        confirm = bool(tokens) and tokens[-1].lower() == "confirm"
+        if confirm:
+            tokens.pop()
+        try:
+            ticket_filter = TicketFilter.parse(" ".join(tokens))
+        except ValueError as e:
+            await ctx.send(str(e))
+            return
+        
+        bulk_operations[guild.id] = name
+        try:
+            matches = await select_tickets(guild, ticket_filter)
+            if not matches:
+                await ctx.send(f"No open tickets match ({ticket_filter.describe()}).")
+                return
+            if not confirm:
+                if ctx.interaction is None:
+                    hint = f"Run `{ctx.message.content} confirm` to {verb} them."
+                else:
+                    hint = f"Run `/{ctx.command.qualified_name}` again with `confirm` at the end of the filters to {verb} them."
+                await ctx.send(f"{len(matches)} ticket(s) match ({ticket_filter.describe()}). {hint}")
+                return
             
-        await ctx.send("Closing ticket...")
-        
-        # Extract ticket type and user from channel name
-        # Format: ticket-type-username
-        channel_parts = ctx.channel.name.split('-')
-        user_name = "unknown"
-        ticket_type = "unknown"
-        
-        if len(channel_parts) >= 3:
-            ticket_type = channel_parts[1]
-            user_name = '-'.join(channel_parts[2:])  # Join the rest in case username has hyphens
-        
-        # Find logs channel
-        logs_channel = discord.utils.get(ctx.guild.text_channels, name="ticket-logs")
-        if logs_channel:
-            log_embed = discord.Embed(
-                title="Ticket Closed",
-                description=f"Ticket for user `{user_name}` was closed by {ctx.author.mention}",
-                color=discord.Color.red(),
-                timestamp=discord.utils.utcnow()
-            )
+            status = await ctx.send(f"{running} {len(matches)} ticket(s)...")
             
-            log_embed.add_field(name="Type", value=ticket_type.capitalize(), inline=True)
-            await logs_channel.send(embed=log_embed)
+            async def show_progress(result):
+                await status.edit(content=(
+                    f"{running} tickets: {result.done + len(result.failed)}/{result.total} "
+                    f"({len(result.failed)} failed, {result.elapsed:.0f}s)"
+                ))
+            
+            result = await bulk.run(name, matches, action, on_progress=show_progress)
+        finally:
+            bulk_operations.pop(guild.id, None)
         
-        # Delete the channel
-        await ctx.channel.delete()
+        summary = f"{result.done}/{result.total} ticket(s) {finished} in {result.elapsed:.0f}s."
+        if result.failed:
+            failures = "\n".join(f"<#{channel.id}>: {error}" for (_, channel), error in result.failed[:10])
+            more = f"\n...and {len(result.failed) - 10} more" if len(result.failed) > 10 else ""
+            summary += f" {len(result.failed)} failed:\n{failures}{more}"
+        await ctx.send(summary)
+        logger.info(f"Bulk {name} of {result.total} ticket(s) by {ctx.author} in {guild.name}")
+    
+    def bulk_close_action(guild, closed_by, archive):
+        """A bulk action that closes (or archives) one ticket through the normal close steps."""
+        reason = f"Bulk {'archive' if archive else 'close'} by {closed_by}"
+        
+        async def action(item):
+            ticket, channel = item
+            if channel.id in closing_channels:
+                raise RuntimeError("already being closed")
+            closing_channels.add(channel.id)
+            try:
+                with profiler.handler("ticket_close", guild, closed_by):
+                    closed = await close_pipeline(guild, channel, ticket, closed_by, reason, archive=archive)
+                if not closed:
+                    raise RuntimeError("transcript export failed, ticket left open")
+            finally:
+                closing_channels.discard(channel.id)
+        
+        return action
+    
+    @bot.hybrid_command(name="bulkclose", brief="Closes every ticket matching filters like `type:Support older:7d idle:2d owner:@user` (Admin only)")
+    @commands.has_permissions(administrator=True)
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    async def bulkclose_command(ctx, *, filters: str = ""):
+        """
+        Close every open ticket matching the filters.
+        
+        Args:
+            filters: type:<type>, older:<duration>, idle:<duration>, owner:<user>, then "confirm" to run
+        """
+        await run_bulk(ctx, "close", ("close", "Closing", "closed"), filters, bulk_close_action(ctx.guild, ctx.author, archive=False))
+    
+    @bot.hybrid_command(name="bulkarchive", brief="Like bulkclose, but moves the channels to an archive category instead of deleting them (Admin only)")
+    @commands.has_permissions(administrator=True)
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    async def bulkarchive_command(ctx, *, filters: str = ""):
+        """
+        Close every open ticket matching the filters, keeping the channels in an archive category.
+        
+        Args:
+            filters: type:<type>, older:<duration>, idle:<duration>, owner:<user>, then "confirm" to run
+        """
+        await run_bulk(ctx, "archive", ("archive", "Archiving", "archived"), filters, bulk_close_action(ctx.guild, ctx.author, archive=True))
+    
+    @bot.hybrid_command(name="bulkassign", brief="Gives a staff member the tickets matching the filters (Admin only)")
+    @commands.has_permissions(administrator=True)
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    async def bulkassign_command(ctx, staff: discord.Member, *, filters: str = ""):
+        """
+        Give a staff member the open tickets matching the filters.
+        
+        Other individually added members lose access; the owner and staff role keep it.
+        
+        Args:
+            staff: The staff member taking over the tickets
+            filters: type:<type>, older:<duration>, idle:<duration>, owner:<user>, then "confirm" to run
+        """
+        async def assign(item):
+            ticket, channel = item
+            # Uncached members show up as discord.Object targets typed as Member
+            overwrites = {
+                target: overwrite for target, overwrite in channel.overwrites.items()
+                if isinstance(target, discord.Role) or getattr(target, "type", None) is discord.Role
+                or target.id in (ticket.owner_id, ctx.guild.me.id)
+            }
+            overwrites[staff] = discord.PermissionOverwrite(view_channel=True, send_messages=True, read_message_history=True)
+            await channel.edit(overwrites=overwrites)
+            await channel.send(f"This ticket has been assigned to {staff.mention}.")
+        
+        await run_bulk(ctx, "assign", ("assign", "Assigning", "assigned"), filters, assign)
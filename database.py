@@ -0,0 +1,336 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+
+from sqlalchemy import JSON, BigInteger, DateTime, Float, Integer, String, bindparam, create_engine, insert, inspect, or_, select, text, update
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATABASE_URL = "sqlite:///tickets.db"
+
+# Errors caused by the rows themselves, retrying the same batch can't succeed
+ROW_ERRORS = (IntegrityError, DataError)
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Ticket(Base):
+    """A ticket, open or closed."""
+    __tablename__ = "tickets"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    guild_id: Mapped[int] = mapped_column(BigInteger, index=True)
+    owner_id: Mapped[int] = mapped_column(BigInteger, index=True)
+    ticket_type: Mapped[str] = mapped_column(String(50))
+    channel_id: Mapped[int] = mapped_column(BigInteger, unique=True)
+    opened_at = mapped_column(DateTime(timezone=True))
+    closed_at = mapped_column(DateTime(timezone=True), nullable=True)
+    closed_by_id = mapped_column(BigInteger, nullable=True)
+    first_response_at = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class GuildSettings(Base):
+    """Per-guild ticket settings, unset columns fall back to the defaults."""
+    __tablename__ = "guild_settings"
+
+    guild_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    staff_role_id = mapped_column(BigInteger, nullable=True)
+    logs_channel_id = mapped_column(BigInteger, nullable=True)
+    create_channel_id = mapped_column(BigInteger, nullable=True)
+    ticket_types = mapped_column(JSON, nullable=True)
+    pool_size = mapped_column(Integer, nullable=True)
+    max_open_tickets = mapped_column(Integer, nullable=True)
+    auto_close_hours = mapped_column(Float, nullable=True)
+    updated_at = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class TicketActivity(Base):
+    """Last activity of an open ticket, used to auto-close idle tickets."""
+    __tablename__ = "ticket_activity"
+
+    channel_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    last_activity_at = mapped_column(DateTime(timezone=True))
+    warned_at = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class BotState(Base):
+    """Small values the bot keeps between restarts, such as the hash of the synced slash commands."""
+    __tablename__ = "bot_state"
+
+    key: Mapped[str] = mapped_column(String(100), primary_key=True)
+    value = mapped_column(String(200), nullable=True)
+    updated_at = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+def add_missing_columns(engine):
+    """
+    Add columns that were added to a model after its table was created.
+
+    create_all only creates missing tables; new columns are all nullable,
+    so adding them in place is enough to upgrade an existing database.
+    """
+    existing_tables = inspect(engine).get_table_names()
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    logger.info(f"Added column {table.name}.{column.name}")
+
+
+def get_database_url():
+    """
+    Get the database URL from the environment.
+
+    Falls back to a local SQLite file. Replit and Heroku style
+    "postgres://" URLs are rewritten to the scheme SQLAlchemy expects.
+
+    Returns:
+        str: The SQLAlchemy database URL
+    """
+    url = os.environ.get("DATABASE_URL", DEFAULT_DATABASE_URL)
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+class TicketStore:
+    """
+    Persistent ticket table with a write-behind queue.
+
+    Writes are queued and flushed by a background task, one transaction
+    per batch, so database round-trips never sit on the interaction path.
+    Reads run in a worker thread.
+    """
+
+    def __init__(self, url=None, flush_interval=1.0, max_batch=200, max_retries=3):
+        """
+        Args:
+            url: SQLAlchemy database URL (defaults to DATABASE_URL)
+            flush_interval: Max seconds a write waits before being flushed
+            max_batch: Max number of writes per transaction
+            max_retries: Attempts per batch before it is dropped
+        """
+        self.url = url or get_database_url()
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.engine = None
+        self._queue = asyncio.Queue()
+        self._activity = {}  # channel_id -> latest activity row waiting to be written
+        self._task = None
+
+    async def start(self):
+        """Create the schema if needed and start the flush task."""
+        if self._task:
+            return
+        self.engine = create_engine(self.url, pool_pre_ping=True)
+        await asyncio.to_thread(add_missing_columns, self.engine)
+        await asyncio.to_thread(Base.metadata.create_all, self.engine)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Ticket store started ({self.engine.url.get_backend_name()})")
+
+    async def close(self):
+        """Flush every queued write and stop the flush task."""
+        if not self._task:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.engine.dispose()
+        logger.info("Ticket store closed")
+
+    def record_open(self, guild_id, owner_id, ticket_type, channel_id, opened_at):
+        """Queue the insert for a newly opened ticket."""
+        self._queue.put_nowait(("open", {
+            "guild_id": guild_id,
+            "owner_id": owner_id,
+            "ticket_type": ticket_type,
+            "channel_id": channel_id,
+            "opened_at": opened_at,
+        }))
+
+    def record_close(self, channel_id, closed_by_id, closed_at):
+        """Queue the update that marks a ticket as closed."""
+        self._queue.put_nowait(("close", {
+            "b_channel_id": channel_id,
+            "b_closed_by_id": closed_by_id,
+            "b_closed_at": closed_at,
+        }))
+
+    def record_first_response(self, channel_id, responded_at):
+        """Queue the update that stores when staff first replied in a ticket."""
+        self._queue.put_nowait(("first_response", {
+            "b_channel_id": channel_id,
+            "b_first_response_at": responded_at,
+        }))
+
+    def record_activity(self, channel_id, last_activity_at, warned_at=None):
+        """
+        Queue the activity state of a ticket.
+
+        Called for every message in a ticket, so only the latest state per
+        channel is kept until the next flush.
+        """
+        if channel_id not in self._activity:
+            self._queue.put_nowait(("activity", channel_id))
+        self._activity[channel_id] = {
+            "channel_id": channel_id,
+            "last_activity_at": last_activity_at,
+            "warned_at": warned_at,
+        }
+
+    @property
+    def pending(self):
+        """Number of writes waiting to be flushed."""
+        return self._queue.qsize()
+
+    async def get_open_tickets(self, guild_id=None):
+        """
+        Fetch every ticket that has not been closed.
+
+        Args:
+            guild_id: Restrict the result to one guild (optional)
+
+        Returns:
+            list[Ticket]
+        """
+        def query():
+            stmt = select(Ticket).where(Ticket.closed_at.is_(None))
+            if guild_id is not None:
+                stmt = stmt.where(Ticket.guild_id == guild_id)
+            with Session(self.engine, expire_on_commit=False) as session:
+                return list(session.scalars(stmt))
+        return await asyncio.to_thread(query)
+
+    async def get_tickets_since(self, since):
+        """
+        Fetch every ticket that is open or changed since a point in time.
+
+        Args:
+            since: Epoch seconds
+
+        Returns:
+            list[Ticket]
+        """
+        since = datetime.fromtimestamp(since, tz=timezone.utc)
+
+        def query():
+            stmt = select(Ticket).where(or_(
+                Ticket.closed_at.is_(None),
+                Ticket.opened_at >= since,
+                Ticket.closed_at >= since,
+                Ticket.first_response_at >= since,
+            ))
+            with Session(self.engine, expire_on_commit=False) as session:
+                return list(session.scalars(stmt))
+        return await asyncio.to_thread(query)
+
+    async def get_ticket_activity(self, channel_ids):
+        """
+        Fetch the stored activity of tickets.
+
+        Returns:
+            dict: channel_id -> TicketActivity
+        """
+        channel_ids = list(channel_ids)
+
+        def query():
+            with Session(self.engine, expire_on_commit=False) as session:
+                rows = session.scalars(select(TicketActivity).where(TicketActivity.channel_id.in_(channel_ids)))
+                return {row.channel_id: row for row in rows}
+        return await asyncio.to_thread(query)
+
+    async def _run(self):
+        """Collect queued writes into batches and flush them."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Swap coalesced activity markers for the latest state of their channel
+            writes = [
+                ("activity", self._activity.pop(params)) if op == "activity" else (op, params)
+                for op, params in batch
+            ]
+            try:
+                await self._flush(writes)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch):
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+                return
+            except ROW_ERRORS as e:
+                logger.error(f"Ticket store batch rejected, writing its {len(batch)} operation(s) one at a time: {e}")
+                await asyncio.to_thread(self._write_each, batch)
+                return
+            except Exception as e:
+                logger.error(f"Ticket store flush failed (attempt {attempt}/{self.max_retries}): {e}")
+                await asyncio.sleep(attempt)
+        logger.error(f"Dropped {len(batch)} ticket write(s) after {self.max_retries} attempts")
+
+    def _write_each(self, batch):
+        """Write operations in their own transactions, so a bad row only drops itself."""
+        for op, params in batch:
+            try:
+                self._write_batch([(op, params)])
+            except Exception as e:
+                logger.error(f"Dropped ticket {op} write: {e}")
+
+    def _write_batch(self, batch):
+        """Write one batch of queued operations in a single transaction."""
+        opens = [params for op, params in batch if op == "open"]
+        closes = [params for op, params in batch if op == "close"]
+        responses = [params for op, params in batch if op == "first_response"]
+        activity = [params for op, params in batch if op == "activity"]
+
+        with self.engine.begin() as conn:
+            if opens:
+                conn.execute(insert(Ticket), opens)
+            if closes:
+                conn.execute(
+                    update(Ticket)
+                    .where(Ticket.channel_id == bindparam("b_channel_id"))
+                    .where(Ticket.closed_at.is_(None))
+                    .values(closed_at=bindparam("b_closed_at"), closed_by_id=bindparam("b_closed_by_id")),
+                    closes
+                )
+            if responses:
+                conn.execute(
+                    update(Ticket)
+                    .where(Ticket.channel_id == bindparam("b_channel_id"))
+                    .where(Ticket.first_response_at.is_(None))
+                    .values(first_response_at=bindparam("b_first_response_at")),
+                    responses
+                )
+            if activity:
+                # Upsert, merge works the same on SQLite and Postgres
+                with Session(bind=conn) as session:
+                    for params in activity:
+                        session.merge(TicketActivity(**params))
+                    session.flush()
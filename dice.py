@@ -0,0 +1,298 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+MAX_TERMS = 20
+MAX_DICE = 1_000_000  # per roll, across all terms
+MAX_SIDES = 1_000_000
+MAX_TRIALS = 1_000_000
+# Dice rolled by one simulation (dice per roll x trials), about two seconds of work
+MAX_SIMULATED_DICE = 100_000_000
+MAX_CONSTANT = 1_000_000
+# Rounds of re-rolls for exploding dice, each round only re-rolls the dice that exploded again
+MAX_EXPLOSIONS = 100
+# Dice rolled per vectorized batch when simulating, bounds memory to ~32MB of int64
+CHUNK_CELLS = 4_000_000
+
+TOKEN_PATTERN = re.compile(r"\s*([+-]?)\s*(?:(\d*)d(\d+|%)((?:!|[kd][hl]?\d*)*)|(\d+))\s*", re.IGNORECASE)
+MODIFIER_PATTERN = re.compile(r"(!)|([kd])([hl]?)(\d*)", re.IGNORECASE)
+
+_rng = np.random.default_rng()
+
+
+class DiceError(ValueError):
+    """A dice expression that can't be parsed or is over the limits."""
+
+
+@dataclass(frozen=True)
+class DiceTerm:
+    """NdS with optional keep/drop and exploding dice, added or subtracted."""
+    sign: int
+    count: int
+    sides: int
+    keep: int = None  # dice kept after the roll, None keeps all
+    keep_highest: bool = True
+    explode: bool = False
+
+    @property
+    def notation(self):
+        text = f"{self.count}d{self.sides}{'!' if self.explode else ''}"
+        if self.keep is not None:
+            text += f"k{'h' if self.keep_highest else 'l'}{self.keep}"
+        return text
+
+    def roll(self, trials, rng):
+        """
+        Roll the dice of this term for many trials at once.
+
+        Dice are rows and trials are columns, so sums and keep/drop run
+        along the long axis. Exploding dice add their re-rolls to the die
+        that exploded.
+
+        Returns:
+            numpy.ndarray: int64 array of shape (count, trials)
+        """
+        values = rng.integers(1, self.sides + 1, size=(self.count, trials), dtype=np.int64)
+        if self.explode:
+            flat = values.reshape(-1)
+            exploding = np.flatnonzero(flat == self.sides)
+            for _ in range(MAX_EXPLOSIONS):
+                if not exploding.size:
+                    break
+                rerolls = rng.integers(1, self.sides + 1, size=exploding.size, dtype=np.int64)
+                flat[exploding] += rerolls
+                exploding = exploding[rerolls == self.sides]
+        return values
+
+    def totals(self, values):
+        """Sum the kept dice of each trial, with the term's sign."""
+        keep = self.count if self.keep is None else min(self.keep, self.count)
+        if keep == 0:
+            return np.zeros(values.shape[1], dtype=np.int64)
+        if keep == self.count:
+            total = values.sum(axis=0)
+        elif keep == 1:
+            total = values.max(axis=0) if self.keep_highest else values.min(axis=0)
+        elif keep == self.count - 1:
+            # Dropping one die, cheaper than sorting
+            total = values.sum(axis=0) - (values.min(axis=0) if self.keep_highest else values.max(axis=0))
+        else:
+            ordered = np.sort(values, axis=0)
+            total = (ordered[-keep:] if self.keep_highest else ordered[:keep]).sum(axis=0)
+        return self.sign * total
+
+    def kept_mask(self, row):
+        """Which dice of one roll count towards the total."""
+        kept = np.ones(row.size, dtype=bool)
+        if self.keep is not None and self.keep < self.count:
+            order = np.argsort(row, kind="stable")
+            dropped = order[:self.count - self.keep] if self.keep_highest else order[self.keep:]
+            kept[dropped] = False
+        return kept
+
+
+@dataclass(frozen=True)
+class Constant:
+    """A flat modifier such as +3."""
+    sign: int
+    value: int
+
+    @property
+    def notation(self):
+        return str(self.value)
+
+
+@dataclass
+class TermRoll:
+    term: object
+    dice: object = None  # numpy array of a DiceTerm's dice
+    kept: object = None  # numpy bool array, whether each die counts
+    total: int = 0
+
+
+@dataclass
+class RollResult:
+    expression: str
+    terms: list  # TermRoll per term
+    total: int
+
+
+class DiceExpression:
+    """
+    A dice expression like "4d6kh3 + 1d8! - 2".
+
+    Terms are NdS dice (N defaults to 1, d% is d100) or whole numbers,
+    joined by + and -. Dice take modifiers: kh/kl N keeps the highest or
+    lowest N (k is kh), dh/dl N drops them (d is dl), and ! explodes
+    dice that roll their maximum. Rolls are drawn with NumPy, one
+    array per term, so large pools and million-trial simulations are
+    vectorized instead of looping per die.
+    """
+
+    def __init__(self, terms, text):
+        self.terms = terms
+        self.text = text
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Parse a dice expression.
+
+        Raises:
+            DiceError: If the expression is malformed or over the limits
+        """
+        terms = []
+        position = 0
+        text = text.strip()
+        while position < len(text):
+            match = TOKEN_PATTERN.match(text, position)
+            if not match or match.end() == position or (terms and not match.group(1)):
+                raise DiceError(f"Couldn't read `{text[position:]}`, use dice like `2d6`, `4d6kh3`, `1d20+5` or `3d6!`")
+            position = match.end()
+            sign = -1 if match.group(1) == "-" else 1
+            if match.group(5) is not None:
+                value = int(match.group(5))
+                if value > MAX_CONSTANT:
+                    raise DiceError(f"Modifiers can be at most {MAX_CONSTANT:,}.")
+                terms.append(Constant(sign, value))
+            else:
+                terms.append(cls._dice_term(sign, match))
+            if len(terms) > MAX_TERMS:
+                raise DiceError(f"Use at most {MAX_TERMS} terms.")
+        if not terms:
+            raise DiceError("Give a dice expression like `2d6`.")
+        expression = cls(terms, text)
+        if expression.dice_count > MAX_DICE:
+            raise DiceError(f"I can't roll more than {MAX_DICE:,} dice at once!")
+        return expression
+
+    @staticmethod
+    def _dice_term(sign, match):
+        count = int(match.group(2)) if match.group(2) else 1
+        sides = 100 if match.group(3) == "%" else int(match.group(3))
+        if count < 1 or sides < 1:
+            raise DiceError("Dice need at least one die and one side.")
+        if sides > MAX_SIDES:
+            raise DiceError("Dice sides too large!")
+
+        keep, keep_highest, explode = None, True, False
+        for modifier in MODIFIER_PATTERN.finditer(match.group(4) or ""):
+            if modifier.group(1):
+                if sides == 1:
+                    raise DiceError("A d1 can't explode, it would never stop.")
+                explode = True
+                continue
+            action, end, amount = modifier.group(2).lower(), modifier.group(3).lower(), int(modifier.group(4) or 1)
+            if action == "k":
+                keep, keep_highest = amount, end != "l"
+            else:
+                # Dropping the lowest N keeps the highest count - N, and the other way round
+                keep, keep_highest = max(0, count - amount), end != "h"
+        return DiceTerm(sign, count, sides, keep, keep_highest, explode)
+
+    @property
+    def dice_count(self):
+        return sum(term.count for term in self.terms if isinstance(term, DiceTerm))
+
+    def roll(self, rng=None):
+        """
+        Roll the expression once. Takes tens of milliseconds for the
+        largest pools, run those in a worker thread with a fresh rng.
+
+        Returns:
+            RollResult
+        """
+        rng = rng or _rng
+        rolls = []
+        for term in self.terms:
+            if isinstance(term, Constant):
+                rolls.append(TermRoll(term, total=term.sign * term.value))
+                continue
+            values = term.roll(1, rng)
+            rolls.append(TermRoll(
+                term,
+                dice=values[:, 0],
+                kept=term.kept_mask(values[:, 0]),
+                total=int(term.totals(values)[0])
+            ))
+        return RollResult(self.text, rolls, sum(roll.total for roll in rolls))
+
+    def check_simulation(self, trials):
+        """
+        Reject simulations that would take too long, before any work is done.
+
+        Raises:
+            DiceError: If trials is out of range or dice x trials is over MAX_SIMULATED_DICE
+        """
+        if not 1 <= trials <= MAX_TRIALS:
+            raise DiceError(f"Simulate between 1 and {MAX_TRIALS:,} rolls.")
+        if self.dice_count * trials > MAX_SIMULATED_DICE:
+            raise DiceError(
+                f"That's {self.dice_count * trials:,} dice to roll, simulations can roll at most "
+                f"{MAX_SIMULATED_DICE:,} (dice per roll x rolls)."
+            )
+
+    def simulate(self, trials, rng=None):
+        """
+        Roll the expression many times.
+
+        Runs in batches of about CHUNK_CELLS dice, so memory stays bounded
+        for big pools. Safe to call from a worker thread.
+
+        Returns:
+            numpy.ndarray: int64 totals, one per trial
+
+        Raises:
+            DiceError: If trials is out of range or the simulation would roll too many dice
+        """
+        self.check_simulation(trials)
+        rng = rng or np.random.default_rng()
+        batch = max(1, CHUNK_CELLS // max(1, self.dice_count))
+        totals = np.empty(trials, dtype=np.int64)
+        for start in range(0, trials, batch):
+            size = min(batch, trials - start)
+            chunk = np.zeros(size, dtype=np.int64)
+            for term in self.terms:
+                if isinstance(term, Constant):
+                    chunk += term.sign * term.value
+                else:
+                    chunk += term.totals(term.roll(size, rng))
+            totals[start:start + size] = chunk
+        return totals
+
+
+@lru_cache(maxsize=256)
+def parse_dice(text):
+    """Parse a dice expression, cached since the same few like "1d6" come up again and again."""
+    return DiceExpression.parse(text)
+
+
+def distribution(totals, max_bins=20):
+    """
+    Summarize simulated totals.
+
+    Returns:
+        dict: mean, std, min, max, p5/p50/p95 and at most max_bins bins
+        as (lowest total, highest total, share of trials) tuples
+    """
+    low, high = int(totals.min()), int(totals.max())
+    # Whole-number bins, one per total when the range is small enough
+    width = -(-(high - low + 1) // max_bins)
+    counts = np.bincount((totals - low) // width).tolist()
+    bins = [
+        (low + i * width, min(high, low + (i + 1) * width - 1), count / totals.size)
+        for i, count in enumerate(counts)
+    ]
+    p5, p50, p95 = np.percentile(totals, [5, 50, 95]).tolist()
+    return {
+        "mean": float(totals.mean()),
+        "std": float(totals.std()),
+        "min": low,
+        "max": high,
+        "p5": p5,
+        "p50": p50,
+        "p95": p95,
+        "bins": bins,
+    }
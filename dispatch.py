@@ -0,0 +1,80 @@
+import logging
+
+from discord.ext import commands
+from discord.ext.commands.view import StringView
+
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+MESSAGES_TOTAL = Counter("bot_messages_total", "Messages seen by on_message, by result and reason")
+REJECTED_SELF = MESSAGES_TOTAL.labels(result="rejected", reason="self")
+REJECTED_BOT = MESSAGES_TOTAL.labels(result="rejected", reason="bot")
+REJECTED_NO_PREFIX = MESSAGES_TOTAL.labels(result="rejected", reason="no_prefix")
+REJECTED_UNKNOWN = MESSAGES_TOTAL.labels(result="rejected", reason="unknown_command")
+ACCEPTED = MESSAGES_TOTAL.labels(result="accepted", reason="command")
+
+
+class CommandDispatcher:
+    """
+    Cheap path from on_message to the command a message invokes.
+
+    bot.process_commands builds a Context for every message, including
+    chatter that never starts with the prefix. Here messages from bots
+    and messages without the prefix are rejected with an attribute check
+    and a startswith before anything else is done. The rest are looked up
+    in a name/alias table taken from the bot's commands, and only then
+    is a Context built. on_message hands it to bot.invoke, so checks,
+    hooks and error handling are unchanged.
+    """
+
+    def __init__(self, bot):
+        """
+        Args:
+            bot: The bot, its command_prefix must be a string
+        """
+        self.bot = bot
+        self.prefix = bot.command_prefix
+        self._commands = {}  # name or alias -> Command
+        # Bumped on every refresh, caches built from the commands key on it
+        self.version = 0
+
+    def refresh(self):
+        """Rebuild the lookup table, called whenever a command is added or removed."""
+        self._commands = dict(self.bot.all_commands)
+        self.version += 1
+        logger.debug(f"Command dispatcher knows {len(self._commands)} name(s) and alias(es)")
+
+    def commands(self):
+        """The visible commands in the order they were added, without aliases."""
+        return [command for name, command in self._commands.items() if name == command.name and not command.hidden]
+
+    def get_context(self, message):
+        """
+        Build the context for a message that invokes a command.
+
+        Synchronous, so rejected messages never create a coroutine.
+
+        Returns:
+            commands.Context, or None if the message isn't for the bot
+        """
+        if message.author.bot:
+            REJECTED_BOT.inc()
+            return None
+        if not message.content.startswith(self.prefix):
+            REJECTED_NO_PREFIX.inc()
+            return None
+
+        view = StringView(message.content)
+        view.skip_string(self.prefix)
+        invoker = view.get_word()
+        command = self._commands.get(invoker)
+        if command is None:
+            # Still invoked, so the error handler can answer "Command not found"
+            REJECTED_UNKNOWN.inc()
+        else:
+            ACCEPTED.inc()
+        ctx = commands.Context(prefix=self.prefix, view=view, bot=self.bot, message=message)
+        ctx.invoked_with = invoker
+        ctx.command = command
+        return ctx
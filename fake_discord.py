@@ -0,0 +1,653 @@
+import asyncio
+import itertools
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass
+
+import discord
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = "/api/v10"
+
+
+@dataclass
+class RouteProfile:
+    """
+    Simulated behaviour of one REST route.
+
+    Attributes:
+        latency: Mean response time in seconds
+        jitter: Random extra latency, uniform in [0, jitter]
+        limit: Requests allowed per window per bucket (0 disables 429s)
+        window: Rate-limit window in seconds
+    """
+    latency: float = 0.05
+    jitter: float = 0.02
+    limit: int = 0
+    window: float = 1.0
+
+
+# Roughly what Discord does: channel creation is slow and tightly limited,
+# message sends are limited per channel.
+DEFAULT_ROUTE_PROFILES = {
+    "POST /guilds/{guild_id}/channels": RouteProfile(latency=0.25, jitter=0.1, limit=10, window=10.0),
+    "PATCH /channels/{channel_id}": RouteProfile(latency=0.12, jitter=0.05, limit=10, window=10.0),
+    "DELETE /channels/{channel_id}": RouteProfile(latency=0.1, jitter=0.05, limit=5, window=1.0),
+    "POST /channels/{channel_id}/messages": RouteProfile(latency=0.08, jitter=0.04, limit=5, window=5.0),
+    "GET /channels/{channel_id}/messages": RouteProfile(latency=0.06, jitter=0.03, limit=5, window=1.0),
+    "POST /interactions/{interaction_id}/{token}/callback": RouteProfile(latency=0.05, jitter=0.02),
+    "POST /webhooks/{application_id}/{token}": RouteProfile(latency=0.06, jitter=0.03, limit=5, window=2.0),
+    # Global command overwrites are slow and have a small, long rate-limit window
+    "PUT /applications/{application_id}/commands": RouteProfile(latency=1.0, jitter=0.5, limit=2, window=20.0),
+}
+
+
+# Gateway events and the intent a guild event needs to be delivered
+EVENT_INTENTS = {
+    "MESSAGE_CREATE": "guild_messages",
+    "MESSAGE_UPDATE": "guild_messages",
+    "MESSAGE_DELETE": "guild_messages",
+    "TYPING_START": "guild_typing",
+    "MESSAGE_REACTION_ADD": "guild_reactions",
+    "PRESENCE_UPDATE": "presences",
+    "GUILD_MEMBER_ADD": "members",
+    "VOICE_STATE_UPDATE": "voice_states",
+}
+
+
+class _GatewayStub:
+    """Stands in for the bot's websocket, which the fake gateway doesn't open."""
+
+    open = False
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.presences = []
+
+    async def change_presence(self, **kwargs):
+        self.presences.append(kwargs)
+
+
+class _Bucket:
+    def __init__(self):
+        self.window_start = 0.0
+        self.count = 0
+
+
+class FakeDiscord:
+    """
+    In-process stand-in for the Discord REST API and gateway.
+
+    The REST side is an aiohttp app that discord.py talks to once
+    discord.http.Route.BASE points at it. Each route has a configurable
+    latency and rate limit, and answers with real 429s when the limit is
+    exceeded so discord.py's own rate-limit handling is exercised.
+
+    The gateway side feeds dispatch payloads straight into the bot's
+    ConnectionState parsers (CHANNEL_CREATE, MESSAGE_CREATE,
+    INTERACTION_CREATE, ...), after gateway_latency, the same way the
+    websocket would.
+    """
+
+    def __init__(self, route_profiles=None, gateway_latency=0.02, latency_scale=1.0, rate_limits=True):
+        """
+        Args:
+            route_profiles: Overrides for DEFAULT_ROUTE_PROFILES, keyed by "METHOD /path"
+            gateway_latency: Delay before gateway events are dispatched
+            latency_scale: Multiplier applied to every route latency
+            rate_limits: Whether routes answer with 429s when over their limit
+        """
+        self.route_profiles = dict(DEFAULT_ROUTE_PROFILES)
+        self.route_profiles.update(route_profiles or {})
+        self.gateway_latency = gateway_latency
+        self.latency_scale = latency_scale
+        self.rate_limits = rate_limits
+
+        self._ids = itertools.count(int((time.time() * 1000 - 1420070400000)) << 22)
+        self.bot_user = self.user_payload("ticketeer", bot=True)
+        self.application_id = self.bot_user["id"]
+        self.bot = None  # set by attach()
+        self.state = None  # discord.py ConnectionState, set by attach()
+        self.guilds = {}  # guild_id -> guild payload
+        self.channels = {}  # channel_id -> channel payload
+        self.messages = {}  # channel_id -> list of message payloads, oldest first
+        self.interactions = {}  # interaction token -> channel_id
+        self.app_commands = []  # global application commands from the last overwrite
+        self.members = {}  # guild_id -> {user_id: member payload}
+
+        self.requests = {}  # route key -> count
+        self.rate_limited = {}  # route key -> 429 count
+        self._buckets = {}  # (route key, major id) -> _Bucket
+        self._waiters = []  # (predicate, future)
+        self._runner = None
+        self.url = None
+
+    # -- lifecycle -------------------------------------------------------
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start the fake REST server and point discord.py at it."""
+        app = web.Application(middlewares=[self._middleware])
+        self._add_routes(app)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        discord.http.Route.BASE = self.url + API_PREFIX
+
+    async def close(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def attach(self, bot):
+        """Connect the fake gateway to a bot that has logged in."""
+        self.bot = bot
+        self.state = bot._connection
+        if getattr(bot, "ws", None) is None:
+            bot.ws = _GatewayStub(self.gateway_latency)
+
+    async def connect(self, guilds):
+        """
+        Replay a fresh gateway session: READY, then a GUILD_CREATE per guild.
+
+        Args:
+            guilds: Guild payloads from guild_payload()
+
+        Returns:
+            float: Seconds until the bot reported ready
+        """
+        start = time.perf_counter()
+        self.state.parse_ready({
+            "v": 10,
+            "user": self.bot_user,
+            "guilds": [{"id": guild["id"], "unavailable": True} for guild in guilds],
+            "session_id": "fake-session",
+            "resume_gateway_url": "ws://fake",
+            "application": {"id": self.application_id, "flags": 0},
+        })
+        for guild in guilds:
+            self.register_guild(guild)
+            self.state.parse_guild_create(self.gateway_guild(guild))
+        await self.bot.wait_until_ready()
+        return time.perf_counter() - start
+
+    # -- payload builders -------------------------------------------------
+
+    def snowflake(self):
+        return str(next(self._ids))
+
+    def user_payload(self, name, bot=False):
+        return {
+            "id": self.snowflake(),
+            "username": name,
+            "global_name": name,
+            "discriminator": "0",
+            "avatar": None,
+            "bot": bot,
+        }
+
+    def member_payload(self, user, permissions=None):
+        payload = {
+            "user": user,
+            "roles": [],
+            "joined_at": discord.utils.utcnow().isoformat(),
+            "deaf": False,
+            "mute": False,
+            "flags": 0,
+        }
+        if permissions is not None:
+            payload["permissions"] = str(permissions)
+        return payload
+
+    def add_guild(self, name, owner, members):
+        """
+        Create a guild and add it to the bot's cache directly.
+
+        Args:
+            name: Guild name
+            owner: User payload of the guild owner
+            members: User payloads of the other members
+
+        Returns:
+            dict: The guild payload
+        """
+        guild = self.guild_payload(name, owner, members)
+        self.register_guild(guild)
+        self.state._add_guild_from_data(self.gateway_guild(guild))
+        return guild
+
+    def register_guild(self, guild):
+        """Make a guild payload known to the REST side."""
+        self.guilds[guild["id"]] = guild
+        self.members[guild["id"]] = {member["user"]["id"]: member for member in guild["members"]}
+        for channel in guild["channels"]:
+            self.channels[channel["id"]] = dict(channel, guild_id=guild["id"])
+
+    def gateway_guild(self, guild):
+        """
+        The GUILD_CREATE payload the bot receives for a guild.
+
+        Like Discord, members are only included with the members intent,
+        otherwise just the bot's own member is sent.
+        """
+        if self.state.intents.members:
+            return guild
+        return dict(guild, members=[m for m in guild["members"] if m["user"]["id"] == self.bot_user["id"]])
+
+    def guild_payload(self, name, owner, members, channels=()):
+        """
+        Build a guild payload without announcing it.
+
+        Args:
+            name: Guild name
+            owner: User payload of the guild owner
+            members: User payloads of the other members
+            channels: Names of text channels to create with the guild
+
+        Returns:
+            dict: The guild payload
+        """
+        guild_id = self.snowflake()
+        everyone = {
+            "id": guild_id, "name": "@everyone", "permissions": str(discord.Permissions.general().value),
+            "position": 0, "color": 0, "hoist": False, "managed": False, "mentionable": False, "flags": 0,
+        }
+        guild = {
+            "id": guild_id,
+            "name": name,
+            "owner_id": owner["id"],
+            "icon": None,
+            "roles": [everyone],
+            "emojis": [],
+            "stickers": [],
+            "features": [],
+            "channels": [
+                {"id": self.snowflake(), "type": 0, "name": channel, "position": position, "permission_overwrites": []}
+                for position, channel in enumerate(channels)
+            ],
+            "threads": [],
+            "members": [self.member_payload(user) for user in [self.bot_user, owner, *members]],
+            "member_count": len(members) + 2,
+            "premium_tier": 0,
+            "verification_level": 0,
+            "default_message_notifications": 0,
+            "explicit_content_filter": 0,
+            "mfa_level": 0,
+            "nsfw_level": 0,
+            "preferred_locale": "en-US",
+            "large": len(members) > 250,
+        }
+        return guild
+
+    def message_payload(self, channel_id, author, content="", embeds=None, components=None, member=True):
+        channel = self.channels.get(channel_id, {})
+        payload = {
+            "id": self.snowflake(),
+            "channel_id": channel_id,
+            "author": author,
+            "content": content,
+            "timestamp": discord.utils.utcnow().isoformat(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": embeds or [],
+            "components": components or [],
+            "pinned": False,
+            "type": 0,
+            "flags": 0,
+        }
+        if "guild_id" in channel:
+            payload["guild_id"] = channel["guild_id"]
+            if member:
+                payload["member"] = {k: v for k, v in self.member_payload(author).items() if k != "user"}
+        return payload
+
+    # -- gateway ----------------------------------------------------------
+
+    def dispatch(self, event, payload):
+        """
+        Deliver a gateway event to the bot after gateway_latency.
+
+        Guild events the bot's intents don't subscribe to are dropped, the
+        same way Discord never sends them.
+        """
+        intent = EVENT_INTENTS.get(event)
+        if intent and "guild_id" in payload and not getattr(self.state.intents, intent):
+            return
+        parser = getattr(self.state, f"parse_{event.lower()}")
+        asyncio.get_running_loop().call_later(self.gateway_latency, parser, payload)
+
+    def send_message(self, channel_id, author, content):
+        """
+        Simulate a user posting a message, e.g. a prefix command.
+
+        Returns:
+            dict: The message payload
+        """
+        message = self.message_payload(channel_id, author, content)
+        self.messages.setdefault(channel_id, []).append(message)
+        self.dispatch("MESSAGE_CREATE", message)
+        return message
+
+    def typing(self, channel_id, user):
+        """Simulate a user starting to type."""
+        channel = self.channels[channel_id]
+        self.dispatch("TYPING_START", {
+            "channel_id": channel_id,
+            "guild_id": channel["guild_id"],
+            "user_id": user["id"],
+            "timestamp": int(time.time()),
+            "member": self.member_payload(user),
+        })
+
+    def click(self, guild_id, channel_id, user, message, custom_id, component_type=2, values=None):
+        """
+        Simulate a user using a message component.
+
+        Args:
+            guild_id: Guild the component is in
+            channel_id: Channel the component message is in
+            user: User payload of the clicking user
+            message: Payload of the message holding the component
+            custom_id: The component's custom ID
+            component_type: 2 for buttons, 3 for string selects
+            values: Selected values for selects
+
+        Returns:
+            str: The interaction token, used to wait for the bot's responses
+        """
+        data = {"custom_id": custom_id, "component_type": component_type}
+        if values is not None:
+            data["values"] = values
+        token = f"token-{self.snowflake()}"
+        self.interactions[token] = channel_id
+        payload = {
+            "id": self.snowflake(),
+            "application_id": self.application_id,
+            "type": 3,
+            "token": token,
+            "version": 1,
+            "guild_id": guild_id,
+            "channel_id": channel_id,
+            "channel": {"id": channel_id, "type": 0},
+            "member": self.member_payload(user, permissions=discord.Permissions.general().value),
+            "data": data,
+            "message": message,
+            "app_permissions": str(discord.Permissions.all().value),
+            "locale": "en-US",
+            "guild_locale": "en-US",
+            "entitlements": [],
+            "authorizing_integration_owners": {},
+            "context": 0,
+            "attachment_size_limit": 10 * 1024 * 1024,
+        }
+        self.dispatch("INTERACTION_CREATE", payload)
+        return token
+
+    # -- waiting ----------------------------------------------------------
+
+    def wait_for(self, predicate, timeout=60.0):
+        """
+        Wait for a REST call from the bot matching predicate(kind, data).
+
+        Kinds are "message", "message_edit", "interaction_response",
+        "followup", "channel_create", "channel_update", "channel_delete" and
+        "commands_sync".
+
+        Returns:
+            Awaitable resolving to the matching payload
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((predicate, future))
+        return asyncio.wait_for(future, timeout)
+
+    def _record(self, kind, data):
+        remaining = []
+        for predicate, future in self._waiters:
+            if future.done():
+                continue
+            if predicate(kind, data):
+                future.set_result(data)
+            else:
+                remaining.append((predicate, future))
+        self._waiters = remaining
+
+    # -- REST -------------------------------------------------------------
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        route = request.match_info.route.resource.canonical[len(API_PREFIX):] if request.match_info.route.resource else request.path
+        key = f"{request.method} {route}"
+        self.requests[key] = self.requests.get(key, 0) + 1
+        profile = self.route_profiles.get(key, RouteProfile())
+
+        if self.rate_limits and profile.limit:
+            major = request.match_info.get("guild_id") or request.match_info.get("channel_id") or request.match_info.get("token", "")
+            bucket = self._buckets.setdefault((key, major), _Bucket())
+            now = time.monotonic()
+            if now - bucket.window_start >= profile.window:
+                bucket.window_start = now
+                bucket.count = 0
+            if bucket.count >= profile.limit:
+                self.rate_limited[key] = self.rate_limited.get(key, 0) + 1
+                retry_after = profile.window - (now - bucket.window_start)
+                return web.json_response(
+                    {"message": "You are being rate limited.", "retry_after": retry_after, "global": False},
+                    status=429,
+                    headers={"Content-Type": "application/json", **self._rate_limit_headers(key, major, profile, 0, retry_after, scope="user")},
+                    content_type=None
+                )
+            bucket.count += 1
+            remaining = profile.limit - bucket.count
+            reset_after = profile.window - (now - bucket.window_start)
+        else:
+            major, remaining, reset_after = "", 1, 0
+
+        await asyncio.sleep((profile.latency + random.uniform(0, profile.jitter)) * self.latency_scale)
+        response = await handler(request)
+        # discord.py only decodes bodies whose content-type is exactly application/json
+        if response.content_type == "application/json":
+            response.headers["Content-Type"] = "application/json"
+        response.headers["Via"] = "1.1 fake-discord"
+        if profile.limit and self.rate_limits:
+            response.headers.update(self._rate_limit_headers(key, major, profile, remaining, reset_after))
+        return response
+
+    @staticmethod
+    def _rate_limit_headers(key, major, profile, remaining, reset_after, scope=None):
+        headers = {
+            "Via": "1.1 fake-discord",
+            "X-RateLimit-Bucket": f"{key}:{major}",
+            "X-RateLimit-Limit": str(profile.limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset-After": f"{max(reset_after, 0.001):.3f}",
+            "X-RateLimit-Reset": f"{time.time() + max(reset_after, 0.001):.3f}",
+        }
+        if scope:
+            headers["X-RateLimit-Scope"] = scope
+        return headers
+
+    def _add_routes(self, app):
+        p = API_PREFIX
+        app.router.add_get(p + "/users/@me", self._get_me)
+        app.router.add_get(p + "/oauth2/applications/@me", self._get_application)
+        app.router.add_post(p + "/guilds/{guild_id}/channels", self._create_channel)
+        app.router.add_patch(p + "/channels/{channel_id}", self._edit_channel)
+        app.router.add_delete(p + "/channels/{channel_id}", self._delete_channel)
+        app.router.add_get(p + "/guilds/{guild_id}/members/{user_id}", self._get_member)
+        app.router.add_post(p + "/channels/{channel_id}/messages", self._create_message)
+        app.router.add_get(p + "/channels/{channel_id}/messages", self._get_messages)
+        app.router.add_patch(p + "/channels/{channel_id}/messages/{message_id}", self._edit_message)
+        app.router.add_post(p + "/interactions/{interaction_id}/{token}/callback", self._interaction_callback)
+        app.router.add_post(p + "/webhooks/{application_id}/{token}", self._followup)
+        app.router.add_put(p + "/applications/{application_id}/commands", self._overwrite_commands)
+        app.router.add_route("*", p + "/{tail:.*}", self._unknown)
+
+    @staticmethod
+    async def _read_body(request):
+        if request.content_type.startswith("multipart/"):
+            form = await request.post()
+            return json.loads(form.get("payload_json", "{}"))
+        if request.can_read_body:
+            return await request.json()
+        return {}
+
+    async def _get_me(self, request):
+        return web.json_response(self.bot_user)
+
+    async def _get_application(self, request):
+        return web.json_response({
+            "id": self.application_id,
+            "name": self.bot_user["username"],
+            "description": "",
+            "icon": None,
+            "bot_public": True,
+            "bot_require_code_grant": False,
+            "owner": self.bot_user,
+            "verify_key": "",
+            "flags": 0,
+            "interactions_endpoint_url": None,
+        })
+
+    async def _create_channel(self, request):
+        body = await self._read_body(request)
+        guild_id = request.match_info["guild_id"]
+        channel = {
+            "id": self.snowflake(),
+            "guild_id": guild_id,
+            "type": body.get("type", 0),
+            "name": body["name"],
+            "topic": body.get("topic"),
+            "position": len(self.channels),
+            "permission_overwrites": body.get("permission_overwrites", []),
+            "parent_id": body.get("parent_id"),
+            "nsfw": False,
+            "rate_limit_per_user": 0,
+            "last_message_id": None,
+        }
+        self.channels[channel["id"]] = channel
+        self.dispatch("CHANNEL_CREATE", channel)
+        self._record("channel_create", channel)
+        return web.json_response(channel)
+
+    async def _edit_channel(self, request):
+        channel = self.channels.get(request.match_info["channel_id"])
+        if channel is None:
+            return web.json_response({"message": "Unknown Channel", "code": 10003}, status=404)
+        body = await self._read_body(request)
+        for field in ("name", "topic", "permission_overwrites", "parent_id"):
+            if field in body:
+                channel[field] = body[field]
+        self.dispatch("CHANNEL_UPDATE", dict(channel))
+        self._record("channel_update", channel)
+        return web.json_response(channel)
+
+    async def _delete_channel(self, request):
+        channel = self.channels.pop(request.match_info["channel_id"], None)
+        if channel is None:
+            return web.json_response({"message": "Unknown Channel", "code": 10003}, status=404)
+        self.messages.pop(channel["id"], None)
+        self.dispatch("CHANNEL_DELETE", channel)
+        self._record("channel_delete", channel)
+        return web.json_response(channel)
+
+    async def _get_member(self, request):
+        member = self.members.get(request.match_info["guild_id"], {}).get(request.match_info["user_id"])
+        if member is None:
+            return web.json_response({"message": "Unknown Member", "code": 10007}, status=404)
+        return web.json_response(member)
+
+    async def _create_message(self, request):
+        channel_id = request.match_info["channel_id"]
+        if channel_id not in self.channels:
+            return web.json_response({"message": "Unknown Channel", "code": 10003}, status=404)
+        body = await self._read_body(request)
+        message = self.message_payload(channel_id, self.bot_user, body.get("content") or "", body.get("embeds"), body.get("components"))
+        if body.get("message_reference"):
+            message["message_reference"] = {**body["message_reference"], "channel_id": channel_id}
+        self.messages.setdefault(channel_id, []).append(message)
+        self.dispatch("MESSAGE_CREATE", message)
+        self._record("message", message)
+        return web.json_response(message)
+
+    async def _edit_message(self, request):
+        messages = self.messages.get(request.match_info["channel_id"], [])
+        message = next((m for m in messages if m["id"] == request.match_info["message_id"]), None)
+        if message is None:
+            return web.json_response({"message": "Unknown Message", "code": 10008}, status=404)
+        body = await self._read_body(request)
+        for field in ("content", "embeds", "components"):
+            if field in body:
+                message[field] = body[field]
+        message["edited_timestamp"] = discord.utils.utcnow().isoformat()
+        self._record("message_edit", message)
+        return web.json_response(message)
+
+    async def _get_messages(self, request):
+        messages = self.messages.get(request.match_info["channel_id"], [])
+        limit = int(request.query.get("limit", 50))
+        if "after" in request.query:
+            after = int(request.query["after"])
+            page = [m for m in messages if int(m["id"]) > after][:limit]
+        elif "before" in request.query:
+            before = int(request.query["before"])
+            page = [m for m in messages if int(m["id"]) < before][-limit:]
+        else:
+            page = messages[-limit:]
+        # Discord returns newest first
+        return web.json_response(page[::-1])
+
+    async def _interaction_callback(self, request):
+        body = await self._read_body(request)
+        interaction_id = request.match_info["interaction_id"]
+        data = body.get("data") or {}
+        channel_id = self.interactions.get(request.match_info["token"])
+        message = self.message_payload(channel_id, self.bot_user, data.get("content") or "", data.get("embeds"), data.get("components"), member=False)
+        response = {
+            "interaction": {
+                "id": interaction_id,
+                "type": 3,
+                "response_message_id": message["id"],
+                "response_message_loading": body.get("type") == 5,
+                "response_message_ephemeral": bool((data.get("flags") or 0) & 64),
+            },
+            "resource": {"type": body.get("type"), "message": message},
+        }
+        self._record("interaction_response", {"token": request.match_info["token"], "type": body.get("type"), "message": message})
+        return web.json_response(response)
+
+    async def _followup(self, request):
+        body = await self._read_body(request)
+        channel_id = self.interactions.get(request.match_info["token"])
+        message = self.message_payload(channel_id, self.bot_user, body.get("content") or "", body.get("embeds"), body.get("components"), member=False)
+        self._record("followup", {"token": request.match_info["token"], "message": message})
+        return web.json_response(message)
+
+    async def _overwrite_commands(self, request):
+        body = await self._read_body(request)
+        commands = [
+            dict(
+                {"type": 1, "default_member_permissions": None, "nsfw": False, "options": []},
+                **command,
+                id=self.snowflake(),
+                application_id=self.application_id,
+                version=self.snowflake()
+            )
+            for command in body
+        ]
+        self.app_commands = commands
+        self._record("commands_sync", {"count": len(commands)})
+        return web.json_response(commands)
+
+    async def _unknown(self, request):
+        logger.warning(f"Fake Discord has no route for {request.method} {request.path}")
+        return web.json_response({"message": "404: Not Found", "code": 0}, status=404)
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+from dataclasses import asdict, dataclass, field, replace
+
+import discord
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import GuildSettings
+from utils import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TICKET_TYPES = (
+    {"label": "Support", "description": "Get help with an issue", "emoji": "❓"},
+    {"label": "Purchase", "description": "Questions about purchasing", "emoji": "💰"},
+)
+
+# Select menus hold at most 25 options
+MAX_TICKET_TYPES = 25
+
+
+def default_ticket_types():
+    return [dict(ticket_type) for ticket_type in DEFAULT_TICKET_TYPES]
+
+
+@dataclass(frozen=True)
+class GuildConfig:
+    """
+    Ticket settings for one guild.
+
+    Instances are immutable and shared by every reader; updates replace
+    the cached instance as a whole.
+    """
+    guild_id: int
+    staff_role_id: int = None
+    logs_channel_id: int = None
+    create_channel_id: int = None
+    ticket_types: list = field(default_factory=default_ticket_types)
+    pool_size: int = None  # None uses the TICKET_POOL_SIZE default
+    max_open_tickets: int = None  # None means no limit
+    auto_close_hours: float = None  # None uses the AUTO_CLOSE_HOURS default
+
+    def ticket_type_labels(self):
+        return [ticket_type["label"] for ticket_type in self.ticket_types]
+
+
+class GuildConfigStore:
+    """
+    Per-guild settings, persisted in the guild_settings table and cached
+    in memory.
+
+    Guilds are loaded once, lazily or in bulk on startup, and served from
+    the cache afterwards, so handlers read their settings without any I/O.
+    Updates are written through to the database and replace the cached
+    entry once committed.
+    """
+
+    def __init__(self, ticket_store):
+        """
+        Args:
+            ticket_store: The TicketStore whose database engine holds the settings
+        """
+        self.ticket_store = ticket_store
+        self._cache = {}  # guild_id -> GuildConfig
+        self._loads = SingleFlight()
+        self._write_lock = asyncio.Lock()
+
+    def get(self, guild_id):
+        """
+        Get the cached settings of a guild, without I/O.
+
+        Guilds that haven't been loaded yet get the defaults, so paths that
+        may run before a guild is loaded, like ticket creation, use load().
+
+        Returns:
+            GuildConfig
+        """
+        config = self._cache.get(guild_id)
+        if config is None:
+            return GuildConfig(guild_id)
+        return config
+
+    async def load(self, guild_id):
+        """
+        Get the settings of a guild, reading them from the database on a cache miss.
+
+        Returns:
+            GuildConfig
+        """
+        config = self._cache.get(guild_id)
+        if config is not None:
+            return config
+        config, _ = await self._loads.run(guild_id, lambda: self._load(guild_id))
+        return config
+
+    async def preload(self, guild_ids):
+        """
+        Load every guild that isn't cached yet with a single query.
+
+        Args:
+            guild_ids: Iterable of guild IDs
+        """
+        missing = [guild_id for guild_id in guild_ids if guild_id not in self._cache]
+        if not missing:
+            return
+
+        def query():
+            with Session(self.ticket_store.engine) as session:
+                rows = session.scalars(select(GuildSettings).where(GuildSettings.guild_id.in_(missing)))
+                return {row.guild_id: self._from_row(row) for row in rows}
+
+        loaded = await asyncio.to_thread(query)
+        for guild_id in missing:
+            self._cache.setdefault(guild_id, loaded.get(guild_id) or GuildConfig(guild_id))
+        logger.info(f"Loaded settings for {len(missing)} guild(s), {len(loaded)} customised")
+
+    async def update(self, guild_id, **changes):
+        """
+        Change settings of a guild and persist them.
+
+        Args:
+            guild_id: The guild ID
+            **changes: GuildConfig fields to set
+
+        Returns:
+            GuildConfig: The new settings
+        """
+        async with self._write_lock:
+            config = replace(await self.load(guild_id), **changes)
+            await asyncio.to_thread(self._write, config)
+            self._cache[guild_id] = config
+        return config
+
+    def invalidate(self, guild_id):
+        """Drop a guild from the cache so the next load reads the database again."""
+        self._cache.pop(guild_id, None)
+
+    async def _load(self, guild_id):
+        def query():
+            with Session(self.ticket_store.engine) as session:
+                row = session.get(GuildSettings, guild_id)
+                return self._from_row(row) if row else GuildConfig(guild_id)
+
+        config = await asyncio.to_thread(query)
+        # An update may have landed while the read was in flight, keep it
+        return self._cache.setdefault(guild_id, config)
+
+    def _write(self, config):
+        values = asdict(config)
+        with Session(self.ticket_store.engine) as session, session.begin():
+            session.merge(GuildSettings(updated_at=discord.utils.utcnow(), **values))
+
+    @staticmethod
+    def _from_row(row):
+        return GuildConfig(
+            guild_id=row.guild_id,
+            staff_role_id=row.staff_role_id,
+            logs_channel_id=row.logs_channel_id,
+            create_channel_id=row.create_channel_id,
+            ticket_types=row.ticket_types or default_ticket_types(),
+            pool_size=row.pool_size,
+            max_open_tickets=row.max_open_tickets,
+            auto_close_hours=row.auto_close_hours,
+        )
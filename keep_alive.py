@@ -1,32 +1,113 @@
-from flask import Flask
-from threading import Thread
+import asyncio
 import logging
+import math
+import os
 
-# Setup flask app
-app = Flask(__name__)
+from aiohttp import web
 
-# Disable excessive Flask logging
-log = logging.getLogger('werkzeug')
-log.setLevel(logging.ERROR)
+from metrics import Gauge, render_prometheus
 
-@app.route('/')
-def home():
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP_LAG = Gauge("event_loop_lag_seconds", "How late the event loop ran a 1 second timer")
+GATEWAY_LATENCY = Gauge("discord_gateway_latency_seconds", "Latency between a gateway heartbeat and its ack")
+
+
+async def monitor_loop_lag(interval=1.0):
     """
-    Simple route to respond to pings to keep the Replit alive.
+    Measure event loop lag forever.
+
+    Sleeps for interval seconds and records how much later than requested
+    the loop woke up, which is time spent blocked by other callbacks.
     """
-    return "Ticket Bot is alive!"
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.set(max(0.0, loop.time() - start - interval))
+
 
-def run():
+def create_app(bot):
     """
-    Run the Flask app on a separate thread.
+    Create the health and metrics web app for a bot.
+
+    Args:
+        bot: The Discord bot instance
+
+    Returns:
+        aiohttp.web.Application
     """
-    app.run(host='0.0.0.0', port=8080)
+    app = web.Application()
+
+    async def home(request):
+        """Simple route to respond to pings to keep the Replit alive."""
+        return web.Response(text="Ticket Bot is alive!")
+
+    async def healthz(request):
+        """Report gateway connection state, 503 until the bot is connected and ready."""
+        latency = bot.latency
+        connected = bot.is_ready() and not bot.is_closed() and math.isfinite(latency)
+        body = {
+            "status": "ok" if connected else "unavailable",
+            "ready": bot.is_ready(),
+            "closed": bot.is_closed(),
+            "latency_ms": round(latency * 1000, 1) if math.isfinite(latency) else None,
+            "guilds": len(bot.guilds),
+        }
+        if bot.cluster_id is not None:
+            body["cluster_id"] = bot.cluster_id
+        if hasattr(bot, "latencies"):
+            body["shards"] = {
+                str(shard_id): round(shard_latency * 1000, 1) if math.isfinite(shard_latency) else None
+                for shard_id, shard_latency in bot.latencies
+            }
+        return web.json_response(body, status=200 if connected else 503)
 
-def keep_alive():
+    async def metrics(request):
+        """Expose every metric in the Prometheus text format."""
+        if math.isfinite(bot.latency):
+            GATEWAY_LATENCY.set(bot.latency)
+        return web.Response(text=render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    async def loop_lag_monitor(app):
+        """Run the event loop lag monitor for as long as the server is up."""
+        task = asyncio.create_task(monitor_loop_lag())
+        yield
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    app.cleanup_ctx.append(loop_lag_monitor)
+    app.router.add_get("/", home)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/metrics", metrics)
+    return app
+
+
+async def keep_alive(bot, host="0.0.0.0", port=None):
     """
-    Create and start a thread that runs the Flask app.
+    Start the health and metrics server on the running event loop.
+
+    Serves "/" for uptime pingers, "/healthz" for load balancer health
+    checks and "/metrics" for Prometheus. Also starts the event loop lag
+    monitor.
+
+    Args:
+        bot: The Discord bot instance
+        host: Interface to listen on
+        port: Port to listen on (defaults to PORT or 8080)
+
+    Returns:
+        aiohttp.web.AppRunner: Call cleanup() on it to stop the server
     """
-    t = Thread(target=run)
-    t.daemon = True  # Set as daemon so it closes when the main program exits
-    t.start()
-    logging.info("Keep-alive server started on port 8080")
\ No newline at end of file
+    if port is None:
+        port = int(os.environ.get("PORT", "8080"))
+
+    runner = web.AppRunner(create_app(bot), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+
+    logger.info(f"Keep-alive server started on port {port}")
+    return runner
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Discord accepts at most 10 embeds per message
+MAX_EMBEDS_PER_MESSAGE = 10
+
+
+class LogDispatcher:
+    """
+    Background sender for ticket-logs embeds.
+
+    Events are queued per guild and a worker per guild packs up to 10
+    embeds into a single message, flushing when a batch is full or when
+    the oldest queued embed has waited flush_interval seconds. Callers
+    only enqueue and never await the send.
+
+    Embeds can carry file attachments, such as ticket transcripts. Files
+    too large for the guild's upload limit are referenced by name instead.
+    """
+
+    def __init__(self, registry, max_batch=MAX_EMBEDS_PER_MESSAGE, flush_interval=2.0):
+        """
+        Args:
+            registry: The TicketRegistry used to resolve logs channels
+            max_batch: Max embeds per message (capped at 10)
+            flush_interval: Max seconds an embed waits before being sent
+        """
+        self.registry = registry
+        self.max_batch = min(max_batch, MAX_EMBEDS_PER_MESSAGE)
+        self.flush_interval = flush_interval
+        self._queues = {}  # guild_id -> asyncio.Queue
+        self._workers = {}  # guild_id -> asyncio.Task
+        self._closing = False
+
+    def enqueue(self, guild, embed, files=None):
+        """
+        Queue an embed for the guild's ticket-logs channel.
+
+        Args:
+            guild: The Discord guild
+            embed: The embed to log
+            files: Paths of files to attach with the embed (optional)
+        """
+        if self._closing:
+            logger.warning(f"Log dispatcher is shutting down, dropped log event for guild {guild.id}")
+            return
+
+        queue = self._queues.get(guild.id)
+        if queue is None:
+            queue = self._queues[guild.id] = asyncio.Queue()
+            self._workers[guild.id] = asyncio.create_task(self._run(guild, queue))
+        queue.put_nowait((embed, files or []))
+
+    @property
+    def pending(self):
+        """Number of embeds waiting to be sent across all guilds."""
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    def forget_guild(self, guild_id):
+        """
+        Stop the worker of a guild the bot has left.
+
+        Its queued embeds are dropped, the logs channel is out of reach.
+
+        Args:
+            guild_id: The guild ID
+        """
+        queue = self._queues.pop(guild_id, None)
+        worker = self._workers.pop(guild_id, None)
+        if worker:
+            worker.cancel()
+        if queue and queue.qsize():
+            logger.warning(f"Left guild {guild_id}, dropped {queue.qsize()} queued log event(s)")
+
+    async def close(self):
+        """Send everything still queued and stop all workers."""
+        self._closing = True
+        for queue in self._queues.values():
+            await queue.join()
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._queues.clear()
+        self._workers.clear()
+        self._closing = False
+
+    async def _run(self, guild, queue):
+        """Worker loop for a single guild."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            file_count = len(batch[0][1])
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_batch and file_count < MAX_EMBEDS_PER_MESSAGE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                file_count += len(item[1])
+
+            try:
+                await self._send(guild, batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def _send(self, guild, batch):
+        logs_channel = self.registry.get_logs_channel(guild)
+        if not logs_channel:
+            logger.warning(f"Ticket logs channel not found in guild {guild.name}, dropped {len(batch)} log event(s)")
+            return
+
+        embeds = []
+        files = []
+        upload_budget = guild.filesize_limit
+        for embed, paths in batch:
+            embeds.append(embed)
+            for path in paths:
+                name = os.path.basename(path)
+                size = os.path.getsize(path) if os.path.exists(path) else None
+                if size is not None and size <= upload_budget and len(files) < MAX_EMBEDS_PER_MESSAGE:
+                    files.append(discord.File(path, filename=name))
+                    upload_budget -= size
+                else:
+                    embed.add_field(name="Attachment", value=f"`{name}` is stored on the bot host (too large to upload)", inline=False)
+
+        try:
+            await logs_channel.send(embeds=embeds, files=files)
+        except Exception as e:
+            logger.error(f"Failed to send {len(embeds)} log event(s) to guild {guild.name}: {e}")
+        finally:
+            for file in files:
+                file.close()
@@ -0,0 +1,216 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from admission import TokenBucket
+from metrics import Counter
+
+LOG_RECORDS_DROPPED = Counter("log_records_dropped_total", "Log records not written, by reason")
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Fields added to every record logged while a command or handler runs
+CONTEXT_FIELDS = ("guild_id", "user_id", "command")
+# Fields taken from logger calls' extra= when present
+EXTRA_FIELDS = ("latency_ms", "suppressed")
+
+_log_context = ContextVar("log_context", default=None)
+
+
+def bind_log_context(guild=None, user=None, command=None):
+    """
+    Attach guild, user and command fields to the records logged from here on in this task.
+
+    Returns:
+        contextvars.Token: Pass to reset_log_context to restore the previous fields
+    """
+    return _log_context.set({
+        "guild_id": guild.id if guild else None,
+        "user_id": user.id if user else None,
+        "command": command,
+    })
+
+
+def reset_log_context(token=None):
+    """Restore the fields from before bind_log_context, or clear them."""
+    if token is None:
+        _log_context.set(None)
+    else:
+        _log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the bound log context onto each record."""
+
+    def filter(self, record):
+        context = _log_context.get()
+        if context:
+            for key, value in context.items():
+                if value is not None and not hasattr(record, key):
+                    setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Rate-limits INFO and DEBUG records logged by chatty commands.
+
+    Each listed command gets a token bucket; records beyond it are dropped
+    and the next record that gets through carries the number suppressed.
+    Warnings and errors always pass.
+    """
+
+    def __init__(self, commands, rate, burst):
+        """
+        Args:
+            commands: Names of the commands to sample
+            rate: Records per second per command
+            burst: Records a command can log at once
+        """
+        super().__init__()
+        self.buckets = {name: TokenBucket(rate, burst) for name in commands}
+        self.suppressed = {}  # command -> records dropped since the last one written
+
+    def filter(self, record):
+        if record.levelno > logging.INFO:
+            return True
+        bucket = self.buckets.get(getattr(record, "command", None))
+        if bucket is None:
+            return True
+        if not bucket.try_take():
+            self.suppressed[record.command] = self.suppressed.get(record.command, 0) + 1
+            LOG_RECORDS_DROPPED.inc(reason="sampled")
+            return False
+        suppressed = self.suppressed.pop(record.command, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line."""
+
+    def __init__(self, static_fields=None):
+        """
+        Args:
+            static_fields: Fields added to every record, e.g. the cluster ID
+        """
+        super().__init__()
+        self.static_fields = static_fields or {}
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(self.static_fields)
+        for key in CONTEXT_FIELDS + EXTRA_FIELDS:
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread without formatting them.
+
+    The message is rendered here since its arguments may change later;
+    exceptions are rendered too since tracebacks can't cross threads
+    safely. A full queue drops the record instead of blocking the loop.
+    """
+
+    def prepare(self, record):
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason="queue_full")
+
+
+_listener = None
+_listener_pid = None
+
+
+def configure_logging(level=logging.INFO, cluster_id=None, stream=None):
+    """
+    Route logging through a queue to a background thread writing to stderr.
+
+    Replaces any handlers already on the root logger. LOG_FORMAT picks
+    "json" (default) or "text" output, LOG_QUEUE_SIZE bounds the queue,
+    and LOG_SAMPLED_COMMANDS, LOG_SAMPLE_RATE and LOG_SAMPLE_BURST set
+    which commands' INFO records are rate-limited.
+
+    Args:
+        level: Root log level
+        cluster_id: Added to every record when running as a cluster worker (optional)
+        stream: File-like object to write to (defaults to stderr)
+    """
+    global _listener, _listener_pid
+    # A forked cluster worker inherits the launcher's listener but not its thread
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+
+    output = logging.StreamHandler(stream)
+    if os.environ.get("LOG_FORMAT", "json").lower() == "text":
+        text_format = TEXT_FORMAT if cluster_id is None else TEXT_FORMAT.replace("%(name)s", f"cluster {cluster_id} - %(name)s")
+        output.setFormatter(logging.Formatter(text_format))
+    else:
+        output.setFormatter(JsonFormatter({"cluster": cluster_id} if cluster_id is not None else None))
+
+    records = queue.Queue(maxsize=int(os.environ.get("LOG_QUEUE_SIZE", "10000")))
+    handler = NonBlockingQueueHandler(records)
+    handler.addFilter(ContextFilter())
+    sampled = os.environ.get("LOG_SAMPLED_COMMANDS", "ping,hello,roll")
+    handler.addFilter(SamplingFilter(
+        [name.strip() for name in sampled.split(",") if name.strip()],
+        rate=float(os.environ.get("LOG_SAMPLE_RATE", "1")),
+        burst=float(os.environ.get("LOG_SAMPLE_BURST", "10"))
+    ))
+
+    # Skip record fields neither format uses, see "Optimization" in the logging HOWTO
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    logging.logAsyncioTasks = False
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+        existing.close()
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener_pid = os.getpid()
+    _listener.start()
+    return _listener
+
+
+@atexit.register
+def stop_logging():
+    """Write out the records still queued."""
+    global _listener
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+    _listener = None
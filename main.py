@@ -1,42 +1,208 @@
-
 import os
+import time
+import asyncio
 import logging
+import multiprocessing
+from aiohttp import web
 from keep_alive import keep_alive
+from logging_setup import configure_logging
 from bot import setup_bot
+from cluster import ClusterState, shard_ranges, fetch_recommended_shards
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler()
-    ]
-)
+# Configure logging, records are written by a background thread
+configure_logging(level=logging.INFO)
 
 logger = logging.getLogger(__name__)
 
+# Seconds a cluster worker has to stay up before its restart backoff resets
+STABLE_UPTIME = 300
+
+async def run_bot(token, port=None, **bot_options):
+    """
+    Run the bot and the keep-alive server on the same event loop.
+
+    Args:
+        token: The Discord bot token
+        port: Port for the keep-alive server (optional, defaults to PORT or 8080)
+        **bot_options: Passed to setup_bot (shard and cluster settings)
+    """
+    bot = setup_bot(**bot_options)
+    async with bot:
+        # Health and metrics server, also keeps Replit from sleeping
+        server = await keep_alive(bot, port=port)
+        try:
+            logger.info("Connecting to Discord...")
+            await bot.start(token)
+        finally:
+            await server.cleanup()
+
+def run_cluster_worker(token, cluster_id, shard_ids, shard_count, shared_stats, port):
+    """
+    Entry point of a cluster worker process.
+
+    Args:
+        token: The Discord bot token
+        cluster_id: Index of this cluster
+        shard_ids: Shard IDs this cluster runs
+        shard_count: Total number of shards across all clusters
+        shared_stats: Manager dict proxy backing the ClusterState
+        port: Port for this worker's health and metrics server
+    """
+    configure_logging(level=logging.INFO, cluster_id=cluster_id)
+    try:
+        asyncio.run(run_bot(
+            token,
+            port=port,
+            shard_count=shard_count,
+            shard_ids=shard_ids,
+            cluster_id=cluster_id,
+            cluster_state=ClusterState(shared_stats)
+        ))
+    except KeyboardInterrupt:
+        pass
+
+class ClusterLauncher:
+    """
+    Runs shard ranges in worker processes and restarts workers that die.
+
+    The launcher serves an aggregated health page on the main port; each
+    worker serves its own /healthz and /metrics on the following ports.
+    """
+
+    def __init__(self, token, cluster_count, shard_count=None, port=None):
+        self.token = token
+        self.cluster_count = cluster_count
+        self.shard_count = shard_count
+        self.port = port or int(os.environ.get("PORT", "8080"))
+        self.manager = None
+        self.shared_stats = None
+        self.ranges = []
+        self.workers = {}  # cluster_id -> multiprocessing.Process
+        self.started_at = {}  # cluster_id -> monotonic start time
+        self.restarts = {}  # cluster_id -> consecutive restart count
+
+    def worker_port(self, cluster_id):
+        return self.port + 1 + cluster_id
+
+    async def run(self):
+        """Start every cluster and supervise them until interrupted."""
+        if not self.shard_count:
+            self.shard_count = await fetch_recommended_shards(self.token)
+        self.ranges = shard_ranges(self.shard_count, self.cluster_count)
+        logger.info(f"Launching {len(self.ranges)} cluster(s) for {self.shard_count} shard(s)")
+
+        self.manager = multiprocessing.Manager()
+        self.shared_stats = self.manager.dict()
+
+        runner = web.AppRunner(self.create_health_app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "0.0.0.0", self.port).start()
+
+        try:
+            for cluster_id in range(len(self.ranges)):
+                self.start_worker(cluster_id)
+                # Stagger startups so clusters don't identify all at once
+                await asyncio.sleep(5)
+            await self.supervise()
+        finally:
+            for process in self.workers.values():
+                process.terminate()
+            for process in self.workers.values():
+                process.join(10)
+            await runner.cleanup()
+            self.manager.shutdown()
+
+    def start_worker(self, cluster_id):
+        process = multiprocessing.Process(
+            target=run_cluster_worker,
+            args=(self.token, cluster_id, self.ranges[cluster_id], self.shard_count, self.shared_stats, self.worker_port(cluster_id)),
+            name=f"cluster-{cluster_id}",
+            daemon=True
+        )
+        process.start()
+        self.workers[cluster_id] = process
+        self.started_at[cluster_id] = time.monotonic()
+        logger.info(f"Cluster {cluster_id} started (pid {process.pid}) with shard(s) {self.ranges[cluster_id]}")
+
+    async def supervise(self):
+        """Restart dead workers with exponential backoff."""
+        restart_at = {}  # cluster_id -> monotonic time the restart is due
+        while True:
+            await asyncio.sleep(5)
+            now = time.monotonic()
+            for cluster_id, process in list(self.workers.items()):
+                if process.is_alive():
+                    if now - self.started_at[cluster_id] > STABLE_UPTIME:
+                        self.restarts[cluster_id] = 0
+                    continue
+
+                if cluster_id not in restart_at:
+                    attempt = self.restarts.get(cluster_id, 0)
+                    delay = min(60, 2 ** attempt)
+                    restart_at[cluster_id] = now + delay
+                    logger.error(f"Cluster {cluster_id} exited with code {process.exitcode}, restarting in {delay}s")
+                elif now >= restart_at[cluster_id]:
+                    del restart_at[cluster_id]
+                    self.restarts[cluster_id] = self.restarts.get(cluster_id, 0) + 1
+                    self.shared_stats.pop(cluster_id, None)
+                    self.start_worker(cluster_id)
+
+    def create_health_app(self):
+        """Aggregated health of every cluster, 200 only when all are alive and ready."""
+        app = web.Application()
+
+        async def home(request):
+            return web.Response(text="Ticket Bot is alive!")
+
+        async def healthz(request):
+            stats = await asyncio.to_thread(ClusterState(self.shared_stats).clusters)
+            clusters = {}
+            for cluster_id, process in self.workers.items():
+                cluster = dict(stats.get(cluster_id, {}))
+                cluster.update(alive=process.is_alive(), restarts=self.restarts.get(cluster_id, 0), port=self.worker_port(cluster_id))
+                clusters[str(cluster_id)] = cluster
+            healthy = bool(clusters) and all(c["alive"] and c.get("ready") for c in clusters.values())
+            body = {
+                "status": "ok" if healthy else "degraded",
+                "shard_count": self.shard_count,
+                "guilds": sum(c.get("guilds", 0) for c in clusters.values()),
+                "open_tickets": sum(c.get("open_tickets", 0) for c in clusters.values()),
+                "clusters": clusters,
+            }
+            return web.json_response(body, status=200 if healthy else 503)
+
+        app.router.add_get("/", home)
+        app.router.add_get("/healthz", healthz)
+        return app
+
 def main():
     """
     Main entry point for the Discord bot.
-    Sets up the keep-alive server and starts the bot.
+    Sets up the keep-alive server and starts the bot, or launches one
+    worker process per cluster when CLUSTER_COUNT is greater than 1.
     """
     logger.info("Starting Discord Bot...")
-    
-    # Start the keep-alive web server to prevent Replit from sleeping
-    keep_alive()
-    
+
     # Get the token from environment variables
     token = os.environ.get("DISCORD_TOKEN")
-    
+
     if not token:
         logger.error("No Discord token found. Please set the DISCORD_TOKEN environment variable.")
         return
-    
+
+    cluster_count = int(os.environ.get("CLUSTER_COUNT", "1"))
+
     try:
-        # Setup and run the bot
-        bot = setup_bot()
-        logger.info("Connecting to Discord...")
-        bot.run(token)
+        if cluster_count > 1:
+            # Run shard ranges in separate processes
+            shard_count = os.environ.get("SHARD_COUNT")
+            shard_count = int(shard_count) if shard_count and shard_count != "auto" else None
+            asyncio.run(ClusterLauncher(token, cluster_count, shard_count).run())
+        else:
+            # Setup and run the bot
+            asyncio.run(run_bot(token))
+    except KeyboardInterrupt:
+        logger.info("Shutting down...")
     except Exception as e:
         logger.error(f"Error running the bot: {e}")
 
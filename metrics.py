@@ -0,0 +1,199 @@
+import logging
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Every metric created in the process by name, in creation order.
+# Creating a metric with an existing name replaces the old one.
+REGISTRY = {}
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class for a named metric with optional labels."""
+    type = "untyped"
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        REGISTRY[name] = self
+
+    def samples(self):
+        """Yield (suffix, label key, extra labels, value) for every sample."""
+        return iter(())
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+    type = "counter"
+
+    def __init__(self, name, description):
+        super().__init__(name, description)
+        self.values = {}  # label key -> float
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(_label_key(labels), 0)
+
+    def labels(self, **labels):
+        """Bind label values once, for counters incremented on hot paths."""
+        return BoundCounter(self, _label_key(labels))
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield "", key, (), value
+
+
+class BoundCounter:
+    """A Counter with fixed label values, skips building the label key on every inc."""
+    __slots__ = ("counter", "key")
+
+    def __init__(self, counter, key):
+        self.counter = counter
+        self.key = key
+
+    def inc(self, amount=1):
+        values = self.counter.values
+        values[self.key] = values.get(self.key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that can go up and down, or is read from a callback."""
+    type = "gauge"
+
+    def __init__(self, name, description, callback=None):
+        """
+        Args:
+            name: Metric name
+            description: Help text
+            callback: Function returning the current value (optional)
+        """
+        super().__init__(name, description)
+        self.callback = callback
+        self.values = {}  # label key -> float
+
+    def set(self, value, **labels):
+        self.values[_label_key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels):
+        if self.callback is not None and not labels:
+            return self.callback()
+        return self.values.get(_label_key(labels), 0)
+
+    def samples(self):
+        if self.callback is not None:
+            try:
+                yield "", (), (), self.callback()
+            except Exception as e:
+                logger.error(f"Gauge {self.name} callback failed: {e}")
+        for key, value in self.values.items():
+            yield "", key, (), value
+
+
+class HistogramSeries:
+    """Bucket counts, count and sum for one label combination."""
+
+    def __init__(self, buckets):
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+
+class Histogram(Metric):
+    """Distribution of observed values in fixed buckets."""
+    type = "histogram"
+
+    def __init__(self, name, description, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # label key -> HistogramSeries
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = HistogramSeries(self.buckets)
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series.bucket_counts[index] += 1
+        series.count += 1
+        series.sum += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the with block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get(self, **labels):
+        """
+        Get the series for a label combination.
+
+        Returns:
+            HistogramSeries or None
+        """
+        return self.series.get(_label_key(labels))
+
+    def samples(self):
+        for key, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series.bucket_counts):
+                cumulative += count
+                yield "_bucket", key, (("le", _format_value(float(bound))),), cumulative
+            yield "_bucket", key, (("le", "+Inf"),), series.count
+            yield "_sum", key, (), series.sum
+            yield "_count", key, (), series.count
+
+
+def render_prometheus():
+    """
+    Render every registered metric in the Prometheus text exposition format.
+
+    Returns:
+        str: The metrics page
+    """
+    lines = []
+    for metric in REGISTRY.values():
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for suffix, key, extra, value in metric.samples():
+            lines.append(f"{metric.name}{suffix}{_format_labels(key, extra)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,185 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from logging_setup import bind_log_context, reset_log_context
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+COMMAND_SECONDS = Histogram("bot_command_seconds", "Command latency from invoke to completion, by command")
+HANDLER_SECONDS = Histogram("bot_handler_seconds", "Latency of interaction callbacks and background handlers, by handler")
+SPAN_SECONDS = Histogram("bot_span_seconds", "Latency of REST calls and other spans inside handlers, by span")
+
+_current_trace = ContextVar("current_trace", default=None)
+
+
+class Trace:
+    """Timing of one command or interaction and the spans inside it."""
+
+    def __init__(self, name):
+        self.name = name
+        self.start = time.perf_counter()
+        self.spans = []  # (span name, seconds)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def breakdown(self):
+        """Describe the spans of the trace, e.g. "create_text_channel=812ms, send=95ms"."""
+        if not self.spans:
+            return "no spans"
+        return ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.spans)
+
+
+@contextmanager
+def span(name):
+    """
+    Time a block inside a command or interaction handler.
+
+    The duration is recorded in the span histogram and, when a trace is
+    active, added to the trace's breakdown for slow-path logging.
+
+    Args:
+        name: Span name, usually the REST call being made (e.g. "delete")
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        SPAN_SECONDS.observe(elapsed, span=name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append((name, elapsed))
+
+
+async def timed(name, awaitable):
+    """Await something inside a span, for steps run concurrently with asyncio.gather."""
+    with span(name):
+        return await awaitable
+
+
+class Profiler:
+    """
+    Latency instrumentation for commands and interactions.
+
+    Records per-command and per-handler latency histograms, logs
+    invocations slower than slow_threshold with their span breakdown, and
+    can run cProfile over the next invocations of a chosen command.
+    """
+
+    def __init__(self, slow_threshold=None, output_dir=None):
+        """
+        Args:
+            slow_threshold: Seconds after which an invocation is logged as
+                slow (defaults to SLOW_COMMAND_THRESHOLD_MS / 1000)
+            output_dir: Where cProfile stats are dumped (defaults to PROFILE_DIR)
+        """
+        if slow_threshold is None:
+            slow_threshold = float(os.environ.get("SLOW_COMMAND_THRESHOLD_MS", "1000")) / 1000
+        self.slow_threshold = slow_threshold
+        self.output_dir = output_dir or os.environ.get("PROFILE_DIR", "profiles")
+        self.profile_command = None
+        self.profile_remaining = 0
+        self._profile = None
+
+    def install(self, bot):
+        """Register the before/after invoke hooks on a bot."""
+        bot.before_invoke(self.before_invoke)
+        bot.after_invoke(self.after_invoke)
+
+    def start_profiling(self, command_name, count=1):
+        """
+        Profile the next invocations of a command with cProfile.
+
+        The profile covers everything the event loop runs while the command
+        is in flight, so other tasks show up in it too.
+
+        Args:
+            command_name: Qualified name of the command to profile
+            count: Number of invocations to profile
+        """
+        self.profile_command = command_name
+        self.profile_remaining = count
+
+    async def before_invoke(self, ctx):
+        """Start timing a command."""
+        ctx.trace = Trace(ctx.command.qualified_name)
+        _current_trace.set(ctx.trace)
+        bind_log_context(ctx.guild, ctx.author, ctx.command.qualified_name)
+
+        # cProfile can only have one active profile per thread
+        if self.profile_remaining and self._profile is None and ctx.command.qualified_name == self.profile_command:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            ctx.profiled = True
+
+    async def after_invoke(self, ctx):
+        """Record a command's latency and log it if it was slow."""
+        trace = getattr(ctx, "trace", None)
+        if trace is None:
+            return
+        _current_trace.set(None)
+
+        if getattr(ctx, "profiled", False):
+            self._finish_profile(trace.name)
+
+        elapsed = trace.elapsed
+        COMMAND_SECONDS.observe(elapsed, command=trace.name)
+        latency = {"latency_ms": round(elapsed * 1000, 1)}
+        if elapsed >= self.slow_threshold:
+            logger.warning(f"Slow command {trace.name} by {ctx.author}: {elapsed * 1000:.0f}ms ({trace.breakdown()})", extra=latency)
+        else:
+            logger.debug(f"Command {trace.name} finished in {elapsed * 1000:.0f}ms", extra=latency)
+        reset_log_context()
+
+    @contextmanager
+    def handler(self, name, guild=None, user=None):
+        """
+        Time a handler that runs outside the command hooks.
+
+        Used for component interaction callbacks (buttons, selects) and for
+        background work such as the ticket close pipeline.
+
+        Args:
+            name: Handler name used as the histogram label
+            guild: Guild the handler acts in, for log records (optional)
+            user: User the handler acts for, for log records (optional)
+        """
+        trace = Trace(name)
+        token = _current_trace.set(trace)
+        log_token = bind_log_context(guild, user, name)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+            elapsed = trace.elapsed
+            HANDLER_SECONDS.observe(elapsed, handler=name)
+            if elapsed >= self.slow_threshold:
+                logger.warning(
+                    f"Slow handler {name}: {elapsed * 1000:.0f}ms ({trace.breakdown()})",
+                    extra={"latency_ms": round(elapsed * 1000, 1)}
+                )
+            reset_log_context(log_token)
+
+    def _finish_profile(self, command_name):
+        self._profile.disable()
+        profile, self._profile = self._profile, None
+        self.profile_remaining -= 1
+        if not self.profile_remaining:
+            self.profile_command = None
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{command_name}-{int(time.time())}.prof")
+        profile.dump_stats(path)
+
+        summary = io.StringIO()
+        pstats.Stats(profile, stream=summary).sort_stats("cumulative").print_stats(15)
+        logger.info(f"Profile for {command_name} saved to {path}\n{summary.getvalue()}")
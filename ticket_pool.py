@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import os
+import time
+
+import discord
+
+from bulk import CATEGORY_CHANNEL_LIMIT
+from metrics import Counter, Histogram
+from profiling import span
+from ticket_registry import POOL_CHANNEL_NAME
+
+logger = logging.getLogger(__name__)
+
+POOL_CATEGORY_NAME = "Tickets"
+
+TICKET_CHANNEL_OPEN_SECONDS = Histogram(
+    "ticket_channel_open_seconds",
+    "Time to get a ticket channel ready for its owner, by path (pool claim or cold create)"
+)
+POOL_CLAIMS = Counter("ticket_pool_claims_total", "Ticket opens by pool result (hit or miss)")
+POOL_CHANNELS_CREATED = Counter("ticket_pool_channels_created_total", "Pool channels pre-created")
+
+
+class TicketChannelPool:
+    """
+    Warm pool of hidden, pre-created ticket channels.
+
+    Opening a ticket claims a pooled channel with a single edit (name,
+    topic, overwrites, and out of the pool category, which like any
+    category holds at most 50 channels) instead of creating one, and a
+    background worker tops the pool back up at most once every
+    refill_interval seconds so refills never burst against the
+    channel-creation rate limit.
+
+    Pool channels are tracked by the TicketRegistry, which picks them up
+    from the gateway's channel create events and on startup.
+    """
+
+    def __init__(self, registry, guild_config, default_size=None, refill_interval=None):
+        """
+        Args:
+            registry: The TicketRegistry tracking pool channels
+            guild_config: The GuildConfigStore holding per-guild pool sizes
+            default_size: Pool size for guilds without an override
+                (defaults to TICKET_POOL_SIZE, 0 disables the pool)
+            refill_interval: Seconds between pool channel creations
+                (defaults to TICKET_POOL_REFILL_INTERVAL)
+        """
+        self.registry = registry
+        self.guild_config = guild_config
+        if default_size is None:
+            default_size = int(os.environ.get("TICKET_POOL_SIZE", "0"))
+        if refill_interval is None:
+            refill_interval = float(os.environ.get("TICKET_POOL_REFILL_INTERVAL", "5"))
+        self.default_size = default_size
+        self.refill_interval = refill_interval
+        self._categories = {}  # guild_id -> category channel ID
+        self._pending = {}  # guild_id -> guild waiting for a refill, in order
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        """Start the background refill worker."""
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the refill worker."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_size(self, guild):
+        """
+        Get the target pool size for a guild.
+
+        The pool is only kept for guilds where the ticket system is set up.
+
+        Returns:
+            int: The target number of unclaimed channels
+        """
+        if not self.registry.get_create_channel(guild):
+            return 0
+        size = self.guild_config.get(guild.id).pool_size
+        size = self.default_size if size is None else size
+        # Unclaimed channels all live in the pool category
+        return min(size, CATEGORY_CHANNEL_LIMIT)
+
+    def request_refill(self, guild):
+        """Schedule a refill if the guild's pool is below its target size."""
+        if self.registry.pool_size(guild.id) < self.get_size(guild):
+            self._pending[guild.id] = guild
+            self._wakeup.set()
+
+    def refill_all(self, guilds):
+        """Schedule a refill for every guild that needs one."""
+        for guild in guilds:
+            self.request_refill(guild)
+
+    async def open_channel(self, guild, name, topic, overwrites):
+        """
+        Get a ticket channel, claiming a pooled one when available.
+
+        Args:
+            guild: The Discord guild
+            name: The ticket channel name
+            topic: The ticket channel topic
+            overwrites: Permission overwrites for the owner and staff
+
+        Returns:
+            discord.TextChannel: The ready ticket channel
+        """
+        start = time.perf_counter()
+
+        if self.get_size(guild):
+            channel = await self._claim(guild, name, topic, overwrites)
+            self.request_refill(guild)
+            if channel:
+                POOL_CLAIMS.inc(result="hit")
+                TICKET_CHANNEL_OPEN_SECONDS.observe(time.perf_counter() - start, path="pool")
+                return channel
+            POOL_CLAIMS.inc(result="miss")
+
+        with span("create_text_channel"):
+            channel = await guild.create_text_channel(name=name, overwrites=overwrites, topic=topic)
+        TICKET_CHANNEL_OPEN_SECONDS.observe(time.perf_counter() - start, path="cold")
+        return channel
+
+    def status(self, guild):
+        """
+        Describe the pool state for a guild and the latency of each open path.
+
+        Returns:
+            dict: Target size, available channels and per-path latency stats
+        """
+        latency = {}
+        for path in ("pool", "cold"):
+            series = TICKET_CHANNEL_OPEN_SECONDS.get(path=path)
+            latency[path] = (series.count, series.mean) if series else (0, 0.0)
+        return {
+            "size": self.get_size(guild),
+            "available": self.registry.pool_size(guild.id),
+            "latency": latency,
+        }
+
+    async def _claim(self, guild, name, topic, overwrites):
+        """Turn the oldest pooled channel into the ticket channel."""
+        while True:
+            channel = self.registry.take_pool_channel(guild)
+            if not channel:
+                return None
+            try:
+                with span("edit_channel"):
+                    # Out of the pool category, where cold-created tickets are too, so it only holds unclaimed channels
+                    edited = await channel.edit(name=name, topic=topic, overwrites=overwrites, category=None)
+                return edited or channel
+            except discord.NotFound:
+                # Deleted by someone else before we got to it, try the next one
+                continue
+            except discord.HTTPException as e:
+                logger.error(f"Failed to claim pool channel {channel.id} in guild {guild.name}: {e}")
+                return None
+
+    async def _run(self):
+        """Refill worker, creates one channel per refill_interval round-robin across guilds."""
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            guild_id = next(iter(self._pending))
+            guild = self._pending.pop(guild_id)
+
+            deficit = self.get_size(guild) - self.registry.pool_size(guild.id)
+            if deficit <= 0:
+                continue
+
+            try:
+                await self._create_pool_channel(guild)
+                POOL_CHANNELS_CREATED.inc()
+            except discord.HTTPException as e:
+                logger.error(f"Failed to create pool channel in guild {guild.name}: {e}")
+
+            if deficit > 1:
+                self._pending[guild.id] = guild
+            await asyncio.sleep(self.refill_interval)
+
+    async def _create_pool_channel(self, guild):
+        hidden = {
+            guild.default_role: discord.PermissionOverwrite(view_channel=False),
+            guild.me: discord.PermissionOverwrite(view_channel=True, send_messages=True)
+        }
+        category = await self._get_category(guild, hidden)
+        await guild.create_text_channel(
+            name=POOL_CHANNEL_NAME,
+            category=category,
+            overwrites=hidden,
+            topic="Reserved for the next ticket"
+        )
+
+    async def _get_category(self, guild, overwrites):
+        """Get or create the category pooled ticket channels live in."""
+        category_id = self._categories.get(guild.id)
+        category = guild.get_channel(category_id) if category_id else None
+        if not category:
+            category = discord.utils.get(guild.categories, name=POOL_CATEGORY_NAME)
+            if not category:
+                category = await guild.create_category(POOL_CATEGORY_NAME, overwrites=overwrites)
+            self._categories[guild.id] = category.id
+        return category
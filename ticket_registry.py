@@ -0,0 +1,287 @@
+import re
+import logging
+from dataclasses import dataclass
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+LOGS_CHANNEL_NAME = "ticket-logs"
+CREATE_CHANNEL_NAME = "create-ticket"
+TICKET_CHANNEL_PREFIX = "ticket-"
+POOL_CHANNEL_NAME = "pooled-ticket"
+
+# Ticket channel topics look like "Support ticket for alice (ID: 1234)".
+# Older tickets were created without the owner ID suffix.
+TOPIC_PATTERN = re.compile(r"^(?P<type>\S+) ticket for (?P<name>.+?)(?: \(ID: (?P<owner_id>\d+)\))?$")
+
+
+def ticket_topic(ticket_type, user):
+    """
+    Build the channel topic for a ticket channel.
+
+    The owner ID is embedded so the registry can be rebuilt from the
+    channel list alone after a restart.
+
+    Args:
+        ticket_type: The ticket type label (e.g. "Support")
+        user: The user who owns the ticket
+
+    Returns:
+        str: The channel topic
+    """
+    return f"{ticket_type} ticket for {user.name} (ID: {user.id})"
+
+
+@dataclass
+class TicketEntry:
+    """
+    An open ticket channel and the user it belongs to.
+
+    Legacy tickets whose owner couldn't be resolved by name have no owner
+    ID, only the name from their topic.
+    """
+    guild_id: int
+    channel_id: int
+    owner_id: int
+    ticket_type: str
+    owner_name: str = None
+
+
+class TicketRegistry:
+    """
+    In-memory index of ticket state for every guild the bot is in.
+
+    Tickets are keyed by (guild ID, owner ID) and by channel ID, and the
+    logs and create-ticket channel IDs are resolved once per guild, so
+    lookups on the interaction path never scan guild.text_channels.
+    """
+
+    def __init__(self):
+        self._tickets = {}  # (guild_id, owner_id) -> TicketEntry
+        self._channels = {}  # channel_id -> TicketEntry
+        self._logs_channels = {}  # guild_id -> channel_id
+        self._create_channels = {}  # guild_id -> channel_id
+        self._pool_channels = {}  # guild_id -> {channel_id: None}, ordered oldest first
+
+    def build(self, guilds):
+        """
+        Rebuild the index from scratch for the given guilds.
+
+        Args:
+            guilds: Iterable of Discord guilds
+        """
+        self._tickets.clear()
+        self._channels.clear()
+        self._logs_channels.clear()
+        self._create_channels.clear()
+        self._pool_channels.clear()
+
+        for guild in guilds:
+            self.index_guild(guild)
+
+        logger.info(f"Ticket registry built: {len(self._channels)} open ticket(s) in {len(self._logs_channels)} configured guild(s)")
+
+    def index_guild(self, guild):
+        """
+        Index every text channel of a single guild.
+
+        Args:
+            guild: The Discord guild
+        """
+        for channel in guild.text_channels:
+            self.track_channel(channel)
+
+    def forget_guild(self, guild_id):
+        """
+        Drop all state for a guild the bot has left.
+
+        Args:
+            guild_id: The guild ID
+        """
+        for entry in [e for e in self._channels.values() if e.guild_id == guild_id]:
+            self._remove_entry(entry)
+        self._logs_channels.pop(guild_id, None)
+        self._create_channels.pop(guild_id, None)
+        self._pool_channels.pop(guild_id, None)
+
+    def track_channel(self, channel):
+        """
+        Add or refresh a channel in the index.
+
+        Called for every channel on startup and again whenever a channel is
+        created or updated.
+
+        Args:
+            channel: The Discord channel
+        """
+        if not isinstance(channel, discord.TextChannel):
+            return
+
+        guild_id = channel.guild.id
+
+        if channel.name == LOGS_CHANNEL_NAME:
+            self._logs_channels[guild_id] = channel.id
+            return
+        if channel.name == CREATE_CHANNEL_NAME:
+            self._create_channels[guild_id] = channel.id
+            return
+        if channel.name == POOL_CHANNEL_NAME:
+            self._pool_channels.setdefault(guild_id, {})[channel.id] = None
+            return
+
+        entry = self._parse_ticket_channel(channel)
+        existing = self._channels.get(channel.id)
+        if existing and (entry is None or existing.owner_id != entry.owner_id):
+            self._remove_entry(existing)
+        if entry:
+            self._add_entry(entry)
+
+    def forget_channel(self, channel):
+        """
+        Remove a deleted channel from the index.
+
+        Args:
+            channel: The Discord channel
+        """
+        guild_id = channel.guild.id
+
+        if self._logs_channels.get(guild_id) == channel.id:
+            del self._logs_channels[guild_id]
+        if self._create_channels.get(guild_id) == channel.id:
+            del self._create_channels[guild_id]
+        self._pool_channels.get(guild_id, {}).pop(channel.id, None)
+
+        entry = self._channels.get(channel.id)
+        if entry:
+            self._remove_entry(entry)
+
+    def add_ticket(self, channel, owner_id, ticket_type):
+        """
+        Register a freshly created ticket channel.
+
+        This is done directly by the creating code so the ticket is visible
+        before the gateway's channel create event arrives.
+
+        Args:
+            channel: The new ticket channel
+            owner_id: ID of the user who owns the ticket
+            ticket_type: The ticket type label
+
+        Returns:
+            TicketEntry: The registered entry
+        """
+        entry = TicketEntry(channel.guild.id, channel.id, owner_id, ticket_type)
+        self._add_entry(entry)
+        return entry
+
+    def set_logs_channel(self, channel):
+        """Record the ticket-logs channel for a guild."""
+        self._logs_channels[channel.guild.id] = channel.id
+
+    def set_create_channel(self, channel):
+        """Record the create-ticket channel for a guild."""
+        self._create_channels[channel.guild.id] = channel.id
+
+    def take_pool_channel(self, guild):
+        """
+        Remove and return the oldest unclaimed pool channel for a guild.
+
+        Returns:
+            discord.TextChannel or None
+        """
+        pool = self._pool_channels.get(guild.id)
+        while pool:
+            channel_id = next(iter(pool))
+            del pool[channel_id]
+            channel = guild.get_channel(channel_id)
+            if channel:
+                return channel
+        return None
+
+    def pool_size(self, guild_id):
+        """Number of unclaimed pool channels in a guild."""
+        return len(self._pool_channels.get(guild_id, ()))
+
+    def get_ticket(self, guild_id, user_id):
+        """
+        Get the open ticket for a user in a guild.
+
+        Returns:
+            TicketEntry or None
+        """
+        return self._tickets.get((guild_id, user_id))
+
+    def get_ticket_by_channel(self, channel_id):
+        """
+        Get the ticket that lives in a channel.
+
+        Returns:
+            TicketEntry or None
+        """
+        return self._channels.get(channel_id)
+
+    def get_logs_channel(self, guild):
+        """
+        Get the ticket-logs channel for a guild.
+
+        Returns:
+            discord.TextChannel or None
+        """
+        channel_id = self._logs_channels.get(guild.id)
+        return guild.get_channel(channel_id) if channel_id else None
+
+    def get_create_channel(self, guild):
+        """
+        Get the create-ticket channel for a guild.
+
+        Returns:
+            discord.TextChannel or None
+        """
+        channel_id = self._create_channels.get(guild.id)
+        return guild.get_channel(channel_id) if channel_id else None
+
+    def open_tickets(self, guild_id=None):
+        """
+        List open tickets, optionally restricted to one guild.
+
+        Returns:
+            list[TicketEntry]
+        """
+        if guild_id is None:
+            return list(self._channels.values())
+        return [e for e in self._channels.values() if e.guild_id == guild_id]
+
+    def _add_entry(self, entry):
+        if entry.owner_id is not None:
+            self._tickets[(entry.guild_id, entry.owner_id)] = entry
+        self._channels[entry.channel_id] = entry
+
+    def _remove_entry(self, entry):
+        self._channels.pop(entry.channel_id, None)
+        if entry.owner_id is None:
+            return
+        key = (entry.guild_id, entry.owner_id)
+        if self._tickets.get(key) is entry:
+            del self._tickets[key]
+
+    @staticmethod
+    def _parse_ticket_channel(channel):
+        """Recover the ticket entry for a ticket channel from its topic."""
+        if not channel.name.startswith(TICKET_CHANNEL_PREFIX) or not channel.topic:
+            return None
+
+        match = TOPIC_PATTERN.match(channel.topic)
+        if not match:
+            return None
+
+        owner_id = match.group("owner_id")
+        if owner_id is not None:
+            return TicketEntry(channel.guild.id, channel.id, int(owner_id), match.group("type"))
+
+        # Legacy ticket without the ID suffix, resolve the owner by name. Without
+        # the members intent they usually aren't cached, the ticket is still
+        # indexed so it can be closed, just not found by owner
+        name = match.group("name")
+        member = channel.guild.get_member_named(name)
+        return TicketEntry(channel.guild.id, channel.id, member.id if member else None, match.group("type"), name)
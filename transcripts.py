@@ -0,0 +1,169 @@
+import asyncio
+import gzip
+import html
+import json
+import logging
+import os
+import time
+
+from metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_MESSAGES = Counter("transcript_messages_total", "Messages written to ticket transcripts")
+TRANSCRIPT_EXPORT_SECONDS = Histogram(
+    "transcript_export_seconds",
+    "Time to export a ticket transcript",
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+
+HTML_HEADER = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>body{{font-family:sans-serif;background:#36393f;color:#dcddde}}.m{{margin:6px 0}}.a{{font-weight:bold;color:#fff}}.t{{color:#72767d;font-size:12px}}</style>
+</head><body><h2>{title}</h2>
+"""
+HTML_FOOTER = "</body></html>\n"
+
+
+def message_record(message):
+    """
+    Convert a message into the dict written as one transcript line.
+
+    Args:
+        message: The Discord message
+
+    Returns:
+        dict: JSON-serializable message data
+    """
+    return {
+        "id": message.id,
+        "author_id": message.author.id,
+        "author": str(message.author),
+        "bot": message.author.bot,
+        "created_at": message.created_at.isoformat(),
+        "edited_at": message.edited_at.isoformat() if message.edited_at else None,
+        "content": message.content,
+        "attachments": [attachment.url for attachment in message.attachments],
+        "embeds": [embed.to_dict() for embed in message.embeds],
+    }
+
+
+def message_html(record):
+    """Render one transcript record as an HTML fragment."""
+    attachments = "".join(
+        f'<div><a href="{html.escape(url)}">{html.escape(url.rsplit("/", 1)[-1])}</a></div>'
+        for url in record["attachments"]
+    )
+    return (
+        f'<div class="m"><span class="a">{html.escape(record["author"])}</span> '
+        f'<span class="t">{record["created_at"]}</span>'
+        f'<div>{html.escape(record["content"]).replace(chr(10), "<br>")}</div>{attachments}</div>\n'
+    )
+
+
+class TranscriptExporter:
+    """
+    Streams ticket channel history to compressed JSONL (and optionally HTML).
+
+    History is iterated lazily and written in chunks from a worker thread,
+    so memory stays flat regardless of ticket length. A semaphore bounds
+    how many exports run at once across all guilds.
+    """
+
+    def __init__(self, directory=None, max_concurrency=None, chunk_size=500, render_html=None):
+        """
+        Args:
+            directory: Where transcripts are written (defaults to TRANSCRIPT_DIR)
+            max_concurrency: Max exports running at once (defaults to TRANSCRIPT_CONCURRENCY)
+            chunk_size: Messages buffered per write
+            render_html: Also write an HTML transcript (defaults to TRANSCRIPT_HTML)
+        """
+        self.directory = directory or os.environ.get("TRANSCRIPT_DIR", "transcripts")
+        if max_concurrency is None:
+            max_concurrency = int(os.environ.get("TRANSCRIPT_CONCURRENCY", "4"))
+        if render_html is None:
+            render_html = os.environ.get("TRANSCRIPT_HTML", "false").lower() in ("1", "true", "yes")
+        self.chunk_size = chunk_size
+        self.render_html = render_html
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks = set()
+
+    def run_in_background(self, coro):
+        """
+        Run a coroutine as a tracked background task.
+
+        Tracked tasks are awaited by close() so work like deleting a ticket
+        after its export isn't lost on shutdown.
+
+        Returns:
+            asyncio.Task
+        """
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    @property
+    def running(self):
+        """Number of background tasks still running."""
+        return len(self._tasks)
+
+    async def close(self):
+        """Wait for every background task to finish."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def export(self, channel):
+        """
+        Export the full history of a channel.
+
+        Args:
+            channel: The Discord text channel
+
+        Returns:
+            list[str]: Paths of the written transcript files
+        """
+        async with self._semaphore:
+            start = time.perf_counter()
+            os.makedirs(self.directory, exist_ok=True)
+            base = os.path.join(self.directory, f"{channel.guild.id}-{channel.id}-{channel.name}")
+            jsonl_path = f"{base}.jsonl.gz"
+            html_path = f"{base}.html" if self.render_html else None
+
+            jsonl_file = await asyncio.to_thread(gzip.open, jsonl_path, "wt", encoding="utf-8")
+            html_file = await asyncio.to_thread(open, html_path, "w", encoding="utf-8") if html_path else None
+            count = 0
+            try:
+                if html_file:
+                    await asyncio.to_thread(html_file.write, HTML_HEADER.format(title=html.escape(f"#{channel.name}")))
+
+                records = []
+                async for message in channel.history(limit=None, oldest_first=True):
+                    records.append(message_record(message))
+                    if len(records) >= self.chunk_size:
+                        await asyncio.to_thread(self._write_chunk, jsonl_file, html_file, records)
+                        count += len(records)
+                        records = []
+                if records:
+                    await asyncio.to_thread(self._write_chunk, jsonl_file, html_file, records)
+                    count += len(records)
+
+                if html_file:
+                    await asyncio.to_thread(html_file.write, HTML_FOOTER)
+            finally:
+                await asyncio.to_thread(jsonl_file.close)
+                if html_file:
+                    await asyncio.to_thread(html_file.close)
+
+            elapsed = time.perf_counter() - start
+            TRANSCRIPT_MESSAGES.inc(count)
+            TRANSCRIPT_EXPORT_SECONDS.observe(elapsed)
+            logger.info(f"Exported {count} message(s) from #{channel.name} in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.0f} msg/s)")
+
+            return [path for path in (jsonl_path, html_path) if path]
+
+    @staticmethod
+    def _write_chunk(jsonl_file, html_file, records):
+        jsonl_file.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+        if html_file:
+            html_file.write("".join(message_html(record) for record in records))
@@ -1,66 +1,138 @@
 
+import asyncio
 import discord
 import random
 import logging
+import time
+from collections import OrderedDict
+from datetime import timezone
 
 logger = logging.getLogger(__name__)
 
-def get_embed_color():
+def get_embed_color(seed=None):
     """
     Generate a random color for embeds.
 
+    Args:
+        seed: Returns the same color every time for the same seed, so
+            cached embeds keep their color (optional)
+
     Returns:
         discord.Color: A random color object
     """
+    rng = random.Random(seed) if seed is not None else random
     return discord.Color.from_rgb(
-        random.randint(0, 255),
-        random.randint(0, 255),
-        random.randint(0, 255)
+        rng.randint(0, 255),
+        rng.randint(0, 255),
+        rng.randint(0, 255)
     )
 
-async def log_ticket_event(guild, event_type, user, channel=None, closed_by=None):
+def utc_timestamp(dt):
+    """
+    Get the epoch timestamp of a datetime, treating naive datetimes as UTC.
+
+    SQLite hands timezone-aware columns back without their timezone.
     """
-    Log a ticket event to the ticket-logs channel
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+async def resolve_member(guild, user_id):
+    """
+    Get a guild member from the cache, fetching it from Discord on a miss.
+
+    With a lean member cache most members aren't cached, so they are only
+    looked up when a ticket actually needs them.
 
     Args:
         guild: The Discord guild
-        event_type: Type of event (created, closed)
-        user: The user who created the ticket
-        channel: The ticket channel (optional)
-        closed_by: The user who closed the ticket (optional)
+        user_id: ID of the member (None for an unknown member)
+
+    Returns:
+        discord.Member: The member, or None if they left the guild
+    """
+    if user_id is None:
+        return None
+    member = guild.get_member(user_id)
+    if member is not None:
+        return member
+    try:
+        return await guild.fetch_member(user_id)
+    except discord.NotFound:
+        return None
+    except discord.HTTPException as e:
+        logger.warning(f"Failed to fetch member {user_id} in guild {guild.name}: {e}")
+        return None
+
+class SingleFlight:
     """
-    logs_channel = discord.utils.get(guild.text_channels, name="ticket-logs")
-    if not logs_channel:
-        logger.warning(f"Ticket logs channel not found in guild {guild.name}")
-        return
-
-    if event_type == "created":
-        embed = discord.Embed(
-            title="Ticket Created",
-            description=f"Ticket created by {user.mention}",
-            color=discord.Color.green(),
-            timestamp=discord.utils.utcnow()
-        )
-        if channel:
-            embed.add_field(name="Channel", value=channel.mention)
-    
-    elif event_type == "closed":
-        embed = discord.Embed(
-            title="Ticket Closed",
-            description=f"Ticket for {user.mention} was closed",
-            color=discord.Color.red(),
-            timestamp=discord.utils.utcnow()
-        )
-        if closed_by:
-            embed.add_field(name="Closed By", value=closed_by.mention)
-
-    else:
-        embed = discord.Embed(
-            title="Ticket Event",
-            description=f"Ticket event for {user.mention}",
-            color=discord.Color.blue(),
-            timestamp=discord.utils.utcnow()
-        )
-
-    await logs_channel.send(embed=embed)
-    logger.info(f"Logged ticket {event_type} event for user {user}")
+    Collapse concurrent calls for the same key into one execution.
+
+    The first caller for a key starts the work; callers arriving while it
+    is still running wait for the same result instead of repeating it.
+    """
+
+    def __init__(self):
+        self._inflight = {}  # key -> asyncio.Task
+
+    async def run(self, key, coro_factory):
+        """
+        Run coro_factory() for key unless a call for key is already in flight.
+
+        Args:
+            key: Hashable key identifying the work
+            coro_factory: Zero-argument callable returning the coroutine to run
+
+        Returns:
+            tuple: (result, shared) where shared is True when the result came
+            from a call started by another caller
+        """
+        task = self._inflight.get(key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.create_task(coro_factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shield so a cancelled waiter doesn't cancel the work for everyone else
+        return await asyncio.shield(task), shared
+
+class TTLCache:
+    """
+    Small LRU cache whose entries also expire after ttl seconds.
+
+    Used for embeds that are cheap to rebuild but requested often, so a
+    burst of the same command costs a dictionary lookup.
+    """
+
+    def __init__(self, maxsize=256, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expiry, value)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached value, or None if it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Drop one entry, or every entry if no key is given."""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)